@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,12 +46,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ode_solver.metrics.MetricsMiddleware',
+    'ode_solver.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ode_solver.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,6 +89,40 @@ DATABASES = {
     }
 }
 
+# Read-only task endpoints (detail, solution, verify) can be served from
+# replicas. Aliases listed here must exist in DATABASES; tasks created in the
+# last STICKY_SECONDS are always read from the primary.
+ODE_SOLVER_READ_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 30,
+}
+
+# Point ODE_SOLVER_REPLICA_DB at a copy of the primary SQLite file to try
+# replica routing locally.
+if os.environ.get('ODE_SOLVER_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ODE_SOLVER_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    ODE_SOLVER_READ_REPLICAS['ALIASES'] = ['replica']
+
+DATABASE_ROUTERS = ['ode_solver.db_routers.ReadReplicaRouter']
+
+# Idempotency-Key records and replica read pins live in the default cache,
+# which must be shared when several processes serve requests (manage.py
+# serve with more than one worker). ODE_SOLVER_CACHE selects it: a
+# redis:// URL (needs the redis package), 'db' for a table in the default
+# database (run manage.py createcachetable), or unset for a per-process
+# LocMemCache.
+_cache = os.environ.get('ODE_SOLVER_CACHE', '')
+if _cache.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': _cache}}
+elif _cache == 'db':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'ode_solver_cache'}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -120,6 +160,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Logging: ode_solver's INFO records (e.g. warm-up timings) go to stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ode_solver': {
+            'handlers': ['console'],
+            'level': os.environ.get('ODE_SOLVER_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -129,9 +184,175 @@ REST_FRAMEWORK = {
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Application settings
 ODE_SOLVER_SETTINGS = {
+    # Each solve starts at MAX_RTOL/MAX_ATOL and re-solves with both
+    # multiplied by TIGHTEN_FACTOR while round(|S| + L) lies closer to a .5
+    # boundary than ERROR_FACTOR times the estimated error, stopping at the
+    # RTOL/ATOL floor. The tolerances used are stored on each task. All
+    # passes of one solve share TIMEOUT seconds.
     'RTOL': 1e-14,
     'ATOL': 1e-16,
+    'MAX_RTOL': 1e-6,
+    'MAX_ATOL': 1e-8,
+    'TIGHTEN_FACTOR': 1e-2,
+    'ERROR_FACTOR': 10.0,
+    # scipy.integrate.solve_ivp method used by ODEGenerator._solve_system
+    'METHOD': 'RK45',
+    'TIMEOUT': 10.0,
+}
+
+# Task detail/solution responses are immutable: Cache-Control max-age in seconds
+ODE_SOLVER_HTTP_CACHE = {
+    'MAX_AGE': 60 * 60 * 24 * 365,
+}
+
+# Async views (/api/async/...): size of the solver thread pool and the
+# per-request solver timeouts in seconds
+ODE_SOLVER_ASYNC = {
+    'SOLVER_WORKERS': 4,
+    'GENERATE_TIMEOUT': 35.0,
+    'CUSTOM_TIMEOUT': 15.0,
+}
+
+# Opt-in SQLite concurrency tuning (ignored on other database backends).
+# Enables WAL journaling and routes ODETask inserts through one batching
+# writer thread; see ode_solver/sqlite_tuning.py.
+ODE_SOLVER_SQLITE = {
+    'ENABLED': False,
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'BUSY_TIMEOUT_MS': 5000,
+    'WRITE_QUEUE': True,
+    'WRITE_BATCH_SIZE': 32,
+    'WRITE_BATCH_WAIT': 0.005,
+    'WRITE_TIMEOUT': 30.0,
+}
+
+# Admission control for the solver-backed endpoints (per process): concurrent
+# solves and bounded wait queue per scope (503 + Retry-After when saturated),
+# plus a per-client token bucket for create_custom (429). Behind the bundled
+# nginx the client is identified by X-Real-IP (ODE_SOLVER_CLIENT_KEY=HTTP_X_REAL_IP);
+# Django's own port must then not be reachable except through the proxy.
+ODE_SOLVER_ADMISSION = {
+    'ENABLED': True,
+    'SCOPES': {
+        'generate': {'CONCURRENCY': 4, 'QUEUE_SIZE': 8, 'MAX_WAIT': 2.0},
+        'create_custom': {'CONCURRENCY': 4, 'QUEUE_SIZE': 8, 'MAX_WAIT': 2.0},
+    },
+    'RATE_LIMITS': {
+        'create_custom': {'RATE': 1.0, 'BURST': 10},
+        'jobs': {'RATE': 1.0, 'BURST': 10},
+    },
+    'RETRY_AFTER': 1,
+    'CLIENT_KEY': os.environ.get('ODE_SOLVER_CLIENT_KEY', 'REMOTE_ADDR'),
+    'TRUSTED_PROXIES': 1,
+}
+
+# Background jobs (POST /api/jobs/, executed by `manage.py run_jobs`):
+# batch size cap, queue depth before 503, worker lease and retry policy,
+# and the long-poll limits for GET /api/async/jobs/<id>/?wait= and, much
+# shorter since each wait holds a WSGI thread, GET /api/jobs/<id>/?wait=
+ODE_SOLVER_JOBS = {
+    'MAX_BATCH': 50,
+    'MAX_QUEUED': 1000,
+    'LEASE_SECONDS': 120,
+    'MAX_ATTEMPTS': 3,
+    'POLL_INTERVAL': 1.0,
+    'LONG_POLL_TIMEOUT': 25.0,
+    'SYNC_LONG_POLL_TIMEOUT': 1.0,
+    'LONG_POLL_INTERVAL': 0.25,
+}
+
+# Prometheus metrics at /metrics. With several worker processes point
+# MULTIPROCESS_DIR (or the ODE_SOLVER_METRICS_DIR environment variable) at a
+# directory shared by all of them so scrapes report totals.
+ODE_SOLVER_METRICS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': os.environ.get('ODE_SOLVER_METRICS_DIR') or None,
+    'FLUSH_INTERVAL': 1.0,
+    'TOKEN': os.environ.get('ODE_SOLVER_METRICS_TOKEN') or None,
+    'DB_GAUGES': True,
+}
+
+# On-demand request profiling: send "X-Profile: cprofile|sample" (or
+# ?profile=1) as a staff user, or with "X-Profile-Token: <TOKEN>". Results
+# are written to OUTPUT_DIR and named by the X-Profile-Id response header.
+ODE_SOLVER_PROFILING = {
+    'ENABLED': True,
+    'OUTPUT_DIR': os.environ.get('ODE_SOLVER_PROFILE_DIR') or BASE_DIR / 'profiles',
+    'TOKEN': os.environ.get('ODE_SOLVER_PROFILE_TOKEN') or None,
+    'SAMPLE_INTERVAL': 0.002,
+    'TRACEMALLOC_FRAMES': 10,
+    'TOP_N': 40,
+}
+
+# gzip/brotli for API responses of at least MIN_SIZE bytes. Compressed
+# immutable task payloads are kept per process (up to CACHE_MAX_BYTES) so
+# repeat fetches are not recompressed. brotli needs the 'brotli' package.
+ODE_SOLVER_COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CACHE_MAX_BYTES': 32 * 1024 * 1024,
+}
+
+# Idempotency-Key for generate, create_custom and job submission. Stored
+# responses live in CACHES[CACHE_ALIAS]; use a shared backend (Redis,
+# database) with several worker processes.
+ODE_SOLVER_IDEMPOTENCY = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TTL': 24 * 60 * 60,
+    'LEASE_SECONDS': 60,
+    'WAIT_TIMEOUT': 30.0,
+}
+
+# Limits for custom systems (create_custom, custom jobs, import_tasks),
+# checked before any solve. ‖A‖_F * t_f above MAX_GROWTH_EXPONENT is
+# rejected as too expensive to integrate.
+ODE_SOLVER_VALIDATION = {
+    'MAX_COEFFICIENT': 1e3,
+    'MAX_INITIAL_VALUE': 1e3,
+    'MAX_TARGET_TIME': 100.0,
+    'MAX_GROWTH_EXPONENT': 25.0,
+}
+
+# Verify attempts are buffered in memory and written in batches of
+# BATCH_SIZE or every FLUSH_INTERVAL seconds, with per-task totals in
+# AttemptStats. At most MAX_PENDING unwritten attempts are kept.
+ODE_SOLVER_ATTEMPTS = {
+    'ENABLED': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_PENDING': 100000,
+}
+
+# Opt-in warm-up of every worker at startup (imports, each solve_ivp method,
+# URLconf, caches, database connections); GET /ready answers 503 until it
+# has finished. BACKGROUND runs it in a thread instead of blocking startup.
+ODE_SOLVER_WARMUP = {
+    'ENABLED': os.environ.get('ODE_SOLVER_WARMUP') == '1',
+    'BACKGROUND': True,
+    'COMMANDS': ('runserver',),
+    'DATABASES': True,
+    'CACHES': True,
+}
+
+# manage.py serve: preforked gunicorn workers (one per available CPU by
+# default) with BLAS/OpenMP capped per worker, recycled after MAX_REQUESTS
+# (+ jitter) or past MAX_RSS_MB, draining for GRACEFUL_TIMEOUT on SIGTERM.
+ODE_SOLVER_SERVE = {
+    'BIND': os.environ.get('ODE_SOLVER_BIND', '127.0.0.1:8000'),
+    'WORKERS': int(os.environ['ODE_SOLVER_WORKERS']) if os.environ.get('ODE_SOLVER_WORKERS') else None,
+    'THREADS': 4,
+    'BLAS_THREADS': 1,
+    'MAX_REQUESTS': 10000,
+    'MAX_REQUESTS_JITTER': 1000,
+    'MAX_RSS_MB': 512,
+    'GRACEFUL_TIMEOUT': 25,
+    'PRELOAD': True,
 }
@@ -17,7 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from ode_solver.metrics import metrics_view
+from ode_solver.warmup import readiness_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('ready', readiness_view, name='ready'),
     path('', include('ode_solver.urls')),
 ]
@@ -40,6 +40,16 @@ const MathEquation = ({ latex }) => {
     );
 };
 
+// Only the parts of the solution payload this page renders
+const SOLUTION_FIELDS = 'final_values,recalculated_metrics,latex_solution';
+
+// The task itself comes from /api/generate/ or a finished job, so the bundle
+// endpoint is asked for the solution fields only
+const loadSolution = async (taskId) => {
+    const response = await axios.get(`/api/task/${taskId}/full/`, { params: { fields: SOLUTION_FIELDS } });
+    return response.data.solution;
+};
+
 const ChallengeInterface = () => {
     const navigate = useNavigate();
     const location = useLocation();
@@ -105,9 +115,14 @@ const ChallengeInterface = () => {
             return;
         }
 
+        // The solution never changes once loaded; reuse it instead of refetching
+        if (solutionData) {
+            setShowSolution(true);
+            return;
+        }
+
         try {
-            const response = await axios.get(`/api/task/${task.task_id}/solution/`);
-            setSolutionData(response.data);
+            setSolutionData(await loadSolution(task.task_id));
             setShowSolution(true);
         } catch (err) {
             setError('Failed to fetch solution: ' + (err.response?.data?.error || err.message));
@@ -124,8 +139,7 @@ const ChallengeInterface = () => {
 
         if (!solutionData) {
             try {
-                const response = await axios.get(`/api/task/${task.task_id}/solution/`);
-                setSolutionData(response.data);
+                setSolutionData(await loadSolution(task.task_id));
                 setShowLatexSteps(true);
             } catch (err) {
                 setError('Failed to fetch solution for steps: ' + (err.response?.data?.error || err.message));
@@ -407,7 +421,7 @@ const ChallengeInterface = () => {
                                             </ul>
                                             <Box sx={{ mt: 2, p: 1.5, bgcolor: '#e8f5e9', borderRadius: 1, border: '1px solid #c8e6c9' }}>
                                                 <Typography variant="h6" color="success.main" sx={{ fontWeight: 'bold' }}>
-                                                    Scalar Sum (Σ uᵢ): {solutionData.recalculated_metrics.final_solution}
+                                                    Answer ℒ = round(|S| + L + 1000κ) mod 1000: {solutionData.recalculated_metrics.final_solution}
                                                 </Typography>
                                             </Box>
                                         </Box>
@@ -3,6 +3,10 @@ import axios from 'axios';
 import { Box, Button, TextField, Typography, Grid, Paper, Alert, CircularProgress } from '@mui/material';
 import { useNavigate } from 'react-router-dom';
 
+const JOB_POLL_INTERVAL_MS = 1000;
+// Give up polling after this long; a job still queued by then has no worker
+const JOB_POLL_TIMEOUT_MS = 60000;
+
 const CustomTaskForm = () => {
     const navigate = useNavigate();
     const [loading, setLoading] = useState(false);
@@ -58,11 +62,28 @@ const CustomTaskForm = () => {
         };
 
         try {
-            const response = await axios.post('/api/create_custom/', payload);
+            // Solve in a background job so slow systems don't hold the request open
+            const { data: created } = await axios.post('/api/jobs/', { kind: 'custom', ...payload });
+            let job = created;
+            const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+            // Short polls: a long wait on the sync endpoint would hold a server thread
+            while (job.status === 'queued' || job.status === 'running') {
+                if (Date.now() >= deadline) {
+                    throw new Error(job.status === 'queued'
+                        ? 'No job worker picked up the task; is manage.py run_jobs running?'
+                        : 'Timed out waiting for the solver');
+                }
+                await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+                const response = await axios.get(`/api/jobs/${job.job_id}/`);
+                job = response.data;
+            }
+            if (job.status !== 'succeeded') {
+                throw new Error(job.error || 'Failed to create task');
+            }
             // Pass the created task to the home page so it can be displayed immediately
-            navigate('/', { state: { task: response.data } });
+            navigate('/', { state: { task: job.result.task } });
         } catch (err) {
-            setError(err.response?.data?.error || 'Failed to create task');
+            setError(err.response?.data?.error || err.message || 'Failed to create task');
         } finally {
             setLoading(false);
         }
@@ -0,0 +1,277 @@
+"""
+Admission control for the solver-backed endpoints.
+
+Each scope (``generate``, ``create_custom``) gets a concurrency limit and a
+bounded wait queue. A request that finds every slot busy waits up to
+``MAX_WAIT`` seconds for one; if the queue is already full or the deadline
+passes it gets an immediate 503 with ``Retry-After`` instead of piling
+another solver call onto an overloaded worker. ``create_custom`` and job
+submission are also rate limited per client with a token bucket (429 when
+empty).
+
+Limits are per process: with N worker processes a scope admits up to
+N x ``CONCURRENCY`` solves. Endpoints without a scope are never touched.
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .responses import FastJsonResponse
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SCOPES': {
+        'generate': {'CONCURRENCY': 4, 'QUEUE_SIZE': 8, 'MAX_WAIT': 2.0},
+        'create_custom': {'CONCURRENCY': 4, 'QUEUE_SIZE': 8, 'MAX_WAIT': 2.0},
+    },
+    'RATE_LIMITS': {
+        # Sustained requests per second and burst size, per client
+        'create_custom': {'RATE': 1.0, 'BURST': 10},
+        'jobs': {'RATE': 1.0, 'BURST': 10},
+    },
+    'RETRY_AFTER': 1,
+    # request.META key identifying the client: 'HTTP_X_REAL_IP' behind the bundled
+    # nginx, or 'HTTP_X_FORWARDED_FOR' together with TRUSTED_PROXIES
+    'CLIENT_KEY': 'REMOTE_ADDR',
+    # Proxies in front of Django that append to X-Forwarded-For
+    'TRUSTED_PROXIES': 1,
+    'MAX_TRACKED_CLIENTS': 10000,
+}
+
+ASYNC_POLL_INTERVAL = 0.01
+
+_limiters: Dict[str, 'ConcurrencyLimiter'] = {}
+_buckets: Dict[str, 'TokenBucket'] = {}
+_registry_lock = threading.Lock()
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_ADMISSION', {})}
+
+
+class ConcurrencyLimiter:
+    """At most ``concurrency`` holders, at most ``queue_size`` waiters"""
+
+    def __init__(self, concurrency: int, queue_size: int, max_wait: float):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            return False
+
+    def acquire(self) -> bool:
+        """Block until a slot frees up; False if the queue is full or the wait times out"""
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            try:
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self.active >= self.concurrency:
+                            return False
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    async def aacquire(self) -> bool:
+        """Async variant of ``acquire``; polls so the event loop is never blocked"""
+        if self.try_acquire():
+            return True
+        with self._cond:
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(ASYNC_POLL_INTERVAL)
+                if self.try_acquire():
+                    return True
+            return False
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class TokenBucket:
+    """Per-client token buckets refilled at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str) -> Tuple[bool, float]:
+        """Take one token for ``key``; returns (allowed, seconds until the next token)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._state.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._state[key] = (tokens - 1, now)
+                allowed, wait = True, 0.0
+            else:
+                self._state[key] = (tokens, now)
+                allowed, wait = False, (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+            if len(self._state) > self.max_clients:
+                self._prune(now)
+        return allowed, wait
+
+    def _prune(self, now: float):
+        # Clients whose bucket has refilled carry no state worth keeping
+        full_after = self.burst / self.rate if self.rate > 0 else float('inf')
+        for key, (_, updated) in list(self._state.items()):
+            if now - updated >= full_after:
+                del self._state[key]
+        while len(self._state) > self.max_clients:
+            self._state.pop(next(iter(self._state)))
+
+
+def get_limiter(scope: str) -> Optional[ConcurrencyLimiter]:
+    if scope not in _limiters:
+        options = get_config()['SCOPES'].get(scope)
+        if options is None:
+            return None
+        with _registry_lock:
+            if scope not in _limiters:
+                _limiters[scope] = ConcurrencyLimiter(
+                    options.get('CONCURRENCY', 4), options.get('QUEUE_SIZE', 8), options.get('MAX_WAIT', 2.0)
+                )
+    return _limiters[scope]
+
+
+def get_bucket(scope: str) -> Optional[TokenBucket]:
+    if scope not in _buckets:
+        config = get_config()
+        options = config['RATE_LIMITS'].get(scope)
+        if options is None:
+            return None
+        with _registry_lock:
+            if scope not in _buckets:
+                _buckets[scope] = TokenBucket(
+                    options.get('RATE', 1.0), options.get('BURST', 10), config['MAX_TRACKED_CLIENTS']
+                )
+    return _buckets[scope]
+
+
+def reset():
+    """Forget all limiter and bucket state, e.g. after changing settings in tests"""
+    with _registry_lock:
+        _limiters.clear()
+        _buckets.clear()
+
+
+def client_key(request) -> str:
+    """Client address for rate limits, idempotency scopes and attempt logs"""
+    config = get_config()
+    value = request.META.get(config['CLIENT_KEY']) or ''
+    if config['CLIENT_KEY'] == 'HTTP_X_FORWARDED_FOR':
+        # Each proxy appends the address it was connected from, so only the
+        # last TRUSTED_PROXIES entries are ours; anything left of them is
+        # whatever the client chose to send
+        hops = [hop.strip() for hop in value.split(',') if hop.strip()]
+        trusted = config['TRUSTED_PROXIES']
+        value = hops[-trusted] if 0 < trusted <= len(hops) else ''
+    return value.strip() or request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def _rejection(status: int, message: str, retry_after: float):
+    response = FastJsonResponse({'error': message}, status=status)
+    if not math.isfinite(retry_after):
+        retry_after = 3600
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limited_response(scope: str, request):
+    """429 response if the client has no tokens left for ``scope``, else None"""
+    bucket = get_bucket(scope)
+    if bucket is None:
+        return None
+    allowed, wait = bucket.consume(client_key(request))
+    if allowed:
+        return None
+    return _rejection(429, 'Too many requests', wait)
+
+
+def overloaded_response():
+    return _rejection(503, 'Server busy, retry later', get_config()['RETRY_AFTER'])
+
+
+class AdmissionControlMixin:
+    """Apply the ``admission_scope`` limiter and ``rate_limit_scope`` bucket to a view"""
+
+    admission_scope = None
+    rate_limit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(self, 'view_is_async', False):
+            return self._admission_dispatch(request, *args, **kwargs)
+        if not self._admits(request):
+            return super().dispatch(request, *args, **kwargs)
+        if self.rate_limit_scope:
+            response = rate_limited_response(self.rate_limit_scope, request)
+            if response is not None:
+                return response
+        limiter = get_limiter(self.admission_scope) if self.admission_scope else None
+        if limiter is None:
+            return super().dispatch(request, *args, **kwargs)
+        if not limiter.acquire():
+            return overloaded_response()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            limiter.release()
+
+    def _admits(self, request) -> bool:
+        """Whether ``request`` goes through the limits; OPTIONS and 405s never cost a token or a slot"""
+        method = request.method.lower()
+        return (
+            get_config()['ENABLED']
+            and method != 'options'
+            and method in self.http_method_names
+            and hasattr(self, method)
+        )
+
+    async def _admission_dispatch(self, request, *args, **kwargs):
+        if not self._admits(request):
+            return await super().dispatch(request, *args, **kwargs)
+        if self.rate_limit_scope:
+            response = rate_limited_response(self.rate_limit_scope, request)
+            if response is not None:
+                return response
+        limiter = get_limiter(self.admission_scope) if self.admission_scope else None
+        if limiter is None:
+            return await super().dispatch(request, *args, **kwargs)
+        if not await limiter.aacquire():
+            return overloaded_response()
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            limiter.release()
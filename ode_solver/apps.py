@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class OdeSolverConfig(AppConfig):
     name = 'ode_solver'
+
+    def ready(self):
+        from . import warmup
+        from .metrics import install_query_counter
+        from .sqlite_tuning import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='ode_solver_sqlite_tuning')
+        connection_created.connect(install_query_counter, dispatch_uid='ode_solver_query_counter')
+        warmup.start()
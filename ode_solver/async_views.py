@@ -0,0 +1,207 @@
+"""
+Async versions of the task endpoints for ASGI deployments.
+
+Under ASGI every synchronous view runs on the single thread-sensitive
+executor, so one long ``generate_valid_ode_task`` call stalls the whole
+worker. These views keep the event loop free instead: database access goes
+through the async ORM and solver work is handed to a bounded thread pool
+with an ``asyncio`` timeout, so verify and detail requests keep flowing
+while generation runs in the background.
+
+The response bodies are identical to the synchronous views in ``views.py``.
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .admission import AdmissionControlMixin, client_key
+from .idempotency import IdempotencyMixin
+from .conditional import ConditionalTaskMixin
+from .db_routers import ReplicaReadMixin, aget_task_for_read, pin_to_primary
+from .fields import FieldSelectionError
+from . import attempts, jobs
+from .models import Job, ODETask
+from .responses import FastJsonResponse, parse_json_body
+from .services import ODEGenerator
+from .sqlite_tuning import asave_task
+from .validation import ValidationError
+from .views import CreateCustomTaskView, GenerateODETaskView, TaskDetailView, VerifySolutionView
+
+DEFAULTS = {
+    'SOLVER_WORKERS': 4,
+    'GENERATE_TIMEOUT': 35.0,
+    'CUSTOM_TIMEOUT': 15.0,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_ASYNC', {})}
+
+
+def get_solver_executor() -> ThreadPoolExecutor:
+    """Process-wide pool bounding how many solver calls run at once"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config()['SOLVER_WORKERS'],
+                    thread_name_prefix='ode-solver',
+                )
+    return _executor
+
+
+async def run_solver(func, *args, timeout: float):
+    """Run ``func(*args)`` on the solver pool, giving up after ``timeout`` seconds.
+
+    The timeout covers time spent queued behind other solves. A solve that
+    times out keeps its pool thread until ODEGenerator's own limits stop it.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(get_solver_executor(), func, *args), timeout=timeout
+    )
+
+
+async def _save_new_task(task_data):
+    ode_task = await asave_task(ODETask.from_task_data(task_data))
+    await asyncio.to_thread(pin_to_primary, ode_task.pk)
+    return ode_task
+
+
+class AsyncGenerateODETaskView(IdempotencyMixin, AdmissionControlMixin, View):
+    """Async API endpoint to generate a new ODE task"""
+
+    admission_scope = 'generate'
+    idempotency_scope = 'generate'
+
+    async def get(self, request):
+        generator = ODEGenerator()
+        try:
+            task_data = await run_solver(
+                generator.generate_valid_ode_task, timeout=get_config()['GENERATE_TIMEOUT']
+            )
+        except asyncio.TimeoutError:
+            return FastJsonResponse({'error': 'Task generation timed out'}, status=504)
+
+        if not task_data:
+            return FastJsonResponse({'error': 'Could not generate a valid ODE task'}, status=500)
+
+        ode_task = await _save_new_task(task_data)
+        return FastJsonResponse(GenerateODETaskView().build_task_response(ode_task))
+
+
+class AsyncCreateCustomTaskView(IdempotencyMixin, AdmissionControlMixin, View):
+    """Async API endpoint to create a custom ODE task"""
+
+    admission_scope = 'create_custom'
+    rate_limit_scope = 'create_custom'
+    idempotency_scope = 'create_custom'
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    async def post(self, request):
+        try:
+            data = parse_json_body(request)
+
+            coefficients, initial_conditions, target_time = CreateCustomTaskView().parse_custom_request(data)
+
+            generator = ODEGenerator()
+            try:
+                task_data = await run_solver(
+                    generator.create_custom_task, coefficients, initial_conditions, target_time,
+                    timeout=get_config()['CUSTOM_TIMEOUT'],
+                )
+            except asyncio.TimeoutError:
+                return FastJsonResponse({'error': 'Solving the system timed out'}, status=504)
+
+            if not task_data:
+                return FastJsonResponse({'error': 'Could not solve the system with provided parameters'}, status=400)
+
+            ode_task = await _save_new_task(task_data)
+            return FastJsonResponse(GenerateODETaskView().build_task_response(ode_task))
+
+        except json.JSONDecodeError:
+            return FastJsonResponse({'error': 'Invalid JSON'}, status=400)
+        except ValidationError as e:
+            return FastJsonResponse(e.as_dict(), status=400)
+        except Exception as e:
+            return FastJsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncVerifySolutionView(ReplicaReadMixin, View):
+    """Async API endpoint to verify a submitted solution"""
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    async def post(self, request):
+        try:
+            data = parse_json_body(request)
+            task_id = data.get('task_id')
+            submitted_solution = data.get('solution')
+
+            if not task_id or submitted_solution is None:
+                return FastJsonResponse({'error': 'Missing task_id or solution'}, status=400)
+
+            try:
+                ode_task = await aget_task_for_read(task_id)
+            except ODETask.DoesNotExist:
+                return FastJsonResponse({'error': 'Task not found'}, status=404)
+
+            response_data = VerifySolutionView().build_response(ode_task, task_id, submitted_solution)
+            attempts.record(ode_task.pk, submitted_solution, response_data['is_correct'], client_key(request))
+            return FastJsonResponse(response_data)
+
+        except json.JSONDecodeError:
+            return FastJsonResponse({'error': 'Invalid JSON'}, status=400)
+        except Exception as e:
+            return FastJsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncTaskDetailView(ReplicaReadMixin, ConditionalTaskMixin, View):
+    """Async API endpoint to get details of a specific task"""
+
+    available_fields = TaskDetailView.available_fields
+
+    async def get(self, request, task_id):
+        try:
+            fields = self.get_field_selection(request)
+        except FieldSelectionError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+
+        try:
+            ode_task = await aget_task_for_read(task_id)
+        except ODETask.DoesNotExist:
+            return FastJsonResponse({'error': 'Task not found'}, status=404)
+        return self.cacheable_response(TaskDetailView().build_response(ode_task, fields), ode_task, fields)
+
+
+class AsyncJobDetailView(View):
+    """Async API endpoint reporting job progress; long-polls without holding a thread"""
+
+    async def get(self, request, job_id):
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            return FastJsonResponse({'error': 'wait must be a number of seconds'}, status=400)
+
+        if wait > 0:
+            job = await jobs.await_update(job_id, wait)
+        else:
+            job = await Job.objects.filter(pk=job_id).afirst()
+        if job is None:
+            return FastJsonResponse({'error': 'Job not found'}, status=404)
+        return FastJsonResponse(jobs.job_payload(job))
@@ -0,0 +1,222 @@
+"""
+Write-behind log of verify attempts.
+
+``record`` appends an unsaved ``Attempt`` to an in-process buffer and
+returns at once, so the verify endpoints stay read-only. A daemon thread
+flushes the buffer when it holds ``BATCH_SIZE`` attempts or every
+``FLUSH_INTERVAL`` seconds, and once more at interpreter exit. A flush is
+one transaction: a ``bulk_create`` of the attempts, then one
+``AttemptStats`` update per task in the batch (``attempts + n``,
+``correct + k``), so per-task totals are maintained incrementally and
+never recomputed from the full history.
+
+If the database is unreachable the batch goes back into the buffer;
+beyond ``MAX_PENDING`` buffered attempts the oldest are dropped and
+counted in ``ode_solver_attempts_dropped_total``. Attempts buffered in a
+process that is killed with SIGKILL are lost.
+"""
+import atexit
+import os
+import threading
+from collections import defaultdict
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from . import metrics
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_PENDING': 100000,
+}
+
+MAX_CLIENT_LENGTH = 64
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_ATTEMPTS', {})}
+
+
+def as_submitted_integer(value) -> Optional[int]:
+    """The submitted answer as stored: an int, or None for anything else"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if -2 ** 63 <= value < 2 ** 63 else None
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 63:
+        return int(value)
+    return None
+
+
+class AttemptBuffer:
+    """Buffer of unsaved attempts with a background flusher"""
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 2.0,
+                 max_pending: int = 100000, using: str = DEFAULT_DB_ALIAS):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.max_pending = max(self.batch_size, int(max_pending))
+        self.using = using
+        self._pending: List = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, attempt):
+        self._ensure_started()
+        with self._lock:
+            self._pending.append(attempt)
+            size = len(self._pending)
+            if size > self.max_pending:
+                dropped = size - self.max_pending
+                del self._pending[:dropped]
+                metrics.ATTEMPTS_DROPPED.inc(dropped)
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ode-solver-attempts', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # flush() already requeued the batch; try again next round
+                pass
+            finally:
+                connections[self.using].close_if_unusable_or_obsolete()
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of attempts written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return written
+                try:
+                    try:
+                        self._write(batch)
+                    except IntegrityError:
+                        # Tasks deleted since the attempt was made; drop their attempts
+                        batch = self._without_deleted_tasks(batch)
+                        self._write(batch)
+                except Exception:
+                    with self._lock:
+                        self._pending[:0] = batch
+                    raise
+                written += len(batch)
+
+    def _without_deleted_tasks(self, batch):
+        from .models import ODETask
+
+        existing = set(ODETask.objects.using(self.using).filter(
+            pk__in={attempt.task_id for attempt in batch}
+        ).values_list('pk', flat=True))
+        kept = [attempt for attempt in batch if attempt.task_id in existing]
+        metrics.ATTEMPTS_DROPPED.inc(len(batch) - len(kept))
+        return kept
+
+    def _write(self, batch):
+        from .models import Attempt, AttemptStats
+
+        per_task = defaultdict(lambda: [0, 0, None, None])
+        for attempt in batch:
+            # A batch retried after a rolled-back flush may carry ids from that attempt
+            attempt.pk = None
+            totals = per_task[attempt.task_id]
+            totals[0] += 1
+            totals[1] += int(attempt.is_correct)
+            totals[2] = attempt.created_at if totals[2] is None else min(totals[2], attempt.created_at)
+            totals[3] = attempt.created_at if totals[3] is None else max(totals[3], attempt.created_at)
+
+        with transaction.atomic(using=self.using):
+            Attempt.objects.using(self.using).bulk_create(batch, batch_size=self.batch_size)
+            AttemptStats.objects.using(self.using).bulk_create(
+                [AttemptStats(task_id=task_id) for task_id in per_task], ignore_conflicts=True
+            )
+            for task_id, (count, correct, first, last) in per_task.items():
+                AttemptStats.objects.using(self.using).filter(task_id=task_id).update(
+                    attempts=F('attempts') + count,
+                    correct=F('correct') + correct,
+                    # COALESCE first: LEAST/GREATEST return NULL for NULL inputs on SQLite and MySQL
+                    first_attempt_at=Least(Coalesce('first_attempt_at', Value(first)), Value(first)),
+                    last_attempt_at=Greatest(Coalesce('last_attempt_at', Value(last)), Value(last)),
+                )
+
+    def reset(self):
+        """Forget buffered attempts and the flusher thread (used after fork)"""
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> AttemptBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = get_config()
+                _buffer = AttemptBuffer(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_pending=config['MAX_PENDING'],
+                )
+    return _buffer
+
+
+def record(task_id, submitted_solution, is_correct: bool, client: str = ''):
+    """Buffer one verify attempt; never touches the database"""
+    if not get_config()['ENABLED']:
+        return
+    from .models import Attempt
+
+    get_buffer().add(Attempt(
+        task_id=task_id,
+        submitted_solution=as_submitted_integer(submitted_solution),
+        is_correct=bool(is_correct),
+        client=client[:MAX_CLIENT_LENGTH],
+    ))
+
+
+def flush() -> int:
+    return _buffer.flush() if _buffer is not None else 0
+
+
+def _flush_at_exit():
+    if _buffer is not None and _buffer.pending():
+        try:
+            _buffer.flush()
+        except Exception:
+            pass
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, 'register_at_fork'):
+    # A forked child must neither write its parent's attempts twice nor wait on its threads
+    os.register_at_fork(after_in_child=lambda: _buffer is not None and _buffer.reset())
@@ -0,0 +1,270 @@
+"""
+Vectorized consistency audit of the task bank.
+
+Tasks are read in chunks with ``values_list`` (decimals cast to floats in
+the database, coefficients decoded from their JSON text) into NumPy
+arrays, and every derived field is recomputed for the whole chunk at once.
+
+The generator only produces rank-1 matrices A = a rᵀ, for which A² = λA
+with λ = tr(A). The exponential then collapses to
+
+    e^{At} = I + φ(t) A,    φ(t) = (e^{λt} - 1) / λ
+
+so u(t_f) = u0 + φ(t_f) A u0, and since u'(t) = e^{λt} A u0 the arc length
+is exactly |A u0| φ(t_f). Rows whose matrix is not rank-1 (custom tasks)
+fall back to ``scipy.linalg.expm`` and the generator's 1000-point
+trapezoid rule for the arc length.
+
+Checks per row:
+
+- ``malformed``: coefficients are not a 4x4 ``linear`` matrix, or inputs are not finite
+- ``missing``: stored results are missing
+- ``weighted_sum``: stored S differs from S of the stored final values
+- ``final_solution``: stored ℒ differs from ℒ of the stored S, L and κ
+- ``final_values``: stored u(t_f) differs from the exact solution
+- ``arc_length``: stored L differs from the exact arc length
+- ``answer``: stored ℒ differs from ℒ of the exact S and L
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+import numpy as np
+from django.db.models import FloatField, TextField
+from django.db.models.functions import Cast
+
+from . import scoring
+from .responses import loads
+
+DEFAULT_CHUNK_SIZE = 20000
+ARC_LENGTH_STEPS = 1000
+
+FLOAT_COLUMNS = (
+    'x0', 'y0', 'z0', 'w0', 'target_time',
+    'x_final', 'y_final', 'z_final', 'w_final',
+    'weighted_sum', 'arc_length', 'curvature',
+)
+
+
+@dataclass
+class Tolerances:
+    weighted_sum: float = 1e-9
+    final_values: float = 1e-6
+    arc_length: float = 1e-5
+    rank_one: float = 1e-9
+
+
+@dataclass
+class AuditSummary:
+    checked: int = 0
+    inconsistent: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, issues: Dict[str, np.ndarray], size: int):
+        self.checked += size
+        flagged = np.zeros(size, dtype=bool)
+        for name, mask in issues.items():
+            self.counts[name] = self.counts.get(name, 0) + int(mask.sum())
+            flagged |= mask
+        self.inconsistent += int(flagged.sum())
+
+
+@dataclass
+class Chunk:
+    ids: np.ndarray
+    matrices: np.ndarray
+    initial: np.ndarray
+    target_time: np.ndarray
+    finals: np.ndarray
+    weighted_sum: np.ndarray
+    arc_length: np.ndarray
+    curvature: np.ndarray
+    answer: np.ndarray
+    malformed: np.ndarray
+
+
+def _matrix(coefficients_text):
+    try:
+        coefficients = loads(coefficients_text) if isinstance(coefficients_text, (str, bytes)) else coefficients_text
+        if isinstance(coefficients, str):
+            coefficients = loads(coefficients)
+        matrix = np.asarray(coefficients['linear'], dtype=float)
+        if matrix.shape == (4, 4):
+            return matrix
+    except (TypeError, ValueError, KeyError, IndexError):
+        pass
+    return None
+
+
+def _to_float(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def iter_chunks(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """Yield the queryset as NumPy arrays, ``chunk_size`` tasks at a time"""
+    casts = {f'{name}_f': Cast(name, FloatField()) for name in FLOAT_COLUMNS}
+    rows = queryset.order_by('pk').values_list(
+        'pk', Cast('coefficients', TextField()), 'final_solution', *casts.values()
+    ).iterator(chunk_size=chunk_size)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield _build_chunk(batch)
+            batch = []
+    if batch:
+        yield _build_chunk(batch)
+
+
+def _build_chunk(rows) -> Chunk:
+    columns = list(zip(*rows))
+    size = len(rows)
+    matrices = np.zeros((size, 4, 4))
+    malformed = np.zeros(size, dtype=bool)
+    for i, text in enumerate(columns[1]):
+        matrix = _matrix(text)
+        if matrix is None:
+            malformed[i] = True
+        else:
+            matrices[i] = matrix
+    floats = np.column_stack([_to_float(column) for column in columns[3:]])
+    initial, target_time = floats[:, 0:4], floats[:, 4]
+    malformed |= ~np.isfinite(matrices).all(axis=(1, 2))
+    malformed |= ~np.isfinite(initial).all(axis=1) | ~np.isfinite(target_time) | (target_time <= 0)
+    return Chunk(
+        ids=np.asarray(columns[0], dtype=np.int64),
+        matrices=matrices,
+        initial=initial,
+        target_time=target_time,
+        finals=floats[:, 5:9],
+        weighted_sum=floats[:, 9],
+        arc_length=floats[:, 10],
+        curvature=np.nan_to_num(floats[:, 11]),
+        answer=_to_float(columns[2]),
+        malformed=malformed,
+    )
+
+
+def rank_one_solution(matrices, initial, target_time):
+    """Exact (u(t_f), arc length) for rank-1 systems, vectorized over the first axis"""
+    trace = np.einsum('nii->n', matrices)
+    lt = trace * target_time
+    small = np.abs(lt) < 1e-12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi = np.where(small, target_time, np.expm1(lt) / np.where(small, 1.0, trace))
+    velocity = np.einsum('nij,nj->ni', matrices, initial)
+    finals = initial + phi[:, None] * velocity
+    return finals, np.linalg.norm(velocity, axis=1) * phi
+
+
+def general_solution(matrices, initial, target_time, steps: int = ARC_LENGTH_STEPS):
+    """(u(t_f), arc length) for arbitrary matrices via expm, vectorized over the first axis"""
+    from scipy.linalg import expm
+
+    finals = np.einsum('nij,nj->ni', expm(matrices * target_time[:, None, None]), initial)
+    h = target_time / (steps - 1)
+    step = expm(matrices * h[:, None, None])
+    state = initial.copy()
+    total = np.zeros(len(initial))
+    first = last = None
+    for k in range(steps):
+        speed = np.linalg.norm(np.einsum('nij,nj->ni', matrices, state), axis=1)
+        total += speed
+        if k == 0:
+            first = speed
+        last = speed
+        state = np.einsum('nij,nj->ni', step, state)
+    return finals, h * (total - 0.5 * (first + last))
+
+
+def is_rank_one(matrices, tolerance: float) -> np.ndarray:
+    trace = np.einsum('nii->n', matrices)
+    residual = np.einsum('nij,njk->nik', matrices, matrices) - trace[:, None, None] * matrices
+    scale = np.maximum(1.0, np.abs(matrices).max(axis=(1, 2)) ** 2)
+    return np.abs(residual).max(axis=(1, 2)) <= tolerance * scale
+
+
+def _differs(stored, expected, rtol: float) -> np.ndarray:
+    return ~(np.abs(stored - expected) <= rtol * np.maximum(1.0, np.abs(expected)))
+
+
+def audit_chunk(chunk: Chunk, tolerances: Tolerances = Tolerances()):
+    """Return (issues, expected) where ``issues`` maps check name to a row mask"""
+    size = len(chunk.ids)
+    ok = ~chunk.malformed
+    exact_finals = np.full((size, 4), np.nan)
+    exact_arc = np.full(size, np.nan)
+
+    rank_one = ok & is_rank_one(chunk.matrices, tolerances.rank_one)
+    if rank_one.any():
+        exact_finals[rank_one], exact_arc[rank_one] = rank_one_solution(
+            chunk.matrices[rank_one], chunk.initial[rank_one], chunk.target_time[rank_one]
+        )
+    general = ok & ~rank_one
+    if general.any():
+        exact_finals[general], exact_arc[general] = general_solution(
+            chunk.matrices[general], chunk.initial[general], chunk.target_time[general]
+        )
+
+    stored = np.column_stack([chunk.finals, chunk.weighted_sum, chunk.arc_length, chunk.answer])
+    missing = ok & ~np.isfinite(stored).all(axis=1)
+    present = ok & ~missing
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        exact_sum = scoring.weighted_sums(exact_finals)
+        exact_answer = scoring.final_solutions(exact_sum, exact_arc, chunk.curvature)
+        margin = scoring.rounding_margins(exact_sum, exact_arc, chunk.curvature)
+        stored_answer = scoring.final_solutions(chunk.weighted_sum, chunk.arc_length, chunk.curvature)
+        issues = {
+            'malformed': chunk.malformed,
+            'missing': missing,
+            'weighted_sum': present & _differs(
+                chunk.weighted_sum, scoring.weighted_sums(chunk.finals), tolerances.weighted_sum
+            ),
+            'final_solution': present & (chunk.answer != stored_answer),
+            'final_values': present & _differs(chunk.finals, exact_finals, tolerances.final_values).any(axis=1),
+            'arc_length': present & _differs(chunk.arc_length, exact_arc, tolerances.arc_length),
+            'answer': present & (chunk.answer != exact_answer),
+        }
+    expected = {
+        'final_values': exact_finals,
+        'weighted_sum': exact_sum,
+        'arc_length': exact_arc,
+        'final_solution': exact_answer,
+        'rounding_margin': margin,
+    }
+    return issues, expected
+
+
+def _clean(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def report_rows(chunk: Chunk, issues, expected) -> List[dict]:
+    """One report entry per inconsistent row of the chunk"""
+    flagged = np.zeros(len(chunk.ids), dtype=bool)
+    for mask in issues.values():
+        flagged |= mask
+    rows = []
+    for i in np.flatnonzero(flagged):
+        rows.append({
+            'task_id': int(chunk.ids[i]),
+            'issues': [name for name, mask in issues.items() if mask[i]],
+            'stored': {
+                'final_values': [_clean(v) for v in chunk.finals[i]],
+                'weighted_sum': _clean(chunk.weighted_sum[i]),
+                'arc_length': _clean(chunk.arc_length[i]),
+                'final_solution': None if np.isnan(chunk.answer[i]) else int(chunk.answer[i]),
+            },
+            'expected': {
+                'final_values': [_clean(v) for v in expected['final_values'][i]],
+                'weighted_sum': _clean(expected['weighted_sum'][i]),
+                'arc_length': _clean(expected['arc_length'][i]),
+                'final_solution': (
+                    int(expected['final_solution'][i]) if not chunk.malformed[i] else None
+                ),
+                'rounding_margin': _clean(expected['rounding_margin'][i]),
+            },
+        })
+    return rows
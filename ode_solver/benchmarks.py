@@ -0,0 +1,391 @@
+"""
+Micro- and macro-benchmarks for the task pipeline.
+
+Micro benchmarks time the pieces of ``services.py`` on inputs drawn from a
+fixed seed: coefficient generation, ``_solve_system`` with every
+``solve_ivp`` method in ``SOLVER_METHODS`` (selected through
+``ODE_SOLVER_SETTINGS['METHOD']``), the arc-length quadrature and the two
+LaTeX formatters. View benchmarks drive generate, verify and solution
+through the Django test client against a throwaway test database.
+
+Every benchmark is calibrated to run at least ``min_time`` seconds per
+round, the RNGs are reseeded before each round, and the per-call median,
+mean, min and standard deviation over ``rounds`` rounds are reported.
+Results are plain JSON, so a run can be saved as a baseline and later runs
+compared against it with ``compare`` (``manage.py benchmark --baseline``).
+"""
+import contextlib
+import datetime
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .services import SOLVER_METHODS
+
+DEFAULT_SEED = 20240601
+DEFAULT_ROUNDS = 7
+DEFAULT_MIN_TIME = 0.1
+DEFAULT_THRESHOLD = 0.2
+MAX_ITERATIONS = 1_000_000
+RESULTS_VERSION = 1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    # Called once after seeding; returns the function that is timed
+    setup: Callable[[], Callable[[], object]]
+
+
+@dataclass
+class Result:
+    name: str
+    group: str
+    iterations: int
+    rounds: int
+    median: float
+    mean: float
+    min: float
+    stdev: float
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[float]
+    current: Optional[float]
+    threshold: float
+
+    @property
+    def change(self) -> Optional[float]:
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline - 1
+
+    @property
+    def status(self) -> str:
+        if self.baseline is None:
+            return 'new'
+        if self.current is None:
+            return 'missing'
+        if self.change > self.threshold:
+            return 'regression'
+        if self.change < -self.threshold:
+            return 'improvement'
+        return 'ok'
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str = 'micro'):
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, group, setup))
+        return setup
+    return register
+
+
+def seed_all(seed: int):
+    import numpy as np
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Discard the solver's DEBUG prints while timing"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _sample_task():
+    """A solvable generated task, the same one for a given seed"""
+    from .services import ODEGenerator
+
+    with quiet():
+        task = ODEGenerator().generate_valid_ode_task()
+    if task is None:
+        raise RuntimeError('Could not generate a sample task')
+    ic = task['initial_conditions']
+    return task, (ic['x0'], ic['y0'], ic['z0'], ic['w0'])
+
+
+@benchmark('generate_coefficients')
+def _generate_coefficients():
+    from .services import ODEGenerator
+
+    return ODEGenerator()._generate_coefficients
+
+
+def _solve_system_benchmark(method: str):
+    def setup():
+        from django.test import override_settings
+        from django.conf import settings
+        from .services import ODEGenerator
+
+        task, initial_conditions = _sample_task()
+        generator = ODEGenerator()
+        solver_settings = {**getattr(settings, 'ODE_SOLVER_SETTINGS', {}), 'METHOD': method}
+
+        def run():
+            with override_settings(ODE_SOLVER_SETTINGS=solver_settings):
+                return generator._solve_system(task['coefficients'], initial_conditions, task['target_time'])
+        return run
+    return setup
+
+
+for _method in SOLVER_METHODS:
+    benchmark(f'solve_system[{_method}]')(_solve_system_benchmark(_method))
+
+
+@benchmark('solve_system[closed_form]')
+def _closed_form():
+    from .validation import rank_one_results
+
+    task, initial_conditions = _sample_task()
+    linear = task['coefficients']['linear']
+    return lambda: rank_one_results(linear, initial_conditions, task['target_time'])
+
+
+@benchmark('arc_length')
+def _arc_length():
+    from scipy.integrate import solve_ivp
+    from .services import compute_arc_length
+
+    task, initial_conditions = _sample_task()
+    linear = task['coefficients']['linear']
+    sol = solve_ivp(lambda t, u: [sum(a * b for a, b in zip(row, u)) for row in linear],
+                    [0, task['target_time']], initial_conditions, rtol=1e-9, atol=1e-9, dense_output=True)
+    return lambda: compute_arc_length(sol.sol, task['target_time'])
+
+
+@benchmark('format_equation_latex')
+def _format_equation_latex():
+    from .services import format_equation_latex
+
+    task, _ = _sample_task()
+    coefficients = task['coefficients']
+    return lambda: [format_equation_latex(coefficients, var) for var in 'xyzw']
+
+
+@benchmark('format_latex_solution')
+def _format_latex_solution():
+    from .services import format_latex_solution
+
+    task, _ = _sample_task()
+    return lambda: format_latex_solution(
+        task['coefficients'], task['initial_conditions'], task['target_time'], task['solution']
+    )
+
+
+def _stored_task():
+    from .models import ODETask
+    from .sqlite_tuning import save_task
+
+    task, _ = _sample_task()
+    return save_task(ODETask.from_task_data(task))
+
+
+@benchmark('view_generate', group='views')
+def _view_generate():
+    from django.test import Client
+
+    client = Client()
+    return lambda: client.get('/api/generate/')
+
+
+@benchmark('view_verify', group='views')
+def _view_verify():
+    from django.test import Client
+    from .responses import dumps
+
+    client = Client()
+    ode_task = _stored_task()
+    body = dumps({'task_id': ode_task.pk, 'solution': ode_task.final_solution})
+    return lambda: client.post('/api/verify/', body, content_type='application/json')
+
+
+@benchmark('view_solution', group='views')
+def _view_solution():
+    from django.test import Client
+
+    client = Client()
+    path = f'/api/task/{_stored_task().pk}/solution/'
+    return lambda: client.get(path)
+
+
+def select(names: Iterable[str] = (), groups: Iterable[str] = ()) -> List[Benchmark]:
+    """Benchmarks whose name contains any of ``names`` and whose group is in ``groups``"""
+    names, groups = list(names), list(groups)
+    return [
+        bench for bench in BENCHMARKS
+        if (not names or any(name in bench.name for name in names))
+        and (not groups or bench.group in groups)
+    ]
+
+
+def _time(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return time.perf_counter() - start
+
+
+def measure(bench: Benchmark, seed: int = DEFAULT_SEED, rounds: int = DEFAULT_ROUNDS,
+            min_time: float = DEFAULT_MIN_TIME) -> Result:
+    seed_all(seed)
+    func = bench.setup()
+    with quiet():
+        iterations = 1
+        while iterations < MAX_ITERATIONS:
+            seed_all(seed)
+            elapsed = _time(func, iterations)
+            if elapsed >= min_time:
+                break
+            iterations = min(MAX_ITERATIONS, max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9))))
+        samples = []
+        for _ in range(max(1, rounds)):
+            seed_all(seed)
+            samples.append(_time(func, iterations) / iterations)
+    return Result(
+        name=bench.name,
+        group=bench.group,
+        iterations=iterations,
+        rounds=len(samples),
+        median=statistics.median(samples),
+        mean=statistics.fmean(samples),
+        min=min(samples),
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    )
+
+
+@contextlib.contextmanager
+def test_database(on_disk: bool = False):
+    """Create a throwaway test database for the default alias and drop it afterwards.
+
+    ``on_disk`` puts a SQLite test database in a temporary file instead of
+    shared-cache memory, whose table locks fail at once under concurrent
+    writers instead of waiting like a real database file.
+    """
+    import tempfile
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    saved_name = test_settings.get('NAME')
+    with contextlib.ExitStack() as stack:
+        if on_disk and connection.vendor == 'sqlite':
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+            test_settings['NAME'] = os.path.join(directory, 'test.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings['NAME'] = saved_name
+
+
+@contextlib.contextmanager
+def view_environment():
+    """Test database and settings for the view benchmarks.
+
+    Admission limits, the attempt log, profiling and read replicas are off,
+    and tasks are saved inline rather than through the SQLite writer thread,
+    so each request is timed on its own.
+    """
+    from django.conf import settings
+    from django.test import override_settings
+
+    def overridden(name, **values):
+        return {**getattr(settings, name, {}), **values}
+
+    with test_database(), override_settings(
+        ODE_SOLVER_ADMISSION=overridden('ODE_SOLVER_ADMISSION', ENABLED=False),
+        ODE_SOLVER_ATTEMPTS=overridden('ODE_SOLVER_ATTEMPTS', ENABLED=False),
+        ODE_SOLVER_PROFILING=overridden('ODE_SOLVER_PROFILING', ENABLED=False),
+        ODE_SOLVER_READ_REPLICAS=overridden('ODE_SOLVER_READ_REPLICAS', ALIASES=[]),
+        ODE_SOLVER_SQLITE=overridden('ODE_SOLVER_SQLITE', WRITE_QUEUE=False),
+    ):
+        yield
+
+
+def environment() -> dict:
+    import django
+    import numpy
+    import scipy
+
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'django': django.get_version(),
+        'numpy': numpy.__version__,
+        'scipy': scipy.__version__,
+    }
+
+
+def run(benchmarks: List[Benchmark], seed: int = DEFAULT_SEED, rounds: int = DEFAULT_ROUNDS,
+        min_time: float = DEFAULT_MIN_TIME, progress: Callable[[Result], None] = None) -> dict:
+    """Run ``benchmarks`` and return the JSON-serializable results document"""
+    results = {}
+
+    def run_group(items):
+        for bench in items:
+            result = measure(bench, seed=seed, rounds=rounds, min_time=min_time)
+            results[bench.name] = asdict(result)
+            if progress is not None:
+                progress(result)
+
+    run_group([bench for bench in benchmarks if bench.group != 'views'])
+    views = [bench for bench in benchmarks if bench.group == 'views']
+    if views:
+        with view_environment():
+            run_group(views)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': environment(),
+        'config': {'seed': seed, 'rounds': rounds, 'min_time': min_time},
+        'benchmarks': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            thresholds: Optional[Dict[str, float]] = None, stat: str = 'median') -> List[Comparison]:
+    """Compare two results documents; ``thresholds`` overrides the relative threshold per benchmark"""
+    thresholds = thresholds or {}
+    names = list(current['benchmarks']) + [
+        name for name in baseline['benchmarks'] if name not in current['benchmarks']
+    ]
+    comparisons = []
+    for name in names:
+        before = baseline['benchmarks'].get(name)
+        after = current['benchmarks'].get(name)
+        comparisons.append(Comparison(
+            name=name,
+            baseline=before[stat] if before else None,
+            current=after[stat] if after else None,
+            threshold=thresholds.get(name, threshold),
+        ))
+    return comparisons
+
+
+def format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if value >= scale:
+            return f"{value / scale:.3g} {unit}"
+    return f"{value / 1e-9:.3g} ns"
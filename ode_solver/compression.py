@@ -0,0 +1,171 @@
+"""
+Negotiated response compression for the API.
+
+``CompressionMiddleware`` compresses JSON and text responses of at least
+``MIN_SIZE`` bytes with brotli (when the ``brotli`` package is installed)
+or gzip, whichever the client's ``Accept-Encoding`` prefers. Solution
+payloads are mostly repeated LaTeX and shrink several times over.
+
+Immutable responses (``Cache-Control: immutable`` with a strong ETag, i.e.
+task details and solutions) are compressed once per process: the
+compressed bytes are kept in a bounded LRU keyed by path, ETag and
+encoding, so repeat fetches only pay for a dictionary lookup. Compressed
+responses get a weak ETag, as Django's ``GZipMiddleware`` does, which
+still matches the plain ETag on revalidation.
+"""
+import gzip
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    # Total bytes of compressed immutable payloads kept per process
+    'CACHE_MAX_BYTES': 32 * 1024 * 1024,
+    'PATH_PREFIXES': ('/api/',),
+}
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+_ACCEPT_RE = re.compile(r'^\s*([^;\s]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_COMPRESSION', {})}
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding: str):
+    """Best supported encoding for an ``Accept-Encoding`` header, or None"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = _ACCEPT_RE.match(part)
+        if not match:
+            continue
+        try:
+            weights[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+    best, best_weight = None, 0.0
+    for encoding in available_encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(content: bytes, encoding: str, config) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+class CompressedCache:
+    """Thread-safe LRU of compressed bodies, bounded by total size"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes, max_bytes: int):
+        if len(body) > max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CACHE = CompressedCache()
+
+
+def _is_immutable(response) -> bool:
+    etag = response.get('ETag', '')
+    return etag.startswith('"') and 'immutable' in response.get('Cache-Control', '')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress large API responses; place near the top of MIDDLEWARE"""
+
+    def process_response(self, request, response):
+        config = get_config()
+        if not config['ENABLED'] or response.streaming:
+            return response
+        if not request.path.startswith(tuple(config['PATH_PREFIXES'])):
+            return response
+        # Also on 304s and small bodies, so caches keep the variants apart
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not self._eligible(response, config):
+            return response
+
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        content = response.content
+        if _is_immutable(response):
+            key = (request.path, response['ETag'], encoding)
+            body = CACHE.get(key)
+            if body is None:
+                body = compress(content, encoding, config)
+                CACHE.put(key, body, config['CACHE_MAX_BYTES'])
+        else:
+            body = compress(content, encoding, config)
+        if len(body) >= len(content):
+            return response
+
+        response.content = body
+        response.headers['Content-Length'] = str(len(body))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def _eligible(self, response, config) -> bool:
+        return (
+            response.status_code == 200
+            and not response.has_header('Content-Encoding')
+            and response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+            and len(response.content) >= config['MIN_SIZE']
+        )
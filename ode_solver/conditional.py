@@ -0,0 +1,123 @@
+"""
+HTTP validators and caching headers for immutable task resources.
+
+Task detail and solution payloads never change once a task is created, so
+they carry a strong ETag built from the task's content hash and
+``updated_at`` plus a long ``Cache-Control`` lifetime. Revalidation
+requests (``If-None-Match`` / ``If-Modified-Since``) are answered with a
+304 after a two-column lookup, without loading the task or formatting its
+LaTeX.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .fields import ALL_FIELDS, FieldSelection, FieldSelectionError
+from .responses import FastJsonResponse
+
+DEFAULTS = {
+    'MAX_AGE': 60 * 60 * 24 * 365,
+}
+
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_HTTP_CACHE', {})}
+
+
+def task_etag(content_hash: str, updated_at, variant: str = '') -> str:
+    """Strong ETag; ``variant`` distinguishes ``?fields=`` representations"""
+    tag = f"{content_hash[:32]}-{int(updated_at.timestamp() * 1_000_000):x}"
+    if variant:
+        tag += '-' + hashlib.sha1(variant.encode('utf-8')).hexdigest()[:8]
+    return f'"{tag}"'
+
+
+def get_task_validators(task_id, variant: str = ''):
+    """(etag, last_modified) for a task without loading the full row, or None"""
+    from .models import ODETask
+
+    row = ODETask.objects.filter(pk=task_id).values_list('content_hash', 'updated_at').first()
+    if row is None or not row[0]:
+        return None
+    content_hash, updated_at = row
+    return task_etag(content_hash, updated_at, variant), updated_at
+
+
+def patch_immutable_headers(response, etag: str, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, public=True, max_age=get_config()['MAX_AGE'], immutable=True)
+    return response
+
+
+class ConditionalTaskMixin:
+    """Answer conditional GETs for ``task_id`` resources with 304 before the view runs.
+
+    Views build their 200 responses through ``cacheable_response`` so the
+    same validators are attached to them. Views that declare
+    ``available_fields`` accept ``?fields=`` / ``?exclude=``, and each
+    selection gets its own ETag.
+    """
+
+    available_fields = None
+
+    def get_field_selection(self, request) -> FieldSelection:
+        if self.available_fields is None:
+            return ALL_FIELDS
+        return FieldSelection.from_request(request, self.available_fields)
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(self, 'view_is_async', False):
+            return self._conditional_dispatch(request, *args, **kwargs)
+        if self._wants_revalidation(request, kwargs):
+            validators = get_task_validators(kwargs['task_id'], self._etag_variant(request))
+            response = self._not_modified(request, validators)
+            if response is not None:
+                return response
+        return super().dispatch(request, *args, **kwargs)
+
+    async def _conditional_dispatch(self, request, *args, **kwargs):
+        if self._wants_revalidation(request, kwargs):
+            validators = await sync_to_async(get_task_validators)(
+                kwargs['task_id'], self._etag_variant(request)
+            )
+            response = self._not_modified(request, validators)
+            if response is not None:
+                return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    def _wants_revalidation(self, request, kwargs) -> bool:
+        return (
+            request.method in ('GET', 'HEAD')
+            and 'task_id' in kwargs
+            and any(header in request.META for header in CONDITIONAL_HEADERS)
+        )
+
+    def _etag_variant(self, request) -> str:
+        try:
+            return self.get_field_selection(request).variant()
+        except FieldSelectionError:
+            return '\0invalid'
+
+    def _not_modified(self, request, validators):
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp())
+        )
+        if response is not None:
+            patch_immutable_headers(response, etag, last_modified)
+        return response
+
+    def cacheable_response(self, data, ode_task, fields: FieldSelection = ALL_FIELDS):
+        response = FastJsonResponse(data)
+        if ode_task.content_hash:
+            etag = task_etag(ode_task.content_hash, ode_task.updated_at, fields.variant())
+            patch_immutable_headers(response, etag, ode_task.updated_at)
+        return response
@@ -0,0 +1,154 @@
+"""
+Read-replica routing for the read-only task endpoints.
+
+Views that only read (task detail, solution, verify) wrap their work in
+``replica_reads()``; while that context is active ``ReadReplicaRouter``
+sends ``ode_solver`` reads to one of the aliases listed in
+``ODE_SOLVER_READ_REPLICAS['ALIASES']``. Everything else, including all
+writes, stays on the primary.
+
+Tasks that were just created are pinned to the primary for
+``STICKY_SECONDS`` so a client can read its own write before replication
+catches up. Pins live in the Django cache, so configure a shared cache
+backend when running several worker processes. A task that is missing on
+the chosen replica is re-read from the primary as a last resort.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+DEFAULTS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 30,
+}
+
+_read_alias = contextvars.ContextVar('ode_solver_read_alias', default=None)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_READ_REPLICAS', {})}
+
+
+def get_replica_aliases() -> List[str]:
+    """Configured replica aliases that actually exist in ``DATABASES``"""
+    return [alias for alias in get_config()['ALIASES'] if alias in settings.DATABASES]
+
+
+def _pin_key(task_id) -> str:
+    return f"ode_solver:primary_pin:{task_id}"
+
+
+def pin_to_primary(task_id):
+    """Route reads of ``task_id`` to the primary until replicas have caught up"""
+    if get_replica_aliases():
+        cache.set(_pin_key(task_id), True, get_config()['STICKY_SECONDS'])
+
+
+def is_pinned(task_id) -> bool:
+    return bool(cache.get(_pin_key(task_id)))
+
+
+def choose_read_alias(task_id=None) -> Optional[str]:
+    """Pick a replica for this read, or ``None`` when the primary must be used"""
+    aliases = get_replica_aliases()
+    if not aliases:
+        return None
+    if task_id is not None and is_pinned(task_id):
+        return None
+    return random.choice(aliases)
+
+
+@contextmanager
+def replica_reads(task_id=None, alias=...):
+    """Send ``ode_solver`` reads inside this block to a replica"""
+    if alias is ...:
+        alias = choose_read_alias(task_id)
+    token = _read_alias.set(alias)
+    try:
+        yield _read_alias.get()
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Force reads inside this block back to the primary"""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def get_task_for_read(task_id, queryset=None):
+    """Fetch a task honouring replica routing, pins and replica lag"""
+    from .models import ODETask
+
+    queryset = queryset if queryset is not None else ODETask.objects.all()
+    if _read_alias.get() is None or is_pinned(task_id):
+        with primary_reads():
+            return queryset.get(pk=task_id)
+    try:
+        return queryset.get(pk=task_id)
+    except ODETask.DoesNotExist:
+        with primary_reads():
+            return queryset.using(DEFAULT_DB_ALIAS).get(pk=task_id)
+
+
+async def aget_task_for_read(task_id, queryset=None):
+    """Async counterpart of ``get_task_for_read``"""
+    from .models import ODETask
+
+    queryset = queryset if queryset is not None else ODETask.objects.all()
+    if _read_alias.get() is None or await sync_to_async(is_pinned)(task_id):
+        with primary_reads():
+            return await queryset.aget(pk=task_id)
+    try:
+        return await queryset.aget(pk=task_id)
+    except ODETask.DoesNotExist:
+        with primary_reads():
+            return await queryset.using(DEFAULT_DB_ALIAS).aget(pk=task_id)
+
+
+class ReadReplicaRouter:
+    """Route ``ode_solver`` reads to a replica while ``replica_reads()`` is active"""
+
+    app_label = 'ode_solver'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaReadMixin:
+    """View mixin running the whole request under ``replica_reads()``"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(self, 'view_is_async', False):
+            return self._replica_dispatch(request, *args, **kwargs)
+        with replica_reads(kwargs.get('task_id')):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _replica_dispatch(self, request, *args, **kwargs):
+        alias = await sync_to_async(choose_read_alias)(kwargs.get('task_id'))
+        with replica_reads(alias=alias):
+            return await super().dispatch(request, *args, **kwargs)
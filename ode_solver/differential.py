@@ -0,0 +1,329 @@
+"""
+Differential testing of ``ODEGenerator._solve_system`` against exact references.
+
+Random systems are drawn in batches, each batch from its own seed
+(``seed``, batch index), so a run is reproducible whatever the number of
+worker processes. Three kinds of system are drawn:
+
+- ``generator``: matrices, initial conditions and target times distributed
+  exactly as ``generate_valid_ode_task`` draws them
+- ``rank_one``: A = a rᵀ over a wider range of scales and target times
+- ``general``: full-rank matrices, to cover custom tasks
+
+Every system goes through ``validation.screen`` first (the API never
+solves what it rejects), then through ``_solve_system``, and is compared
+with the reference the audit uses: the closed form for rank-1 matrices,
+``expm`` otherwise. Final values and arc length must agree within the
+audit's relative tolerances plus ``ERROR_FACTOR`` times the ``rtol`` the
+solver settled on for the task (relative to the largest component), and
+the answer ℒ must match unless |S| + L lies within ``ambiguous_margin`` of
+a rounding boundary, where two correct solvers may legitimately disagree.
+
+Failing systems are shrunk greedily: entries are zeroed, rounded or
+simplified for as long as the same check keeps failing, which leaves a
+small reproducer that can be posted to ``/api/create_custom/`` as is.
+"""
+import contextlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from . import audit, scoring
+
+KINDS = ('generator', 'rank_one', 'general')
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_AMBIGUOUS_MARGIN = 1e-4
+MAX_SHRINK_CHECKS = 300
+STATUSES = ('ok', 'ambiguous', 'mismatch', 'solver_failed', 'screened')
+
+
+@dataclass
+class Tolerances:
+    final_values: float = audit.Tolerances.final_values
+    arc_length: float = audit.Tolerances.arc_length
+    rank_one: float = audit.Tolerances.rank_one
+    ambiguous_margin: float = DEFAULT_AMBIGUOUS_MARGIN
+
+
+@dataclass
+class System:
+    kind: str
+    linear: List[List[float]]
+    initial_conditions: List[float]
+    target_time: float
+
+    def as_request(self) -> dict:
+        """Body for ``/api/create_custom/``"""
+        return {
+            'coefficients': {'linear': self.linear},
+            'initial_conditions': dict(zip(('x0', 'y0', 'z0', 'w0'), self.initial_conditions)),
+            'target_time': self.target_time,
+        }
+
+
+@dataclass
+class Outcome:
+    status: str
+    checks: List[str] = field(default_factory=list)
+    solver: Optional[dict] = None
+    reference: Optional[dict] = None
+
+
+@dataclass
+class Failure:
+    index: int
+    system: System
+    outcome: Outcome
+    shrunk: Optional[System] = None
+    shrunk_outcome: Optional[Outcome] = None
+
+    def as_dict(self) -> dict:
+        entry = {
+            'index': self.index,
+            'kind': self.system.kind,
+            'status': self.outcome.status,
+            'checks': self.outcome.checks,
+            'system': self.system.as_request(),
+            'solver': self.outcome.solver,
+            'reference': self.outcome.reference,
+        }
+        if self.shrunk is not None:
+            entry['shrunk'] = {
+                'system': self.shrunk.as_request(),
+                'checks': self.shrunk_outcome.checks,
+                'solver': self.shrunk_outcome.solver,
+                'reference': self.shrunk_outcome.reference,
+            }
+        return entry
+
+
+@dataclass
+class BatchResult:
+    counts: Dict[str, int]
+    failures: List[Failure]
+
+
+def draw_systems(seed: int, batch: int, size: int, kinds: Sequence[str] = KINDS) -> List[System]:
+    """``size`` systems of batch ``batch``; the same arguments always give the same systems"""
+    from .matrix_quality import sample_generator_matrices
+
+    rng = np.random.default_rng([seed, batch])
+    systems = []
+    for offset in range(size):
+        kind = kinds[(batch * size + offset) % len(kinds)]
+        if kind == 'generator':
+            matrix = sample_generator_matrices(1, rng)[0]
+            initial = rng.uniform(-1, 1, 4)
+            target_time = rng.uniform(0.1, 2.0)
+        elif kind == 'rank_one':
+            target_time = rng.uniform(0.1, 5.0)
+            a, r = rng.normal(size=4), rng.normal(size=4)
+            # Spread ‖A‖·t_f log-uniformly over [0.01, 10]
+            scale = 10 ** rng.uniform(-2, 1) / (np.linalg.norm(a) * np.linalg.norm(r) * target_time)
+            matrix = np.outer(a, r) * scale
+            initial = rng.uniform(-5, 5, 4)
+        else:
+            target_time = rng.uniform(0.1, 5.0)
+            matrix = rng.normal(size=(4, 4))
+            matrix *= 10 ** rng.uniform(-2, np.log10(8)) / (np.linalg.norm(matrix) * target_time)
+            initial = rng.uniform(-5, 5, 4)
+        systems.append(System(kind, matrix.tolist(), initial.tolist(), float(target_time)))
+    return systems
+
+
+def references(systems: Sequence[System], tolerances: Tolerances) -> dict:
+    """Exact final values, arc length, S, ℒ and rounding margin for every system, vectorized"""
+    matrices = np.array([system.linear for system in systems], dtype=float)
+    initial = np.array([system.initial_conditions for system in systems], dtype=float)
+    target_time = np.array([system.target_time for system in systems], dtype=float)
+    finals = np.empty((len(systems), 4))
+    arc_length = np.empty(len(systems))
+    rank_one = audit.is_rank_one(matrices, tolerances.rank_one)
+    if rank_one.any():
+        finals[rank_one], arc_length[rank_one] = audit.rank_one_solution(
+            matrices[rank_one], initial[rank_one], target_time[rank_one]
+        )
+    if (~rank_one).any():
+        finals[~rank_one], arc_length[~rank_one] = audit.general_solution(
+            matrices[~rank_one], initial[~rank_one], target_time[~rank_one]
+        )
+    weighted_sum = scoring.weighted_sums(finals)
+    return {
+        'final_values': finals,
+        'arc_length': arc_length,
+        'weighted_sum': weighted_sum,
+        'final_solution': scoring.final_solutions(weighted_sum, arc_length),
+        'rounding_margin': scoring.rounding_margins(weighted_sum, arc_length),
+        'rank_one': rank_one,
+    }
+
+
+def _differs(value, expected, rtol: float, atol: float = 0.0) -> bool:
+    return not np.all(np.abs(np.asarray(value) - expected) <= rtol * np.maximum(1.0, np.abs(expected)) + atol)
+
+
+def compare(solution: Optional[dict], reference: dict, i: int, tolerances: Tolerances) -> Outcome:
+    from .services import solver_settings
+
+    expected = {
+        'final_values': reference['final_values'][i].tolist(),
+        'arc_length': float(reference['arc_length'][i]),
+        'final_solution': int(reference['final_solution'][i]),
+        'rounding_margin': float(reference['rounding_margin'][i]),
+        'closed_form': bool(reference['rank_one'][i]),
+    }
+    if solution is None:
+        return Outcome('solver_failed', ['solver'], None, expected)
+    # The solver only tightens its tolerances when the answer needs it, so
+    # allow its global error, which scales with the whole state vector
+    solver_error = solver_settings()['ERROR_FACTOR'] * solution['rtol']
+    checks = []
+    if _differs(solution['final_values'], reference['final_values'][i], tolerances.final_values,
+                solver_error * np.abs(reference['final_values'][i]).max()):
+        checks.append('final_values')
+    if _differs(solution['arc_length'], reference['arc_length'][i], tolerances.arc_length,
+                solver_error * reference['arc_length'][i]):
+        checks.append('arc_length')
+    answer_differs = solution['final_solution'] != expected['final_solution']
+    solver = {key: solution[key] for key in ('final_values', 'arc_length', 'final_solution', 'rtol', 'atol')}
+    if answer_differs and expected['rounding_margin'] >= tolerances.ambiguous_margin:
+        checks.append('final_solution')
+    if checks:
+        return Outcome('mismatch', checks, solver, expected)
+    return Outcome('ambiguous' if answer_differs else 'ok', [], solver, expected)
+
+
+def check_systems(systems: Sequence[System], tolerances: Tolerances) -> List[Outcome]:
+    """Screen, solve and compare each system"""
+    from .services import ODEGenerator
+    from .validation import ValidationError, screen
+
+    outcomes: List[Optional[Outcome]] = [None] * len(systems)
+    solvable = []
+    for i, system in enumerate(systems):
+        try:
+            screen(system.linear, tuple(system.initial_conditions), system.target_time)
+        except ValidationError as e:
+            outcomes[i] = Outcome('screened', [e.field])
+        else:
+            solvable.append(i)
+    if not solvable:
+        return outcomes
+
+    reference = references([systems[i] for i in solvable], tolerances)
+    generator = ODEGenerator()
+    for position, i in enumerate(solvable):
+        system = systems[i]
+        solution = generator._solve_system(
+            {'linear': system.linear}, tuple(system.initial_conditions), system.target_time
+        )
+        outcomes[i] = compare(solution, reference, position, tolerances)
+    return outcomes
+
+
+def run_batch(seed: int, batch: int, size: int, kinds: Sequence[str], tolerances: Tolerances) -> BatchResult:
+    systems = draw_systems(seed, batch, size, kinds)
+    counts = dict.fromkeys(STATUSES, 0)
+    failures = []
+    for offset, (system, outcome) in enumerate(zip(systems, check_systems(systems, tolerances))):
+        counts[outcome.status] += 1
+        if outcome.status in ('mismatch', 'solver_failed'):
+            failures.append(Failure(batch * size + offset, system, outcome))
+    return BatchResult(counts, failures)
+
+
+def _simplifications(system: System) -> Iterator[System]:
+    """Candidate systems that are simpler than ``system`` in one respect"""
+    def variant(linear=None, initial=None, target_time=None):
+        return System(
+            system.kind,
+            linear if linear is not None else [row[:] for row in system.linear],
+            initial if initial is not None else system.initial_conditions[:],
+            target_time if target_time is not None else system.target_time,
+        )
+
+    for digits in (0, 1, 2, 3):
+        rounded = round(system.target_time, digits)
+        if 0 < rounded != system.target_time:
+            yield variant(target_time=rounded)
+    for i, value in enumerate(system.initial_conditions):
+        for simpler in (0.0, float(round(value)), round(value, 2)):
+            if simpler != value:
+                initial = system.initial_conditions[:]
+                initial[i] = simpler
+                yield variant(initial=initial)
+    for digits in (1, 2, 3, 4, 6):
+        linear = [[round(value, digits) for value in row] for row in system.linear]
+        if linear != system.linear:
+            yield variant(linear=linear)
+    for i in range(4):
+        for j in range(4):
+            if system.linear[i][j] != 0:
+                linear = [row[:] for row in system.linear]
+                linear[i][j] = 0.0
+                yield variant(linear=linear)
+
+
+def shrink(system: System, outcome: Outcome, tolerances: Tolerances,
+           max_checks: int = MAX_SHRINK_CHECKS):
+    """Greedily simplify a failing system while any of its failed checks keeps failing"""
+    failed = set(outcome.checks)
+    checks = 0
+    improved = True
+    while improved and checks < max_checks:
+        improved = False
+        for candidate in _simplifications(system):
+            if checks >= max_checks:
+                break
+            checks += 1
+            candidate_outcome = check_systems([candidate], tolerances)[0]
+            if candidate_outcome.status in ('mismatch', 'solver_failed') and failed & set(candidate_outcome.checks):
+                system, outcome = candidate, candidate_outcome
+                improved = True
+                break
+    return system, outcome
+
+
+@contextlib.contextmanager
+def solver_method(method: Optional[str]):
+    """Run ``_solve_system`` with another ``solve_ivp`` method"""
+    if not method:
+        yield
+        return
+    from django.conf import settings
+    from django.test import override_settings
+
+    with override_settings(ODE_SOLVER_SETTINGS={**getattr(settings, 'ODE_SOLVER_SETTINGS', {}), 'METHOD': method}):
+        yield
+
+
+def _init_worker(method: Optional[str]):
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    # The solver's DEBUG prints would flood the terminal
+    sys.stdout = open(os.devnull, 'w')
+    solver_method(method).__enter__()
+
+
+def run(total: int, seed: int = 0, kinds: Sequence[str] = KINDS, tolerances: Tolerances = Tolerances(),
+        batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1,
+        method: Optional[str] = None) -> Iterator[BatchResult]:
+    """Check ``total`` systems, yielding each batch's result as it completes"""
+    batches = [
+        (seed, batch, min(batch_size, total - batch * batch_size), tuple(kinds), tolerances)
+        for batch in range((total + batch_size - 1) // batch_size)
+    ]
+    if workers <= 1:
+        with solver_method(method):
+            for arguments in batches:
+                yield run_batch(*arguments)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(method,)) as executor:
+        yield from executor.map(run_batch, *zip(*batches))
@@ -0,0 +1,145 @@
+"""
+Streaming JSONL export of the task bank.
+
+Rows are read with ``QuerySet.values().iterator(chunk_size=...)``, so
+memory stays constant in the number of tasks and there is one query per
+chunk rather than one per task. Decimal columns are cast to floats in the
+database, which skips ``Decimal`` construction and also copes with legacy
+rows whose values no longer fit the ``DecimalField`` definition.
+
+One exported line looks like::
+
+    {"task_id": 1, "content_hash": "...", "coefficients": {...},
+     "initial_conditions": {"x0": ..., "y0": ..., "z0": ..., "w0": ...},
+     "target_time": ..., "final_values": [...], "weighted_sum": ...,
+     "arc_length": ..., "curvature": ..., "final_solution": 123,
+     "solver_rtol": 1e-06, "solver_atol": 1e-08, "is_valid": true,
+     "created_at": "..."}
+"""
+import datetime
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ODETask
+from .responses import dumps
+
+DECIMAL_COLUMNS = (
+    'x0', 'y0', 'z0', 'w0', 'target_time',
+    'x_final', 'y_final', 'z_final', 'w_final',
+    'weighted_sum', 'arc_length', 'curvature',
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_timestamp(value: Optional[str], end_of_day: bool = False) -> Optional[datetime.datetime]:
+    """Parse an ISO date or datetime filter value; bare dates cover the whole day"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+    return parsed
+
+
+def filter_tasks(queryset=None, created_after=None, created_before=None, is_valid=None,
+                 min_answer=None, max_answer=None):
+    """Apply the export filters; ``None`` means "no constraint" for every argument"""
+    queryset = queryset if queryset is not None else ODETask.objects.all()
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lte=created_before)
+    if is_valid is not None:
+        queryset = queryset.filter(is_valid=is_valid)
+    if min_answer is not None:
+        queryset = queryset.filter(final_solution__gte=min_answer)
+    if max_answer is not None:
+        queryset = queryset.filter(final_solution__lte=max_answer)
+    return queryset.order_by('pk')
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+
+def filters_from_params(params) -> dict:
+    """Build ``filter_tasks`` keyword arguments from query-string style parameters"""
+    filters = {
+        'created_after': parse_timestamp(params.get('created_after')),
+        'created_before': parse_timestamp(params.get('created_before'), end_of_day=True),
+        'is_valid': _parse_bool(params['valid']) if params.get('valid') else None,
+    }
+    for name in ('min_answer', 'max_answer'):
+        value = params.get(name)
+        try:
+            filters[name] = int(value) if value not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name}: {value}")
+    return filters
+
+
+def iter_task_rows(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield export rows for ``queryset`` without instantiating models"""
+    casts = {f'{name}_f': Cast(name, FloatField()) for name in DECIMAL_COLUMNS}
+    values = queryset.values(
+        'pk', 'content_hash', 'coefficients', 'final_solution', 'solver_rtol', 'solver_atol',
+        'is_valid', 'created_at', **casts
+    )
+    for row in values.iterator(chunk_size=chunk_size):
+        yield {
+            'task_id': row['pk'],
+            'content_hash': row['content_hash'],
+            'coefficients': row['coefficients'],
+            'initial_conditions': {
+                'x0': row['x0_f'],
+                'y0': row['y0_f'],
+                'z0': row['z0_f'],
+                'w0': row['w0_f'],
+            },
+            'target_time': row['target_time_f'],
+            'final_values': [row['x_final_f'], row['y_final_f'], row['z_final_f'], row['w_final_f']],
+            'weighted_sum': row['weighted_sum_f'],
+            'arc_length': row['arc_length_f'],
+            'curvature': row['curvature_f'],
+            'final_solution': row['final_solution'],
+            'solver_rtol': row['solver_rtol'],
+            'solver_atol': row['solver_atol'],
+            'is_valid': row['is_valid'],
+            'created_at': row['created_at'],
+        }
+
+
+def iter_jsonl(rows: Iterable[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+def iter_gzip(chunks: Iterable[bytes], flush_every: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally, emitting compressed output as it fills"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = 0
+    for chunk in chunks:
+        pending += len(chunk)
+        data = compressor.compress(chunk)
+        if pending >= flush_every:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
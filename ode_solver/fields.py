@@ -0,0 +1,58 @@
+"""
+``?fields=`` / ``?exclude=`` support for the task endpoints.
+
+Both parameters take a comma-separated list of top-level response keys.
+Views check ``selection.wants(name)`` before computing a key, so anything
+the client did not ask for (LaTeX rendering, equation previews,
+consistency checks) is never computed.
+"""
+from typing import FrozenSet, Iterable, Optional
+
+
+class FieldSelectionError(ValueError):
+    """Raised for unknown field names in ``?fields=`` or ``?exclude=``"""
+
+
+def _split(value: Optional[str]) -> FrozenSet[str]:
+    if not value:
+        return frozenset()
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+class FieldSelection:
+    """Which top-level keys of a response the client asked for"""
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()):
+        self.include = frozenset(include) if include else None
+        self.exclude = frozenset(exclude)
+
+    @classmethod
+    def from_request(cls, request, available: Iterable[str]) -> 'FieldSelection':
+        include = _split(request.GET.get('fields'))
+        exclude = _split(request.GET.get('exclude'))
+        unknown = (include | exclude) - frozenset(available)
+        if unknown:
+            raise FieldSelectionError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return cls(include or None, exclude)
+
+    def wants(self, name: str) -> bool:
+        if name in self.exclude:
+            return False
+        return self.include is None or name in self.include
+
+    def wants_any(self, *names: str) -> bool:
+        return any(self.wants(name) for name in names)
+
+    @property
+    def is_everything(self) -> bool:
+        return self.include is None and not self.exclude
+
+    def variant(self) -> str:
+        """Stable token identifying this selection, used to vary ETags"""
+        if self.is_everything:
+            return ''
+        include = ','.join(sorted(self.include)) if self.include is not None else '*'
+        return f"{include};-{','.join(sorted(self.exclude))}"
+
+
+ALL_FIELDS = FieldSelection()
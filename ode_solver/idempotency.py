@@ -0,0 +1,260 @@
+"""
+``Idempotency-Key`` support for the endpoints that create tasks and jobs.
+
+A client that retries a request with the same ``Idempotency-Key`` header
+gets the stored response of the first attempt back (marked with
+``Idempotent-Replayed: true``) instead of another solve and another row.
+Responses are stored in the ``CACHE_ALIAS`` cache for ``TTL`` seconds,
+scoped per operation and client (the sync and ``/api/async/`` variants of
+an endpoint share a scope, so a key works across both). Only successes and
+validation errors (``STORED_CLIENT_ERRORS``) are stored: a 429, a 503 or a
+5xx says nothing final about the request, so a retry runs it for real.
+
+Duplicates that arrive while the first request is still running wait for
+it (single flight): within a process they wait on the in-flight request
+directly, across processes on a lease in the cache, and a duplicate that
+waits longer than ``WAIT_TIMEOUT`` gets a 409. Reusing a key with a
+different request body is answered with 422. Without a shared cache
+backend (e.g. Redis) the guarantee only holds per process.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .admission import client_key
+from .responses import FastJsonResponse
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TTL': 24 * 60 * 60,
+    # How long an in-flight request holds the key before others may take over
+    'LEASE_SECONDS': 60,
+    'WAIT_TIMEOUT': 30.0,
+    'POLL_INTERVAL': 0.05,
+    'MAX_KEY_LENGTH': 255,
+}
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+STORED_HEADERS = ('Location',)
+# Client errors that a retry of the same body would get again
+STORED_CLIENT_ERRORS = (400, 422)
+KEY_PREFIX = 'ode_solver:idempotency:'
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_IDEMPOTENCY', {})}
+
+
+def is_final(response) -> bool:
+    """Whether ``response`` is the answer to every retry of the request"""
+    status = response.status_code
+    return (200 <= status < 300 or status in STORED_CLIENT_ERRORS) and not response.streaming
+
+
+def fingerprint(request) -> str:
+    # The scope already names the endpoint; leaving the path out lets a retry
+    # of /api/create_custom/ on /api/async/create_custom/ replay, not 422
+    digest = hashlib.sha256(request.method.encode('ascii'))
+    digest.update(request.META.get('QUERY_STRING', '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def cache_key(scope: str, request, key: str) -> str:
+    scoped = f"{scope}\0{client_key(request)}\0{key}"
+    return KEY_PREFIX + hashlib.sha256(scoped.encode('utf-8')).hexdigest()
+
+
+def serialize(response, request_fingerprint: str) -> dict:
+    return {
+        'fingerprint': request_fingerprint,
+        'status': response.status_code,
+        'content': response.content,
+        'content_type': response.get('Content-Type'),
+        'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+    }
+
+
+def replay(record: dict):
+    response = HttpResponse(record['content'], status=record['status'], content_type=record['content_type'])
+    for name, value in record['headers'].items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def key_reused_response():
+    return FastJsonResponse(
+        {'error': 'Idempotency-Key was already used for a different request'}, status=422
+    )
+
+
+def in_progress_response():
+    response = FastJsonResponse(
+        {'error': 'A request with this Idempotency-Key is still in progress'}, status=409
+    )
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+class _Flight:
+    """A request being handled in this process for a given key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.record = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class IdempotentRequest:
+    """Lookup, single-flight coordination and storage for one keyed request"""
+
+    def __init__(self, scope: str, request, key: str, config: dict):
+        self.config = config
+        self.cache = caches[config['CACHE_ALIAS']]
+        self.key = cache_key(scope, request, key)
+        self.lease_key = self.key + ':lease'
+        self.fingerprint = fingerprint(request)
+        self.token = uuid.uuid4().hex
+        self.flight = None
+
+    def _lookup(self):
+        record = self.cache.get(self.key)
+        if record is None:
+            return None
+        if record['fingerprint'] != self.fingerprint:
+            return key_reused_response()
+        return replay(record)
+
+    def begin(self):
+        """Become the leader for the key (returns None) or get the response to send instead"""
+        response = self._lookup()
+        if response is not None:
+            return response
+        with _flights_lock:
+            flight = _flights.get(self.key)
+            if flight is None and self.cache.add(self.lease_key, self.token, self.config['LEASE_SECONDS']):
+                self.flight = _flights[self.key] = _Flight()
+                return None
+        return flight if flight is not None else False
+
+    def follow(self, flight):
+        """Wait for a local flight and replay its record; None means look again"""
+        if flight:
+            if not flight.done.wait(self.config['WAIT_TIMEOUT']):
+                return in_progress_response()
+            if flight.record is not None:
+                return self._from_record(flight.record)
+        return None
+
+    def _from_record(self, record):
+        if record['fingerprint'] != self.fingerprint:
+            return key_reused_response()
+        return replay(record)
+
+    def finish(self, response):
+        record = None
+        if response is not None and is_final(response):
+            record = serialize(response, self.fingerprint)
+            self.cache.set(self.key, record, self.config['TTL'])
+        if self.cache.get(self.lease_key) == self.token:
+            self.cache.delete(self.lease_key)
+        with _flights_lock:
+            _flights.pop(self.key, None)
+        self.flight.record = record
+        self.flight.done.set()
+
+
+class IdempotencyMixin:
+    """Honour ``Idempotency-Key`` on a view; put it before ``AdmissionControlMixin``.
+
+    Replays and waiting duplicates then never take an admission slot or a
+    rate-limit token.
+    """
+
+    idempotency_scope = None
+
+    def idempotent_request(self, request):
+        """IdempotentRequest for a keyed request, None to pass through, or an error response"""
+        config = get_config()
+        key = request.META.get(HEADER)
+        if not config['ENABLED'] or not key or not self.idempotency_scope or request.method == 'OPTIONS':
+            return None
+        if len(key) > config['MAX_KEY_LENGTH']:
+            return FastJsonResponse({'error': 'Idempotency-Key is too long'}, status=400)
+        return IdempotentRequest(self.idempotency_scope, request, key, config)
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(self, 'view_is_async', False):
+            return self._idempotent_dispatch(request, *args, **kwargs)
+        idempotent = self.idempotent_request(request)
+        if idempotent is None:
+            return super().dispatch(request, *args, **kwargs)
+        if isinstance(idempotent, HttpResponse):
+            return idempotent
+
+        config = idempotent.config
+        deadline = time.monotonic() + config['WAIT_TIMEOUT']
+        while True:
+            outcome = idempotent.begin()
+            if outcome is None:
+                break
+            if isinstance(outcome, HttpResponse):
+                return outcome
+            response = idempotent.follow(outcome)
+            if response is not None:
+                return response
+            if time.monotonic() >= deadline:
+                return in_progress_response()
+            if not outcome:
+                # Another process holds the lease; poll until it stores a result or lets go
+                time.sleep(config['POLL_INTERVAL'])
+
+        response = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            return response
+        finally:
+            idempotent.finish(response)
+
+    async def _idempotent_dispatch(self, request, *args, **kwargs):
+        idempotent = self.idempotent_request(request)
+        if idempotent is None:
+            return await super().dispatch(request, *args, **kwargs)
+        if isinstance(idempotent, HttpResponse):
+            return idempotent
+
+        config = idempotent.config
+        deadline = time.monotonic() + config['WAIT_TIMEOUT']
+        while True:
+            outcome = await asyncio.to_thread(idempotent.begin)
+            if outcome is None:
+                break
+            if isinstance(outcome, HttpResponse):
+                return outcome
+            if outcome and outcome.done.is_set():
+                response = idempotent.follow(outcome)
+                if response is not None:
+                    return response
+            if time.monotonic() >= deadline:
+                return in_progress_response()
+            await asyncio.sleep(config['POLL_INTERVAL'])
+
+        response = None
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+            return response
+        finally:
+            await asyncio.to_thread(idempotent.finish, response)
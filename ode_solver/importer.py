@@ -0,0 +1,224 @@
+"""
+Parallel JSONL import of task sets.
+
+Accepts the format written by ``export_tasks`` (extra keys are ignored, so
+minimal rows with just ``coefficients``, ``initial_conditions`` and
+``target_time`` work too). The file is streamed; rows are validated and
+de-duplicated by content hash in the parent process, re-solved across a
+process pool, and the results are written with ``bulk_create``. Every row
+that is not imported is written to the reject report with its line number
+and reason.
+"""
+import gzip
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import ODETask, compute_content_hash
+from .responses import dumps, loads
+from .validation import screen
+
+IC_KEYS = ('x0', 'y0', 'z0', 'w0')
+
+
+@dataclass
+class ImportItem:
+    line_no: int
+    coefficients: dict
+    initial_conditions: Tuple[float, float, float, float]
+    target_time: float
+    content_hash: str
+    expected_solution: Optional[int] = None
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+    def reject(self, reason: str):
+        self.rejected += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+
+def open_jsonl(path: str):
+    if path == '-':
+        return sys.stdin.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _finite(value, name: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite")
+    return number
+
+
+def parse_row(line_no: int, row) -> ImportItem:
+    """Validate one decoded row; raises ``ValueError`` with the reject reason"""
+    if not isinstance(row, dict):
+        raise ValueError("row is not a JSON object")
+    coefficients = row.get('coefficients')
+    if isinstance(coefficients, str):
+        coefficients = json.loads(coefficients)
+    if not isinstance(coefficients, dict) or 'linear' not in coefficients:
+        raise ValueError("coefficients.linear is missing")
+    linear = coefficients['linear']
+    if len(linear) != 4 or any(len(r) != 4 for r in linear):
+        raise ValueError("coefficients.linear must be 4x4")
+    coefficients = {
+        **coefficients,
+        'linear': [[_finite(c, 'coefficient') for c in r] for r in linear],
+    }
+
+    ic = row.get('initial_conditions')
+    if not isinstance(ic, dict) or any(key not in ic for key in IC_KEYS):
+        raise ValueError("initial_conditions needs x0, y0, z0 and w0")
+    initial_conditions = tuple(_finite(ic[key], key) for key in IC_KEYS)
+
+    if row.get('target_time') is None:
+        raise ValueError("target_time is missing")
+    target_time = _finite(row['target_time'], 'target_time')
+    if target_time <= 0:
+        raise ValueError("target_time must be positive")
+
+    screen(coefficients['linear'], initial_conditions, target_time)
+
+    expected = row.get('final_solution')
+    return ImportItem(
+        line_no=line_no,
+        coefficients=coefficients,
+        initial_conditions=initial_conditions,
+        target_time=target_time,
+        content_hash=compute_content_hash(coefficients, initial_conditions, target_time),
+        expected_solution=int(expected) if expected is not None else None,
+    )
+
+
+def iter_items(handle, rejects) -> Iterator[Tuple[int, Optional[ImportItem]]]:
+    """Yield (line_no, item) for every non-blank line; bad rows are reported and yield None"""
+    for line_no, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, parse_row(line_no, loads(line))
+        except (ValueError, TypeError) as e:
+            rejects.write(line_no, 'invalid', str(e))
+            yield line_no, None
+
+
+class RejectReport:
+    """JSONL report of rows that were not imported"""
+
+    def __init__(self, path: Optional[str]):
+        self._handle = open(path, 'wb') if path else None
+
+    def write(self, line_no: int, reason: str, detail: str = ''):
+        if self._handle is not None:
+            self._handle.write(dumps({'line': line_no, 'reason': reason, 'detail': detail}) + b'\n')
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+
+
+def _quiet_worker():
+    # The solver prints DEBUG lines for every call; keep worker output clean
+    sys.stdout = open(os.devnull, 'w')
+
+
+def solve_batch(items: List[ImportItem]) -> List[Tuple[ImportItem, Optional[dict]]]:
+    """Process-pool entry point: solve every item of a batch"""
+    from .services import ODEGenerator
+
+    generator = ODEGenerator()
+    return [
+        (item, generator.create_custom_task(item.coefficients, item.initial_conditions, item.target_time))
+        for item in items
+    ]
+
+
+def _existing_hashes(hashes, using: str) -> set:
+    return set(
+        ODETask.objects.using(using).filter(content_hash__in=list(hashes)).values_list('content_hash', flat=True)
+    )
+
+
+def import_tasks(handle, workers: int = None, batch_size: int = 200, verify: bool = False,
+                 rejects: RejectReport = None, dry_run: bool = False, using: str = 'default') -> ImportStats:
+    """Import every row from ``handle``; returns counters for the run"""
+    workers = workers or os.cpu_count() or 1
+    rejects = rejects or RejectReport(None)
+    stats = ImportStats()
+    seen = set()
+    pending = set()
+    max_pending = workers * 2
+
+    def collect(done):
+        to_create = []
+        for future in done:
+            for item, task_data in future.result():
+                if task_data is None:
+                    stats.reject('unsolvable')
+                    rejects.write(item.line_no, 'unsolvable', 'solver failed or timed out')
+                    continue
+                solved = task_data['solution']['final_solution']
+                if verify and item.expected_solution is not None and solved != item.expected_solution:
+                    stats.reject('answer_mismatch')
+                    rejects.write(item.line_no, 'answer_mismatch',
+                                  f"expected {item.expected_solution}, re-solved {solved}")
+                    continue
+                to_create.append(ODETask.from_task_data(task_data))
+        if to_create and not dry_run:
+            ODETask.objects.using(using).bulk_create(to_create, batch_size=500)
+        stats.imported += len(to_create)
+
+    def submit(executor, batch):
+        nonlocal pending
+        existing = _existing_hashes({item.content_hash for item in batch}, using)
+        fresh = []
+        for item in batch:
+            if item.content_hash in existing:
+                stats.duplicates += 1
+                rejects.write(item.line_no, 'duplicate', item.content_hash)
+            else:
+                fresh.append(item)
+        if not fresh:
+            return
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+        pending.add(executor.submit(solve_batch, fresh))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as executor:
+        batch = []
+        for line_no, item in iter_items(handle, rejects):
+            stats.read += 1
+            if item is None:
+                stats.reject('invalid')
+                continue
+            if item.content_hash in seen:
+                stats.duplicates += 1
+                rejects.write(line_no, 'duplicate', item.content_hash)
+                continue
+            seen.add(item.content_hash)
+            batch.append(item)
+            if len(batch) >= batch_size:
+                submit(executor, batch)
+                batch = []
+        if batch:
+            submit(executor, batch)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    return stats
@@ -0,0 +1,225 @@
+"""
+Database-backed job queue for solver work.
+
+``POST /api/jobs/`` stores a ``Job`` row and returns at once; workers
+started with ``manage.py run_jobs`` claim queued jobs, run the solver and
+record progress and results on the row. There is no broker: claiming is a
+conditional ``UPDATE`` on (status, attempts), so any number of workers can
+poll the same table, and a job whose worker died is picked up again once
+its lease expires. ``GET /api/async/jobs/<id>/?wait=N`` long-polls the row
+until its status or progress changes. The sync ``GET /api/jobs/<id>/``
+holds a worker thread while it waits, so its ``wait`` is capped at
+``SYNC_LONG_POLL_TIMEOUT`` and clients poll it on a short interval instead.
+"""
+import asyncio
+import datetime
+import os
+import socket
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job, ODETask
+
+DEFAULTS = {
+    'MAX_BATCH': 50,
+    'MAX_QUEUED': 1000,
+    'LEASE_SECONDS': 120,
+    'MAX_ATTEMPTS': 3,
+    'POLL_INTERVAL': 1.0,
+    'LONG_POLL_TIMEOUT': 25.0,
+    # Cap for the sync endpoint, where a wait occupies a WSGI thread
+    'SYNC_LONG_POLL_TIMEOUT': 1.0,
+    'LONG_POLL_INTERVAL': 0.25,
+}
+
+CLAIM_CANDIDATES = 8
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_JOBS', {})}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def queue_is_full() -> bool:
+    return Job.objects.filter(status=Job.STATUS_QUEUED).count() >= get_config()['MAX_QUEUED']
+
+
+def enqueue_custom(coefficients, initial_conditions, target_time) -> Job:
+    return Job.objects.create(
+        kind=Job.KIND_CUSTOM,
+        total=1,
+        params={
+            'coefficients': coefficients,
+            'initial_conditions': dict(zip(('x0', 'y0', 'z0', 'w0'), initial_conditions)),
+            'target_time': target_time,
+        },
+    )
+
+
+def enqueue_generate(count: int) -> Job:
+    max_batch = get_config()['MAX_BATCH']
+    if not 1 <= count <= max_batch:
+        raise ValueError(f"count must be between 1 and {max_batch}")
+    return Job.objects.create(kind=Job.KIND_GENERATE, total=count, params={'count': count})
+
+
+def job_payload(job: Job) -> dict:
+    return {
+        'job_id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'result': job.result,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def claim_next_job(worker_id: str) -> Optional[Job]:
+    """Take the oldest queued job, or a running one whose lease expired"""
+    now = timezone.now()
+    lease = datetime.timedelta(seconds=get_config()['LEASE_SECONDS'])
+    candidates = (
+        Job.objects.filter(Q(status=Job.STATUS_QUEUED) | Q(status=Job.STATUS_RUNNING, lease_expires_at__lt=now))
+        .order_by('created_at')
+        .values_list('pk', 'status', 'attempts')[:CLAIM_CANDIDATES]
+    )
+    for pk, status, attempts in candidates:
+        claimed = Job.objects.filter(pk=pk, status=status, attempts=attempts).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker_id,
+            attempts=attempts + 1,
+            started_at=now,
+            lease_expires_at=now + lease,
+            updated_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+class LeaseLost(Exception):
+    """Another worker took the job over after this worker's lease expired"""
+
+
+def _heartbeat(job: Job, **fields):
+    now = timezone.now()
+    fields.setdefault('lease_expires_at', now + datetime.timedelta(seconds=get_config()['LEASE_SECONDS']))
+    updated = Job.objects.filter(pk=job.pk, worker=job.worker, status=Job.STATUS_RUNNING).update(
+        updated_at=now, **fields
+    )
+    if not updated:
+        raise LeaseLost(job.pk)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def _finish(job: Job, status: str, result=None, error: str = '', **fields):
+    _heartbeat(job, status=status, result=result, error=error,
+               finished_at=timezone.now(), lease_expires_at=None, **fields)
+
+
+def _store_task(task_data) -> ODETask:
+    from .db_routers import pin_to_primary
+    from .sqlite_tuning import save_task
+
+    ode_task = save_task(ODETask.from_task_data(task_data))
+    pin_to_primary(ode_task.pk)
+    return ode_task
+
+
+def _run_custom(job: Job, generator):
+    from .views import GenerateODETaskView
+
+    params = job.params
+    ic = params['initial_conditions']
+    task_data = generator.create_custom_task(
+        params['coefficients'], (ic['x0'], ic['y0'], ic['z0'], ic['w0']), params['target_time']
+    )
+    if not task_data:
+        _finish(job, Job.STATUS_FAILED, error='Could not solve the system with provided parameters')
+        return
+    ode_task = _store_task(task_data)
+    _finish(job, Job.STATUS_SUCCEEDED, progress=1, result={
+        'task_ids': [ode_task.pk],
+        'task': GenerateODETaskView().build_task_response(ode_task),
+    })
+
+
+def _run_generate(job: Job, generator):
+    # A retried job keeps the tasks its earlier attempts already created
+    previous = job.result or {}
+    task_ids = list(previous.get('task_ids', []))
+    failed = previous.get('failed', 0)
+    for done in range(job.progress, job.total):
+        task_data = generator.generate_valid_ode_task()
+        if task_data:
+            task_ids.append(_store_task(task_data).pk)
+        else:
+            failed += 1
+        _heartbeat(job, progress=done + 1, result={'task_ids': task_ids, 'failed': failed})
+    if task_ids:
+        _finish(job, Job.STATUS_SUCCEEDED, result={'task_ids': task_ids, 'failed': failed})
+    else:
+        _finish(job, Job.STATUS_FAILED, result={'task_ids': [], 'failed': failed},
+                error='Could not generate a valid ODE task')
+
+
+def run_job(job: Job):
+    """Execute a claimed job; exceptions requeue it until MAX_ATTEMPTS is reached"""
+    from .services import ODEGenerator
+
+    runners = {Job.KIND_CUSTOM: _run_custom, Job.KIND_GENERATE: _run_generate}
+    max_attempts = get_config()['MAX_ATTEMPTS']
+    try:
+        if job.attempts > max_attempts:
+            _finish(job, Job.STATUS_FAILED, result=job.result,
+                    error=f"Gave up after {max_attempts} attempts")
+            return
+        runners[job.kind](job, ODEGenerator())
+    except LeaseLost:
+        raise
+    except Exception as e:
+        if job.attempts < max_attempts:
+            _heartbeat(job, status=Job.STATUS_QUEUED, worker='', lease_expires_at=None, error=str(e))
+        else:
+            _finish(job, Job.STATUS_FAILED, result=job.result, error=str(e))
+
+
+def _snapshot(job_id):
+    return Job.objects.filter(pk=job_id).values_list('status', 'progress').first()
+
+
+def wait_for_update(job_id, timeout: float):
+    """Block until the job finishes or its status/progress changes, or ``timeout`` passes"""
+    config = get_config()
+    deadline = time.monotonic() + min(timeout, config['LONG_POLL_TIMEOUT'], config['SYNC_LONG_POLL_TIMEOUT'])
+    initial = _snapshot(job_id)
+    while initial is not None and initial[0] not in Job.FINISHED_STATUSES and time.monotonic() < deadline:
+        time.sleep(config['LONG_POLL_INTERVAL'])
+        if _snapshot(job_id) != initial:
+            break
+    return Job.objects.filter(pk=job_id).first()
+
+
+async def await_update(job_id, timeout: float):
+    """Async ``wait_for_update``; sleeps on the event loop between polls"""
+    config = get_config()
+    deadline = time.monotonic() + min(timeout, config['LONG_POLL_TIMEOUT'])
+    snapshot = Job.objects.filter(pk=job_id).values_list('status', 'progress')
+    initial = await snapshot.afirst()
+    while initial is not None and initial[0] not in Job.FINISHED_STATUSES and time.monotonic() < deadline:
+        await asyncio.sleep(config['LONG_POLL_INTERVAL'])
+        if await snapshot.afirst() != initial:
+            break
+    return await Job.objects.filter(pk=job_id).afirst()
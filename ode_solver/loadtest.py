@@ -0,0 +1,437 @@
+"""
+Load generator for the API.
+
+A scenario (a JSON file, see ``loadtests/``) describes a weighted mix of
+actions (generate, create_custom, verify, detail, solution and the
+``async_`` variants), a target rate, the number of concurrent workers and
+a duration. ``run_scenario`` plays it against the app in-process (one
+Django test client per worker thread) or against a running server, and
+returns a report with throughput, status counts, error rate, p50/p95/p99
+latency and database queries per request for each action.
+
+With a target ``rps`` the arrivals are scheduled up front (uniform or
+Poisson, from the scenario seed) and latency is measured from each
+request's scheduled time, so requests queued behind busy workers count
+as slow rather than silently lowering the rate. With ``rps`` 0 every
+worker sends its next request as soon as the previous one returns.
+
+Query counts come from the ``ode_solver_http_request_queries`` histogram
+on ``/metrics``, read before and after the run; against a multi-process
+server they are only complete when ``ODE_SOLVER_METRICS_DIR`` is shared.
+"""
+import http.client
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .responses import dumps, loads
+
+REPORT_VERSION = 1
+
+SCENARIO_DEFAULTS = {
+    'description': '',
+    'duration': 10.0,
+    'warmup': 1.0,
+    'rps': 10.0,
+    'concurrency': 4,
+    'arrival': 'poisson',
+    'seed': 1,
+    # Tasks created before the run for verify/detail/solution to read
+    'tasks': 10,
+    'verify_correct_ratio': 0.5,
+    'headers': {},
+}
+
+ARRIVALS = ('poisson', 'uniform')
+
+# action: (method, path template, URL name used in the query metrics)
+ACTIONS = {
+    'generate': ('GET', '/api/generate/', 'generate_ode_task'),
+    'create_custom': ('POST', '/api/create_custom/', 'create_custom_task'),
+    'verify': ('POST', '/api/verify/', 'verify_solution'),
+    'detail': ('GET', '/api/task/{task_id}/', 'task_detail'),
+    'solution': ('GET', '/api/task/{task_id}/solution/', 'task_solution'),
+    'bundle': ('GET', '/api/task/{task_id}/full/', 'task_bundle'),
+    'async_generate': ('GET', '/api/async/generate/', 'async_generate_ode_task'),
+    'async_create_custom': ('POST', '/api/async/create_custom/', 'async_create_custom_task'),
+    'async_verify': ('POST', '/api/async/verify/', 'async_verify_solution'),
+    'async_detail': ('GET', '/api/async/task/{task_id}/', 'async_task_detail'),
+}
+
+_QUERIES_RE = re.compile(r'^ode_solver_http_request_queries_(sum|count)\{view="([^"]*)"\} (\S+)$', re.M)
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+def load_scenario(data: dict) -> dict:
+    """Validate a scenario and fill in defaults"""
+    if not isinstance(data, dict):
+        raise ScenarioError('A scenario must be a JSON object')
+    unknown = set(data) - set(SCENARIO_DEFAULTS) - {'name', 'mix'}
+    if unknown:
+        raise ScenarioError(f"Unknown scenario keys: {', '.join(sorted(unknown))}")
+    scenario = {'name': data.get('name', 'scenario'), **SCENARIO_DEFAULTS, **data}
+    mix = scenario.get('mix')
+    if not isinstance(mix, dict) or not mix:
+        raise ScenarioError("'mix' must map action names to weights")
+    for name, weight in mix.items():
+        if name not in ACTIONS:
+            raise ScenarioError(f"Unknown action {name!r}; expected one of {', '.join(ACTIONS)}")
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ScenarioError(f"Weight of {name!r} must be a non-negative number")
+    if not sum(mix.values()) > 0:
+        raise ScenarioError("At least one action needs a positive weight")
+    if scenario['arrival'] not in ARRIVALS:
+        raise ScenarioError(f"'arrival' must be one of {', '.join(ARRIVALS)}")
+    for key in ('duration', 'rps', 'warmup'):
+        if not isinstance(scenario[key], (int, float)) or scenario[key] < 0:
+            raise ScenarioError(f"'{key}' must be a non-negative number")
+    if scenario['duration'] <= 0:
+        raise ScenarioError("'duration' must be positive")
+    if not isinstance(scenario['concurrency'], int) or scenario['concurrency'] < 1:
+        raise ScenarioError("'concurrency' must be a positive integer")
+    if not isinstance(scenario['tasks'], int) or scenario['tasks'] < 1:
+        raise ScenarioError("'tasks' must be a positive integer")
+    return scenario
+
+
+def read_scenario(path: str) -> dict:
+    with open(path) as handle:
+        try:
+            return load_scenario(json.load(handle))
+        except json.JSONDecodeError as e:
+            raise ScenarioError(f"{path} is not valid JSON: {e}")
+
+
+class InProcessTarget:
+    """Requests through Django's test client, one client per worker thread"""
+
+    name = 'in-process'
+
+    def __init__(self, headers: Optional[dict] = None):
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            from django.test import Client
+
+            client = self._local.client = Client(raise_request_exception=False, headers=self.headers)
+        return client
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        response = self._client().generic(method, path, body or b'', content_type='application/json')
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def close(self):
+        """Release the calling thread's client and database connections; run in every worker thread"""
+        from django.db import connections
+
+        # Connections are per thread, so only the thread that opened one can close it
+        self._local.client = None
+        connections.close_all()
+
+
+class HttpTarget:
+    """Requests to a running server over keep-alive connections, one per worker thread"""
+
+    def __init__(self, base_url: str, headers: Optional[dict] = None, timeout: float = 60.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ScenarioError(f"Not an http(s) URL: {base_url}")
+        self.name = base_url
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip('/')
+        self.headers = headers or {}
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            connection = self._local.connection = factory(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        headers = {'Content-Type': 'application/json', **self.headers}
+        connection = self._connection()
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except Exception:
+            connection.close()
+            self._local.connection = None
+            raise
+
+    def close(self):
+        """Close the calling thread's connection; run in every worker thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+@dataclass
+class TaskRef:
+    task_id: int
+    answer: Optional[int]
+
+
+@dataclass
+class Call:
+    action: str
+    method: str
+    path: str
+    body: Optional[bytes]
+
+
+def custom_system(rng: random.Random) -> dict:
+    """A small rank-1 system (A = u vᵀ) that passes validation and solves quickly"""
+    while True:
+        u = [rng.choice((-1, 0, 1)) for _ in range(4)]
+        v = [rng.choice((-1, 0, 1)) for _ in range(4)]
+        if any(u) and any(v):
+            break
+    return {
+        'coefficients': {'linear': [[a * b for b in v] for a in u]},
+        'initial_conditions': {key: rng.randint(-3, 3) for key in ('x0', 'y0', 'z0', 'w0')},
+        'target_time': rng.choice((0.5, 1.0, 1.5, 2.0)),
+    }
+
+
+def build_call(action: str, rng: random.Random, tasks: List[TaskRef], correct_ratio: float) -> Call:
+    method, template, _ = ACTIONS[action]
+    task = rng.choice(tasks)
+    body = None
+    if action.endswith('create_custom'):
+        body = dumps(custom_system(rng))
+    elif action.endswith('verify'):
+        answer = task.answer if task.answer is not None else 0
+        if rng.random() >= correct_ratio:
+            answer += 1
+        body = dumps({'task_id': task.task_id, 'solution': answer})
+    return Call(action, method, template.format(task_id=task.task_id), body)
+
+
+def schedule(scenario: dict, duration: float, rng: random.Random) -> List[float]:
+    """Arrival offsets in seconds for an open-loop run"""
+    rate = scenario['rps']
+    if scenario['arrival'] == 'uniform':
+        return [i / rate for i in range(int(duration * rate))]
+    offsets, offset = [], rng.expovariate(rate)
+    while offset < duration:
+        offsets.append(offset)
+        offset += rng.expovariate(rate)
+    return offsets
+
+
+@dataclass
+class ActionStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def add(self, latency: float, status: int):
+        self.latencies.append(latency)
+        key = str(status) if status else 'exception'
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not status or status >= 400:
+            self.errors += 1
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def query_totals(target) -> Optional[Dict[str, Tuple[float, float]]]:
+    """(sum, count) of the queries-per-request histogram by URL name, or None without /metrics"""
+    try:
+        status, content = target.request('GET', '/metrics')
+    except Exception:
+        return None
+    if status != 200:
+        return None
+    totals = {}
+    for kind, view, value in _QUERIES_RE.findall(content.decode('utf-8', 'replace')):
+        query_sum, count = totals.get(view, (0.0, 0.0))
+        totals[view] = (float(value), count) if kind == 'sum' else (query_sum, float(value))
+    return totals
+
+
+def prepare_tasks(target, count: int) -> List[TaskRef]:
+    """Create ``count`` tasks through the API and look up their answers"""
+    tasks = []
+    for _ in range(count):
+        status, content = target.request('GET', '/api/generate/')
+        if status != 200:
+            raise ScenarioError(f"Could not create a task for the run: /api/generate/ returned {status}")
+        task_id = loads(content)['task_id']
+        status, content = target.request('GET', f'/api/task/{task_id}/solution/?fields=stored_metrics')
+        answer = loads(content)['stored_metrics']['final_solution'] if status == 200 else None
+        tasks.append(TaskRef(task_id, answer))
+    return tasks
+
+
+class Runner:
+    """Plays one phase (warm-up or measured) of a scenario"""
+
+    def __init__(self, scenario: dict, target, tasks: List[TaskRef]):
+        self.scenario = scenario
+        self.target = target
+        self.tasks = tasks
+        self.actions = list(scenario['mix'])
+        self.weights = [scenario['mix'][name] for name in self.actions]
+        self.stats = {name: ActionStats() for name in self.actions if scenario['mix'][name] > 0}
+        self._lock = threading.Lock()
+
+    def _pick(self, rng: random.Random) -> Call:
+        action = rng.choices(self.actions, self.weights)[0]
+        return build_call(action, rng, self.tasks, self.scenario['verify_correct_ratio'])
+
+    def _send(self, call: Call, started: float):
+        try:
+            status, _ = self.target.request(call.method, call.path, call.body)
+        except Exception:
+            status = 0
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.stats[call.action].add(latency, status)
+
+    def run(self, duration: float, seed: int) -> float:
+        """Run for ``duration`` seconds; returns the elapsed wall time"""
+        rng = random.Random(seed)
+        concurrency = self.scenario['concurrency']
+        if self.scenario['rps'] > 0:
+            # The whole run is decided up front, so the same seed gives the same requests
+            calls = [(offset, self._pick(rng)) for offset in schedule(self.scenario, duration, rng)]
+            cursor = iter(calls)
+
+            def work():
+                while True:
+                    with self._lock:
+                        item = next(cursor, None)
+                    if item is None:
+                        return
+                    offset, call = item
+                    intended = start + offset
+                    delay = intended - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._send(call, intended)
+            workers = [work] * concurrency
+        else:
+            def closed_loop(worker_rng):
+                def work():
+                    while time.perf_counter() < deadline:
+                        call = self._pick(worker_rng)
+                        self._send(call, time.perf_counter())
+                return work
+            workers = [closed_loop(random.Random(rng.random())) for _ in range(concurrency)]
+
+        threads = [threading.Thread(target=self._worker, args=(work,), daemon=True) for work in workers]
+        start = time.perf_counter()
+        deadline = start + duration
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def _worker(self, work: Callable[[], None]):
+        try:
+            work()
+        finally:
+            # Here rather than after join(): targets hold per-thread connections
+            self.target.close()
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 3)
+
+
+def summarize(runner: Runner, elapsed: float, queries_before, queries_after) -> dict:
+    actions = {}
+    everything = []
+    for name, stats in runner.stats.items():
+        latencies = sorted(stats.latencies)
+        everything.extend(latencies)
+        url_name = ACTIONS[name][2]
+        queries = None
+        if queries_before is not None and queries_after is not None:
+            sum_after, count_after = queries_after.get(url_name, (0.0, 0.0))
+            sum_before, count_before = queries_before.get(url_name, (0.0, 0.0))
+            if count_after > count_before:
+                queries = round((sum_after - sum_before) / (count_after - count_before), 2)
+        actions[name] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'errors': stats.errors,
+            'error_rate': round(stats.errors / len(latencies), 4) if latencies else 0.0,
+            'statuses': dict(sorted(stats.statuses.items())),
+            'latency_ms': _latency_summary(latencies),
+            'queries_per_request': queries,
+        }
+    everything.sort()
+    errors = sum(stats.errors for stats in runner.stats.values())
+    return {
+        'requests': len(everything),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(everything) / elapsed, 2),
+        'errors': errors,
+        'error_rate': round(errors / len(everything), 4) if everything else 0.0,
+        'latency_ms': _latency_summary(everything),
+        'actions': actions,
+    }
+
+
+def _latency_summary(latencies: List[float]) -> dict:
+    return {
+        'p50': _ms(percentile(latencies, 0.50)),
+        'p95': _ms(percentile(latencies, 0.95)),
+        'p99': _ms(percentile(latencies, 0.99)),
+        'max': _ms(latencies[-1] if latencies else None),
+        'mean': _ms(sum(latencies) / len(latencies) if latencies else None),
+    }
+
+
+def run_scenario(scenario: dict, target, progress: Callable[[str], None] = None) -> dict:
+    """Prepare tasks, warm up, run the measured phase and return the report"""
+    progress = progress or (lambda message: None)
+    progress(f"Creating {scenario['tasks']} task(s) for the run")
+    tasks = prepare_tasks(target, scenario['tasks'])
+    if scenario['warmup'] > 0:
+        progress(f"Warming up for {scenario['warmup']:g}s")
+        Runner(scenario, target, tasks).run(scenario['warmup'], scenario['seed'] + 1)
+    queries_before = query_totals(target)
+    progress(f"Running for {scenario['duration']:g}s")
+    runner = Runner(scenario, target, tasks)
+    elapsed = runner.run(scenario['duration'], scenario['seed'])
+    queries_after = query_totals(target)
+
+    from .benchmarks import environment
+
+    return {
+        'version': REPORT_VERSION,
+        'scenario': scenario,
+        'target': target.name,
+        'environment': environment(),
+        'results': summarize(runner, elapsed, queries_before, queries_after),
+    }
@@ -0,0 +1,106 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import benchmarks
+
+
+def parse_thresholds(values):
+    thresholds = {}
+    for value in values or ():
+        name, sep, threshold = value.rpartition('=')
+        try:
+            if not sep or not name:
+                raise ValueError
+            thresholds[name] = float(threshold)
+        except ValueError:
+            raise CommandError(f"--threshold-for expects NAME=FRACTION, got {value!r}")
+    return thresholds
+
+
+class Command(BaseCommand):
+    help = "Time the generation, solve, formatting and API paths on fixed seeds and compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filter', '-k', action='append', default=[],
+                            help="Only benchmarks whose name contains this (repeatable)")
+        parser.add_argument('--group', action='append', choices=('micro', 'views'), default=[],
+                            help="Only this group of benchmarks (repeatable)")
+        parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+        parser.add_argument('--rounds', type=int, default=benchmarks.DEFAULT_ROUNDS,
+                            help="Timed rounds per benchmark")
+        parser.add_argument('--min-time', type=float, default=benchmarks.DEFAULT_MIN_TIME,
+                            help="Minimum seconds per round; sets the iterations per round")
+        parser.add_argument('--seed', type=int, default=benchmarks.DEFAULT_SEED,
+                            help="Seed for random and numpy.random, reset before every round")
+        parser.add_argument('--output', '-o', help="Write the results as JSON to this file")
+        parser.add_argument('--baseline', help="Results JSON from an earlier run to compare against")
+        parser.add_argument('--stat', choices=('median', 'mean', 'min'), default='median',
+                            help="Per-call statistic compared with the baseline")
+        parser.add_argument('--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+                            help="Relative slowdown that counts as a regression (0.2 = 20%%)")
+        parser.add_argument('--threshold-for', action='append', metavar='NAME=FRACTION',
+                            help="Regression threshold for one benchmark (repeatable)")
+
+    def handle(self, *args, **options):
+        selected = benchmarks.select(options['filter'], options['group'])
+        if options['list']:
+            for bench in selected:
+                self.stdout.write(f"{bench.name} ({bench.group})")
+            return
+        if not selected:
+            raise CommandError("No benchmark matches the given --filter/--group")
+
+        thresholds = parse_thresholds(options['threshold_for'])
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.name:<28} {benchmarks.format_seconds(result.median):>10} "
+                f"± {benchmarks.format_seconds(result.stdev):<10} "
+                f"min {benchmarks.format_seconds(result.min):>10}  ({result.rounds}x{result.iterations})"
+            )
+
+        results = benchmarks.run(
+            selected,
+            seed=options['seed'],
+            rounds=options['rounds'],
+            min_time=options['min_time'],
+            progress=progress,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+                handle.write('\n')
+            self.stderr.write(f"Wrote {len(results['benchmarks'])} results to {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline.get('environment') != results['environment']:
+            self.stderr.write("Warning: the baseline was recorded in a different environment")
+        # Benchmarks left out by --filter/--group are not "missing"
+        selected_names = {bench.name for bench in selected}
+        baseline = {**baseline, 'benchmarks': {
+            name: value for name, value in baseline.get('benchmarks', {}).items() if name in selected_names
+        }}
+        comparisons = benchmarks.compare(
+            results, baseline, threshold=options['threshold'], thresholds=thresholds, stat=options['stat']
+        )
+        self.stdout.write('')
+        for comparison in comparisons:
+            change = comparison.change
+            self.stdout.write(
+                f"{comparison.name:<28} {benchmarks.format_seconds(comparison.baseline):>10} -> "
+                f"{benchmarks.format_seconds(comparison.current):>10} "
+                f"{'' if change is None else f'{change:+.1%}':>8}  {comparison.status}"
+            )
+        regressions = [comparison.name for comparison in comparisons if comparison.status == 'regression']
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
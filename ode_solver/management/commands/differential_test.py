@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import differential
+from ode_solver.benchmarks import quiet
+from ode_solver.services import SOLVER_METHODS
+from ode_solver.responses import dumps
+
+
+class Command(BaseCommand):
+    help = "Compare _solve_system with the exact closed form/expm on many random systems and shrink failures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--systems', '-n', type=int, default=5000, help="Number of random systems to check")
+        parser.add_argument('--seed', type=int, default=0, help="Seed; batches are reproducible from it")
+        parser.add_argument('--kind', action='append', choices=differential.KINDS,
+                            help="Kind of system to draw (repeatable; default all)")
+        parser.add_argument('--method', choices=SOLVER_METHODS,
+                            help="solve_ivp method to test instead of ODE_SOLVER_SETTINGS['METHOD']")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (1 runs in this process)")
+        parser.add_argument('--batch-size', type=int, default=differential.DEFAULT_BATCH_SIZE,
+                            help="Systems per batch handed to a worker")
+        parser.add_argument('--final-values-rtol', type=float, default=differential.Tolerances.final_values,
+                            help="Relative tolerance for u(t_f)")
+        parser.add_argument('--arc-length-rtol', type=float, default=differential.Tolerances.arc_length,
+                            help="Relative tolerance for the arc length")
+        parser.add_argument('--ambiguous-margin', type=float, default=differential.DEFAULT_AMBIGUOUS_MARGIN,
+                            help="Answer mismatches this close to a rounding boundary are not failures")
+        parser.add_argument('--shrink', type=int, default=5, help="Shrink at most this many failures")
+        parser.add_argument('--output', '-o', default='-',
+                            help="JSONL file for failures with their shrunk reproducers, or '-' for stdout")
+        parser.add_argument('--fail-on-mismatch', action='store_true',
+                            help="Exit with an error status if any system fails")
+
+    def handle(self, *args, **options):
+        if options['systems'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--systems and --batch-size must be positive")
+        tolerances = differential.Tolerances(
+            final_values=options['final_values_rtol'],
+            arc_length=options['arc_length_rtol'],
+            ambiguous_margin=options['ambiguous_margin'],
+        )
+        kinds = tuple(options['kind'] or differential.KINDS)
+
+        counts = dict.fromkeys(differential.STATUSES, 0)
+        failures = []
+        started = time.perf_counter()
+        with quiet():
+            for result in differential.run(
+                options['systems'], seed=options['seed'], kinds=kinds, tolerances=tolerances,
+                batch_size=options['batch_size'], workers=options['workers'], method=options['method'],
+            ):
+                for status, count in result.counts.items():
+                    counts[status] += count
+                failures.extend(result.failures)
+            elapsed = time.perf_counter() - started
+
+            with differential.solver_method(options['method']):
+                for failure in failures[:max(0, options['shrink'])]:
+                    failure.shrunk, failure.shrunk_outcome = differential.shrink(
+                        failure.system, failure.outcome, tolerances
+                    )
+
+        handle = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for failure in failures:
+                handle.write(dumps(failure.as_dict()) + b'\n')
+        finally:
+            if handle is sys.stdout.buffer:
+                handle.flush()
+            else:
+                handle.close()
+
+        checked = sum(counts.values())
+        self.stderr.write(
+            f"Checked {checked} systems in {elapsed:.1f}s ({checked / elapsed:.0f}/s): "
+            + ', '.join(f"{status}={count}" for status, count in counts.items())
+        )
+        if options['fail_on_mismatch'] and failures:
+            raise CommandError(f"{len(failures)} system(s) disagree with the reference")
@@ -0,0 +1,88 @@
+import gzip
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import export
+
+
+class Command(BaseCommand):
+    help = "Stream the task bank to JSONL, optionally as gzip-compressed shards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-',
+                            help="Output file, or '-' for stdout. With --shard-size this is a "
+                                 "directory that receives tasks-00000.jsonl[.gz], ...")
+        parser.add_argument('--gzip', action='store_true', help="Gzip-compress the output")
+        parser.add_argument('--shard-size', type=int, default=0,
+                            help="Rows per output file (0 = a single file)")
+        parser.add_argument('--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE,
+                            help="Rows fetched from the database per query")
+        parser.add_argument('--database', default='default', help="Database alias to read from")
+        parser.add_argument('--created-after', help="ISO date or datetime (inclusive)")
+        parser.add_argument('--created-before', help="ISO date or datetime (inclusive)")
+        parser.add_argument('--valid', help="Only valid (true) or invalid (false) tasks")
+        parser.add_argument('--min-answer', help="Minimum final_solution (inclusive)")
+        parser.add_argument('--max-answer', help="Maximum final_solution (inclusive)")
+
+    def handle(self, *args, **options):
+        try:
+            filters = export.filters_from_params(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        from ode_solver.models import ODETask
+        queryset = export.filter_tasks(ODETask.objects.using(options['database']), **filters)
+        lines = export.iter_jsonl(export.iter_task_rows(queryset, chunk_size=max(1, options['chunk_size'])))
+
+        if options['shard_size'] > 0:
+            if options['output'] == '-':
+                raise CommandError("--shard-size needs --output pointing at a directory")
+            count, shards = self._write_shards(lines, Path(options['output']), options['shard_size'], options['gzip'])
+            self.stderr.write(f"Exported {count} tasks into {shards} shard(s) in {options['output']}")
+            return
+
+        if options['output'] == '-':
+            count = self._write(lines, sys.stdout.buffer, options['gzip'])
+        else:
+            with self._open(Path(options['output']), options['gzip']) as handle:
+                count = self._write(lines, handle, False)
+        self.stderr.write(f"Exported {count} tasks")
+
+    def _open(self, path, compress):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return gzip.open(path, 'wb') if compress else open(path, 'wb')
+
+    def _write(self, lines, handle, compress):
+        count = 0
+
+        def counted():
+            nonlocal count
+            for line in lines:
+                count += 1
+                yield line
+
+        stream = export.iter_gzip(counted()) if compress else counted()
+        for chunk in stream:
+            handle.write(chunk)
+        return count
+
+    def _write_shards(self, lines, directory, shard_size, compress):
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = '.jsonl.gz' if compress else '.jsonl'
+        count = shards = 0
+        handle = None
+        try:
+            for line in lines:
+                if count % shard_size == 0:
+                    if handle is not None:
+                        handle.close()
+                    handle = self._open(directory / f"tasks-{shards:05d}{suffix}", compress)
+                    shards += 1
+                handle.write(line)
+                count += 1
+        finally:
+            if handle is not None:
+                handle.close()
+        return count, shards
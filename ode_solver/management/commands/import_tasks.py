@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import importer
+
+
+class Command(BaseCommand):
+    help = "Import tasks from JSONL (the export_tasks format), re-solving every row in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help="JSONL files (.gz is decompressed), directories of shards, or '-' for stdin")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Solver processes (0 = one per CPU)")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Rows handed to a worker process at a time")
+        parser.add_argument('--verify', action='store_true',
+                            help="Reject rows whose final_solution differs from the re-solved answer")
+        parser.add_argument('--rejects', help="Write a JSONL report of skipped rows to this file")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and solve without writing")
+        parser.add_argument('--database', default='default', help="Database alias to write to")
+
+    def handle(self, *args, **options):
+        paths = []
+        for raw in options['paths']:
+            path = Path(raw)
+            if raw != '-' and path.is_dir():
+                paths.extend(sorted(p for p in path.iterdir() if p.name.endswith(('.jsonl', '.jsonl.gz'))))
+            elif raw == '-' or path.exists():
+                paths.append(path if raw != '-' else raw)
+            else:
+                raise CommandError(f"No such file: {raw}")
+
+        rejects = importer.RejectReport(options['rejects'])
+        try:
+            for path in paths:
+                with importer.open_jsonl(str(path)) as handle:
+                    stats = importer.import_tasks(
+                        handle,
+                        workers=options['workers'] or None,
+                        batch_size=max(1, options['batch_size']),
+                        verify=options['verify'],
+                        rejects=rejects,
+                        dry_run=options['dry_run'],
+                        using=options['database'],
+                    )
+                reasons = ', '.join(f"{reason}={count}" for reason, count in sorted(stats.reasons.items()))
+                self.stderr.write(
+                    f"{path}: read {stats.read}, imported {stats.imported}, "
+                    f"duplicates {stats.duplicates}, rejected {stats.rejected}"
+                    + (f" ({reasons})" if reasons else "")
+                )
+        finally:
+            rejects.close()
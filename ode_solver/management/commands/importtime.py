@@ -0,0 +1,58 @@
+import json
+import shlex
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import startup
+
+
+class Command(BaseCommand):
+    help = "Report the import time of a cold worker boot (or of a manage.py command), like python -X importtime"
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help="Extra modules to import after booting the app")
+        parser.add_argument('--command', '-c', help="Profile this manage.py command instead, e.g. 'migrate --check'")
+        parser.add_argument('--top', type=int, default=25, help="Modules to list")
+        parser.add_argument('--sort', choices=('cumulative', 'self'), default='cumulative',
+                            help="Order modules by time including or excluding their imports")
+        parser.add_argument('--repeat', type=int, default=3, help="Cold starts to run; the fastest is reported")
+        parser.add_argument('--forbid', action='append', default=[], metavar='PACKAGE',
+                            help=f"Fail if this package is imported (e.g. {', '.join(startup.HEAVY_PACKAGES)})")
+        parser.add_argument('--output', '-o', help="Also write the profile as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['command'] and options['modules']:
+            raise CommandError("Pass either modules or --command, not both")
+        command = shlex.split(options['command']) if options['command'] else None
+        try:
+            profile = startup.import_profile(options['modules'], command, options['repeat'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        key = 'cumulative_us' if options['sort'] == 'cumulative' else 'self_us'
+        records = sorted(profile.records, key=lambda record: getattr(record, key), reverse=True)
+        self.stdout.write(f"{'cumulative':>12}{'self':>10}  module")
+        for record in records[:options['top']]:
+            self.stdout.write(
+                f"{record.cumulative_us / 1000:>10.1f}ms{record.self_us / 1000:>8.1f}ms  {record.name}"
+            )
+        self.stdout.write('')
+        for package, us in list(profile.packages().items())[:10]:
+            self.stdout.write(f"{us / 1000:>10.1f}ms  {package}")
+
+        heavy = ', '.join(
+            f"{package} {'imported' if profile.imported(package) else 'not imported'}"
+            for package in startup.HEAVY_PACKAGES
+        )
+        self.stderr.write(
+            f"{profile.target}: {profile.wall_seconds * 1000:.0f}ms wall, "
+            f"{profile.total_us / 1000:.0f}ms in {len(profile.records)} imports; {heavy}"
+        )
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(profile.as_dict(options['top']), handle, indent=2)
+                handle.write('\n')
+
+        forbidden = [package for package in options['forbid'] if profile.imported(package)]
+        if forbidden:
+            raise CommandError(f"Imported at startup: {', '.join(forbidden)}")
@@ -0,0 +1,136 @@
+import contextlib
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import loadtest
+
+
+def parse_headers(values):
+    headers = {}
+    for value in values or ():
+        name, sep, header = value.partition(':')
+        if not sep or not name.strip():
+            raise CommandError(f"--header expects 'Name: value', got {value!r}")
+        headers[name.strip()] = header.strip()
+    return headers
+
+
+class Command(BaseCommand):
+    help = "Play a load-test scenario against the app in-process or a running server and report latency percentiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', help="Scenario JSON file (see loadtests/)")
+        parser.add_argument('--url', help="Base URL of a running server; the app is driven in-process if omitted")
+        database = parser.add_mutually_exclusive_group()
+        database.add_argument('--test-database', action='store_true',
+                              help="In-process only: run against a throwaway test database (the default)")
+        database.add_argument('--live-database', action='store_true',
+                              help="In-process only: write tasks to the configured database instead")
+        parser.add_argument('--duration', type=float, help="Override the scenario duration (seconds)")
+        parser.add_argument('--warmup', type=float, help="Override the warm-up time (seconds)")
+        parser.add_argument('--rps', type=float, help="Override the target rate; 0 sends back to back")
+        parser.add_argument('--concurrency', type=int, help="Override the number of concurrent workers")
+        parser.add_argument('--seed', type=int, help="Override the scenario seed")
+        parser.add_argument('--header', '-H', action='append', metavar='NAME: VALUE',
+                            help="Extra request header, e.g. for a /metrics token (repeatable)")
+        parser.add_argument('--report', '-o', help="Write the JSON report to this file")
+        parser.add_argument('--max-error-rate', type=float,
+                            help="Exit with an error status if the overall error rate exceeds this fraction")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['scenario']) as handle:
+                data = json.load(handle)
+            overrides = {
+                key: options[key] for key in ('duration', 'warmup', 'rps', 'concurrency', 'seed')
+                if options[key] is not None
+            }
+            scenario = loadtest.load_scenario({**data, **overrides})
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot load scenario {options['scenario']}: {e}")
+
+        headers = {**scenario['headers'], **parse_headers(options['header'])}
+        if options['url']:
+            if options['test_database'] or options['live_database']:
+                raise CommandError("--test-database and --live-database only apply to in-process runs")
+            try:
+                target = loadtest.HttpTarget(options['url'], headers=headers)
+            except loadtest.ScenarioError as e:
+                raise CommandError(str(e))
+            environment = contextlib.nullcontext()
+        else:
+            target = loadtest.InProcessTarget(headers=headers)
+            if options['live_database']:
+                self.stderr.write(self.style.WARNING(
+                    "WARNING: --live-database writes the run's tasks and attempts to the configured database"
+                ))
+            environment = self.in_process_environment(not options['live_database'])
+
+        with environment:
+            try:
+                report = loadtest.run_scenario(scenario, target, progress=self.stderr.write)
+            except loadtest.ScenarioError as e:
+                raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+                handle.write('\n')
+            self.stderr.write(f"Wrote report to {options['report']}")
+        self.print_summary(report['results'])
+
+        error_rate = report['results']['error_rate']
+        if options['max_error_rate'] is not None and error_rate > options['max_error_rate']:
+            raise CommandError(f"Error rate {error_rate:.2%} exceeds {options['max_error_rate']:.2%}")
+
+    @contextlib.contextmanager
+    def in_process_environment(self, test_database):
+        from ode_solver.benchmarks import quiet
+
+        # The views' DEBUG prints and error tracebacks would bury the report;
+        # failures still show up in the status counts
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with quiet(), self._in_process(test_database):
+                yield
+        finally:
+            request_logger.setLevel(level)
+
+    @contextlib.contextmanager
+    def _in_process(self, test_database):
+        from django.test.utils import setup_test_environment, teardown_test_environment
+
+        from ode_solver.benchmarks import test_database as throwaway_database
+
+        if test_database:
+            with throwaway_database(on_disk=True):
+                yield
+            return
+        # Lets the test client's "testserver" host through ALLOWED_HOSTS
+        setup_test_environment()
+        try:
+            yield
+        finally:
+            teardown_test_environment()
+
+    def print_summary(self, results):
+        def ms(value):
+            return '-' if value is None else f"{value:.1f}"
+
+        self.stdout.write(
+            f"{'action':<20} {'requests':>8} {'rps':>8} {'errors':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        )
+        rows = list(results['actions'].items()) + [('total', results)]
+        for name, row in rows:
+            latency = row['latency_ms']
+            queries = row.get('queries_per_request')
+            self.stdout.write(
+                f"{name:<20} {row['requests']:>8} {row['throughput_rps']:>8.1f} {row['error_rate']:>7.1%} "
+                f"{ms(latency['p50']):>8} {ms(latency['p95']):>8} {ms(latency['p99']):>8} "
+                f"{'-' if queries is None else f'{queries:.1f}':>8}"
+            )
@@ -0,0 +1,90 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import matrix_quality
+from ode_solver.services import COEFFICIENT_RANGE, MIN_TRACE, TRACE_TARGET
+
+
+class Command(BaseCommand):
+    help = "Summarize rank-1 quality, singular-value gaps and conditioning of stored or freshly sampled matrices"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=('sample', 'bank'), default='sample',
+                            help="Draw fresh matrices like the generator, or read the stored tasks")
+        parser.add_argument('--samples', type=int, default=1000000, help="Matrices to draw with --source sample")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for --source sample")
+        parser.add_argument('--coefficient-range', type=float, default=COEFFICIENT_RANGE,
+                            help="Sample a and r from [-range, range]")
+        parser.add_argument('--min-trace', type=float, default=MIN_TRACE,
+                            help="Trace magnitude below which the generator corrects the trace")
+        parser.add_argument('--trace-target', type=float, default=TRACE_TARGET,
+                            help="Value the generator's trace correction aims for")
+        parser.add_argument('--decimals', type=int,
+                            help="Round coefficients to this many decimals first, as a lossy store would")
+        parser.add_argument('--rank-tolerance', type=float, default=matrix_quality.DEFAULT_RANK_TOLERANCE,
+                            help="Threshold for the rank-1 test and the numerical rank")
+        parser.add_argument('--database', default='default', help="Database alias for --source bank")
+        parser.add_argument('--chunk-size', type=int, default=matrix_quality.DEFAULT_CHUNK_SIZE,
+                            help="Matrices analyzed per batch")
+        parser.add_argument('--output', '-o', help="Also write the summary as JSON to this file")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        if options['source'] == 'bank':
+            from ode_solver.models import ODETask
+            batches = matrix_quality.bank_matrices(ODETask.objects.using(options['database']), chunk_size)
+        else:
+            if options['samples'] < 1:
+                raise CommandError("--samples must be positive")
+            batches = matrix_quality.iter_samples(
+                options['samples'], options['seed'], chunk_size,
+                coefficient_range=options['coefficient_range'],
+                min_trace=options['min_trace'],
+                trace_target=options['trace_target'],
+            )
+
+        distribution = matrix_quality.Distribution()
+        started = time.perf_counter()
+        for matrices in batches:
+            if not len(matrices):
+                continue
+            if options['decimals'] is not None:
+                matrices = np.round(matrices, options['decimals'])
+            measures = matrix_quality.analyze(matrices, options['rank_tolerance'])
+            distribution.add(measures, matrix_quality.flags(
+                measures, rank_tolerance=options['rank_tolerance'], min_trace=options['min_trace'],
+            ))
+        elapsed = time.perf_counter() - started
+
+        summary = distribution.summary()
+        summary['source'] = options['source']
+        summary['parameters'] = {
+            key: options[key] for key in (
+                'samples', 'seed', 'coefficient_range', 'min_trace', 'trace_target', 'decimals', 'rank_tolerance',
+            )
+        }
+        if options['source'] == 'bank':
+            for key in ('samples', 'seed', 'coefficient_range', 'trace_target'):
+                del summary['parameters'][key]
+
+        self.print_summary(summary)
+        self.stderr.write(f"Analyzed {summary['matrices']} matrices in {elapsed:.2f}s")
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(summary, handle, indent=2)
+                handle.write('\n')
+
+    def print_summary(self, summary):
+        columns = ('mean', 'min', 'p1', 'p50', 'p99', 'max')
+        self.stdout.write(f"{'measure':<22}" + ''.join(f"{column:>12}" for column in columns) + f"{'nonfinite':>11}")
+        for name, entry in summary['measures'].items():
+            cells = ''.join(
+                f"{entry[column]:>12.4g}" if column in entry else f"{'-':>12}" for column in columns
+            )
+            self.stdout.write(f"{name:<22}{cells}{entry['nonfinite']:>11}")
+        total = max(summary['matrices'], 1)
+        for name, count in summary['flags'].items():
+            self.stdout.write(f"{name}: {count} ({count / total:.3%})")
@@ -0,0 +1,55 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ode_solver import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued solver jobs from the database (POST /api/jobs/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Exit when the queue is empty instead of polling for new jobs")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds to sleep when the queue is empty (default: ODE_SOLVER_JOBS)")
+        parser.add_argument('--worker-id', default=None, help="Name recorded on claimed jobs (default: host:pid)")
+        parser.add_argument('--max-jobs', type=int, default=0, help="Exit after this many jobs (0 = no limit)")
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or jobs.default_worker_id()
+        poll_interval = options['poll_interval'] or jobs.get_config()['POLL_INTERVAL']
+        self._stopping = False
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._stop)
+
+        self.stderr.write(f"Job worker {worker_id} started")
+        processed = 0
+        while not self._stopping:
+            close_old_connections()
+            job = jobs.claim_next_job(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            started = time.monotonic()
+            try:
+                jobs.run_job(job)
+            except jobs.LeaseLost:
+                self.stderr.write(f"Job {job.pk}: lease lost to another worker")
+                continue
+            processed += 1
+            self.stderr.write(f"Job {job.pk} ({job.kind}) {job.status} in {time.monotonic() - started:.2f}s")
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+        self.stderr.write(f"Job worker {worker_id} stopped after {processed} job(s)")
+
+    def _stop(self, signum, frame):
+        # First signal: finish the current job, then exit. Second: exit now.
+        if self._stopping:
+            raise KeyboardInterrupt
+        self._stopping = True
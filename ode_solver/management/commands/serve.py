@@ -0,0 +1,107 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ode_solver import admission, metrics, server, warmup
+
+
+class Command(BaseCommand):
+    help = "Serve the app with preforked gunicorn workers (WSGI, or ASGI with --asgi)"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        config = server.get_config()
+        parser.add_argument('addrport', nargs='?', default=config['BIND'],
+                            help=f"Address and port to bind (default {config['BIND']})")
+        parser.add_argument('--asgi', action='store_const', const='asgi', dest='interface', default='wsgi',
+                            help="Serve the ASGI application (asgi.py) instead of WSGI")
+        parser.add_argument('--workers', '-w', type=int, default=config['WORKERS'],
+                            help=f"Worker processes (default: available CPUs, {server.available_cpus()} here)")
+        parser.add_argument('--threads', type=int, default=config['THREADS'], help="Threads per WSGI worker")
+        parser.add_argument('--worker-connections', type=int, default=config['WORKER_CONNECTIONS'],
+                            help="Concurrent connections per ASGI worker")
+        parser.add_argument('--blas-threads', type=int, default=config['BLAS_THREADS'],
+                            help="BLAS/OpenMP threads per worker, unless already set in the environment")
+        parser.add_argument('--max-requests', type=int, default=config['MAX_REQUESTS'],
+                            help="Recycle a worker after this many requests (0 disables)")
+        parser.add_argument('--max-requests-jitter', type=int, default=config['MAX_REQUESTS_JITTER'],
+                            help="Random extra requests per worker so recycling is staggered")
+        parser.add_argument('--max-rss', type=int, default=config['MAX_RSS_MB'], metavar='MB',
+                            help="Recycle a worker once its RSS exceeds this many MiB (0 disables)")
+        parser.add_argument('--timeout', type=int, default=config['TIMEOUT'],
+                            help="Restart a worker silent for this many seconds")
+        parser.add_argument('--graceful-timeout', type=int, default=config['GRACEFUL_TIMEOUT'],
+                            help="Seconds workers get to finish in-flight requests on SIGTERM or recycling")
+        parser.add_argument('--no-preload', action='store_false', dest='preload', default=config['PRELOAD'],
+                            help="Load the app in each worker instead of once before forking")
+        parser.add_argument('--access-log', help="Access log file, or '-' for stderr")
+        parser.add_argument('--log-level', default='info', help="gunicorn log level")
+        parser.add_argument('--print-config', action='store_true',
+                            help="Print the resolved gunicorn settings and exit")
+
+    def handle(self, *args, **options):
+        if server.BaseApplication is None:
+            raise CommandError("manage.py serve needs gunicorn: pip install gunicorn")
+        blas = server.cap_blas_threads(options['blas_threads'])
+        if 'numpy' in sys.modules:
+            self.stderr.write("Warning: NumPy was imported before serve started; BLAS thread caps may not apply")
+
+        config = {
+            **server.get_config(),
+            'BIND': options['addrport'],
+            'WORKERS': options['workers'],
+            'THREADS': max(1, options['threads']),
+            'WORKER_CONNECTIONS': options['worker_connections'],
+            'MAX_REQUESTS': max(0, options['max_requests']),
+            'MAX_REQUESTS_JITTER': max(0, options['max_requests_jitter']),
+            'MAX_RSS_MB': max(0, options['max_rss']),
+            'TIMEOUT': options['timeout'],
+            'GRACEFUL_TIMEOUT': options['graceful_timeout'],
+            'PRELOAD': options['preload'],
+        }
+        interface = options['interface']
+        try:
+            gunicorn_options = server.gunicorn_options(config, interface, options['access_log'], options['log_level'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        if options['print_config']:
+            for key, value in sorted(gunicorn_options.items()):
+                self.stdout.write(f"{key} = {value!r}")
+            for name, value in blas.items():
+                self.stdout.write(f"{name}={value}")
+            return
+
+        workers = gunicorn_options['workers']
+        if workers > 1 and not metrics.get_config()['MULTIPROCESS_DIR']:
+            self.stderr.write(
+                "Warning: ODE_SOLVER_METRICS_DIR is not set; each /metrics scrape reports one worker only"
+            )
+        local_caches = server.process_local_caches()
+        if workers > 1 and local_caches:
+            self.stderr.write(
+                f"Warning: cache {', '.join(local_caches)} is local to each worker, so Idempotency-Key replays "
+                f"and replica read pins only hold within one worker; set ODE_SOLVER_CACHE to a redis:// URL or 'db'"
+            )
+        if workers > 1 and admission.get_config()['RATE_LIMITS']:
+            self.stderr.write(
+                f"Note: rate limits and admission slots are per worker; a client may get up to {workers}x "
+                f"the configured rate"
+            )
+        if interface == 'wsgi':
+            app_path = settings.WSGI_APPLICATION
+            concurrency = f"{gunicorn_options['worker_class']} workers x {config['THREADS']} threads"
+        else:
+            app_path = getattr(settings, 'ASGI_APPLICATION', None) or config['ASGI_APPLICATION']
+            concurrency = f"{gunicorn_options['worker_class']} workers"
+        recycling = [f"{config['MAX_REQUESTS']}+{config['MAX_REQUESTS_JITTER']} requests"] if config['MAX_REQUESTS'] else []
+        if config['MAX_RSS_MB']:
+            recycling.append(f"{config['MAX_RSS_MB']} MiB RSS")
+        self.stderr.write(
+            f"Serving {app_path} on {config['BIND']} with {workers} {concurrency}; "
+            f"BLAS threads {blas['OPENBLAS_NUM_THREADS']}; "
+            f"recycling after {' or '.join(recycling) or 'never'}; "
+            f"{'preloaded' if config['PRELOAD'] else 'loaded per worker'}"
+            f"{', warm-up on' if warmup.get_config()['ENABLED'] else ''}"
+        )
+        server.Application(app_path, gunicorn_options, config, warmup.get_config()).run()
@@ -0,0 +1,170 @@
+"""
+Vectorized numerical-quality measures for coefficient matrices.
+
+``analyze`` takes an (N, 4, 4) array and returns one array of length N
+per measure, all computed in a handful of batched NumPy calls:
+
+- ``sigma1``, ``relative_sigma2``: the largest singular value and
+  σ₂/σ₁; a rank-1 matrix has σ₂ = 0
+- ``singular_gap``: log10(σ₁/σ₂), digits separating the matrix from rank 2
+- ``rank_one_error``: ‖A - A₁‖_F / ‖A‖_F for the best rank-1
+  approximation A₁ (by Eckart–Young, √(σ₂² + σ₃² + σ₄²) / ‖σ‖)
+- ``square_residual``: max |A² - tr(A) A| scaled as in ``audit.is_rank_one``,
+  the test the audit and validation use to pick the closed form
+- ``row_ratio_spread``: for each row, the spread max_j - min_j of the ratios
+  A[i, j] / A[p, j] against the largest row p, worst row taken; the check
+  the ``analyze_*.py`` scripts did by hand
+- ``trace``, ``trace_magnitude``: λ = tr(A), the only non-zero eigenvalue
+- ``eigenvalue_condition``: σ₁/|tr(A)|, the condition number of λ for
+  A = a rᵀ (‖a‖‖r‖/|r·a|); large values mean λ, and so every answer,
+  is sensitive to rounding of the coefficients
+- ``numerical_rank``: singular values above ``rank_tolerance``·σ₁
+- ``max_abs``: largest coefficient magnitude
+
+``sample_generator_matrices`` draws matrices the way
+``ODEGenerator._generate_coefficients`` does, vectorized, so a million
+candidates for a new range or trace threshold are analyzed in seconds.
+``bank_matrices`` streams the stored tasks' matrices through the audit's
+chunked reader.
+"""
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from . import audit
+from .services import COEFFICIENT_RANGE, MIN_TRACE, TRACE_TARGET
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_RANK_TOLERANCE = 1e-9
+DEFAULT_PERCENTILES = (1, 5, 50, 95, 99)
+# The generator's documented bound on coefficient magnitude
+MAX_COEFFICIENT = 0.5
+# Matching attempts of the generator's trace correction loop
+TRACE_FIX_ATTEMPTS = 10
+
+MEASURES = (
+    'sigma1', 'relative_sigma2', 'singular_gap', 'rank_one_error', 'square_residual',
+    'row_ratio_spread', 'trace', 'trace_magnitude', 'eigenvalue_condition', 'numerical_rank', 'max_abs',
+)
+
+
+def _row_ratio_spread(matrices: np.ndarray) -> np.ndarray:
+    size = len(matrices)
+    pivot_rows = matrices[np.arange(size), np.linalg.norm(matrices, axis=2).argmax(axis=1)]
+    scale = np.abs(pivot_rows).max(axis=1, keepdims=True)
+    valid = np.abs(pivot_rows) > 1e-10 * np.maximum(scale, 1e-300)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = matrices / np.where(valid, pivot_rows, 1.0)[:, None, :]
+    valid = np.broadcast_to(valid[:, None, :], ratios.shape)
+    highest = np.where(valid, ratios, -np.inf).max(axis=2)
+    lowest = np.where(valid, ratios, np.inf).min(axis=2)
+    spread = np.where(np.isfinite(highest) & np.isfinite(lowest), highest - lowest, 0.0)
+    return spread.max(axis=1)
+
+
+def analyze(matrices, rank_tolerance: float = DEFAULT_RANK_TOLERANCE) -> Dict[str, np.ndarray]:
+    """Every measure in ``MEASURES`` for an (N, 4, 4) array of matrices"""
+    matrices = np.asarray(matrices, dtype=float)
+    if matrices.ndim != 3 or matrices.shape[1:] != (4, 4):
+        raise ValueError(f"Expected an (N, 4, 4) array, got shape {matrices.shape}")
+
+    singular = np.linalg.svd(matrices, compute_uv=False)
+    sigma1, sigma2 = singular[:, 0], singular[:, 1]
+    frobenius = np.linalg.norm(singular, axis=1)
+    trace = np.einsum('nii->n', matrices)
+    residual = np.einsum('nij,njk->nik', matrices, matrices) - trace[:, None, None] * matrices
+    scale = np.maximum(1.0, np.abs(matrices).max(axis=(1, 2)) ** 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'sigma1': sigma1,
+            'relative_sigma2': np.where(sigma1 > 0, sigma2 / sigma1, 0.0),
+            'singular_gap': np.log10(sigma1 / sigma2),
+            'rank_one_error': np.where(
+                frobenius > 0, np.linalg.norm(singular[:, 1:], axis=1) / frobenius, 0.0
+            ),
+            'square_residual': np.abs(residual).max(axis=(1, 2)) / scale,
+            'row_ratio_spread': _row_ratio_spread(matrices),
+            'trace': trace,
+            'trace_magnitude': np.abs(trace),
+            'eigenvalue_condition': sigma1 / np.abs(trace),
+            'numerical_rank': (singular > rank_tolerance * sigma1[:, None]).sum(axis=1).astype(float),
+            'max_abs': np.abs(matrices).max(axis=(1, 2)),
+        }
+
+
+def flags(measures: Dict[str, np.ndarray], rank_tolerance: float = DEFAULT_RANK_TOLERANCE,
+          min_trace: float = MIN_TRACE, max_coefficient: float = MAX_COEFFICIENT) -> Dict[str, np.ndarray]:
+    """Boolean masks of matrices the generator should not have produced"""
+    return {
+        'not_rank_one': ~(measures['square_residual'] <= rank_tolerance),
+        'small_trace': measures['trace_magnitude'] < min_trace,
+        'large_coefficient': measures['max_abs'] > max_coefficient,
+    }
+
+
+def sample_generator_matrices(size: int, rng: np.random.Generator,
+                              coefficient_range: float = COEFFICIENT_RANGE,
+                              min_trace: float = MIN_TRACE,
+                              trace_target: float = TRACE_TARGET) -> np.ndarray:
+    """``size`` matrices drawn like ``ODEGenerator._generate_coefficients``, as an (N, 4, 4) array"""
+    a = rng.uniform(-coefficient_range, coefficient_range, (size, 4))
+    r = rng.uniform(-coefficient_range, coefficient_range, (size, 4))
+    trace = np.einsum('ni,ni->n', a, r)
+    for _ in range(TRACE_FIX_ATTEMPTS):
+        low = np.abs(trace) < min_trace
+        if not low.any():
+            break
+        fix_r = low & (np.abs(a[:, 0]) > 1e-10)
+        r[fix_r, 0] = trace_target / a[fix_r, 0]
+        fix_a = low & ~fix_r
+        r0 = r[fix_a, 0]
+        a[fix_a, 0] = np.where(np.abs(r0) > 1e-10, trace_target / np.where(r0 == 0, 1.0, r0), 0.1)
+        trace = np.einsum('ni,ni->n', a, r)
+    return a[:, :, None] * r[:, None, :]
+
+
+def iter_samples(total: int, seed: int, chunk_size: int = DEFAULT_CHUNK_SIZE, **params) -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    remaining = total
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield sample_generator_matrices(size, rng, **params)
+        remaining -= size
+
+
+def bank_matrices(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Well-formed stored matrices, one (N, 4, 4) array per chunk"""
+    for chunk in audit.iter_chunks(queryset, chunk_size=chunk_size):
+        yield chunk.matrices[~chunk.malformed]
+
+
+class Distribution:
+    """Accumulates measures over chunks and summarizes them"""
+
+    def __init__(self):
+        self._parts: Dict[str, list] = {}
+        self._flags: Dict[str, int] = {}
+        self.count = 0
+
+    def add(self, measures: Dict[str, np.ndarray], masks: Optional[Dict[str, np.ndarray]] = None):
+        for name, values in measures.items():
+            self._parts.setdefault(name, []).append(values)
+        for name, mask in (masks or {}).items():
+            self._flags[name] = self._flags.get(name, 0) + int(mask.sum())
+        if measures:
+            self.count += len(next(iter(measures.values())))
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        measures = {}
+        for name, parts in self._parts.items():
+            values = np.concatenate(parts)
+            finite = values[np.isfinite(values)]
+            entry = {'count': int(values.size), 'nonfinite': int(values.size - finite.size)}
+            if finite.size:
+                entry.update(mean=float(finite.mean()), std=float(finite.std()),
+                             min=float(finite.min()), max=float(finite.max()))
+                for p, value in zip(percentiles, np.percentile(finite, percentiles)):
+                    entry[f'p{p:g}'] = float(value)
+            measures[name] = entry
+        return {'matrices': self.count, 'flags': dict(self._flags), 'measures': measures}
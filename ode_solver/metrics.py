@@ -0,0 +1,537 @@
+"""
+In-process metrics exposed at ``/metrics`` in the Prometheus text format.
+
+Counters and histograms live in a process-local registry. With several
+worker processes, set ``ODE_SOLVER_METRICS['MULTIPROCESS_DIR']`` (or the
+``ODE_SOLVER_METRICS_DIR`` environment variable) to a directory shared by
+all of them: every process then writes a snapshot of its values there at
+most once per ``FLUSH_INTERVAL`` seconds and at exit, and a scrape of any
+process sums the snapshots of all of them. Snapshots are named by PID and
+process start time, so a recycled worker that reuses a PID never
+overwrites its predecessor's values. The counters and histograms of exited
+processes are folded into ``aggregate.json`` by the next scrape and their
+snapshots deleted, so counters never go backwards and the directory does
+not grow; clear it when the whole deployment restarts.
+
+Database-wide gauges (task inventory, job queue) are computed at scrape
+time. Per-process gauges (write queue depth, admission slots) are sampled
+into each snapshot and summed.
+"""
+import atexit
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+from django.http import HttpResponse
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': os.environ.get('ODE_SOLVER_METRICS_DIR') or None,
+    'FLUSH_INTERVAL': 1.0,
+    # Require "Authorization: Bearer <TOKEN>" on /metrics when set
+    'TOKEN': None,
+    # Count tasks and jobs at scrape time
+    'DB_GAUGES': True,
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[str, ...]
+
+AGGREGATE_FILENAME = 'aggregate.json'
+LOCK_FILENAME = '.lock'
+_SNAPSHOT_FILENAME = re.compile(r'^metrics-(\d+)(?:-(\w+))?\.json$')
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_METRICS', {})}
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, registry: 'Registry', name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelKey, object] = {}
+        registry.register(self)
+
+    def _key(self, labels: dict) -> LabelKey:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        self.values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+        self.registry.maybe_flush()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self.registry.lock:
+            self.values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, the +Inf bucket last, then sum
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+        self.registry.maybe_flush()
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """Start time of ``pid`` in clock ticks since boot (Linux only), to tell reused PIDs apart"""
+    try:
+        with open(f'/proc/{pid}/stat') as handle:
+            # starttime is field 22; the command name in field 2 may contain spaces
+            return handle.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _snapshot_alive(pid: int, tag: Optional[str]) -> bool:
+    if tag is not None and tag.isdigit():
+        return _process_start(pid) == tag
+    return _pid_alive(pid)
+
+
+def _merge(target: Dict[LabelKey, object], entries):
+    for key, value in entries:
+        key = tuple(key)
+        if isinstance(value, list):
+            current = target.get(key)
+            target[key] = value[:] if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            target[key] = target.get(key, 0.0) + value
+
+
+def _write_json(directory: str, filename: str, data):
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    with os.fdopen(fd, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(tmp, os.path.join(directory, filename))
+
+
+def _read_json(path: str):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors = []
+        self._last_flush = 0.0
+        self._identity = None
+
+    def register(self, metric: _Metric):
+        self.metrics[metric.name] = metric
+
+    def add_collector(self, func):
+        """``func()`` runs before every snapshot to refresh per-process gauges"""
+        self.collectors.append(func)
+        return func
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.reset()
+        self._last_flush = 0.0
+
+    def after_fork(self):
+        # The parent's lock may have been held by a thread that does not exist here
+        self.lock = threading.Lock()
+        self.reset()
+
+    def snapshot(self) -> dict:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        with self.lock:
+            return {
+                name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def _snapshot_path(self, directory: str) -> str:
+        pid = os.getpid()
+        if self._identity is None or self._identity[0] != pid:
+            self._identity = (pid, _process_start(pid) or uuid.uuid4().hex)
+        return os.path.join(directory, f"metrics-{pid}-{self._identity[1]}.json")
+
+    def maybe_flush(self):
+        directory = get_config()['MULTIPROCESS_DIR']
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self._last_flush >= get_config()['FLUSH_INTERVAL']:
+            self._last_flush = now
+            self.flush(directory)
+
+    def flush(self, directory: str = None):
+        directory = directory or get_config()['MULTIPROCESS_DIR']
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        _write_json(directory, os.path.basename(self._snapshot_path(directory)), self.snapshot())
+
+    def _read_directory(self, directory: str):
+        """(snapshot, alive) pairs for the directory, folding exited processes into the aggregate"""
+        aggregate = _read_json(os.path.join(directory, AGGREGATE_FILENAME)) or {'metrics': {}, 'folded': []}
+        already_folded = set(aggregate['folded'])
+        snapshots, dead = [], []
+        for filename in os.listdir(directory):
+            match = _SNAPSHOT_FILENAME.match(filename)
+            if match is None:
+                continue
+            if filename in already_folded:
+                # Folded by a scrape that stopped before deleting it
+                dead.append((filename, None))
+                continue
+            snapshot = _read_json(os.path.join(directory, filename))
+            if snapshot is None:
+                continue
+            if _snapshot_alive(int(match.group(1)), match.group(2)):
+                snapshots.append((snapshot, True))
+            else:
+                dead.append((filename, snapshot))
+        if dead and fcntl is not None:
+            totals = {name: {} for name in aggregate['metrics']}
+            for name, entries in aggregate['metrics'].items():
+                _merge(totals[name], entries)
+            for filename, snapshot in dead:
+                for name, entries in (snapshot or {}).items():
+                    metric = self.metrics.get(name)
+                    # Gauges describe live state and die with their process
+                    if metric is not None and metric.kind != 'gauge':
+                        _merge(totals.setdefault(name, {}), entries)
+            aggregate['metrics'] = {
+                name: [[list(key), value] for key, value in values.items()] for name, values in totals.items()
+            }
+            # Recorded first, so a crash before the unlinks cannot count a snapshot twice
+            aggregate['folded'] = [filename for filename, _ in dead]
+            _write_json(directory, AGGREGATE_FILENAME, aggregate)
+            for filename, _ in dead:
+                try:
+                    os.unlink(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    pass
+        else:
+            snapshots.extend((snapshot, False) for _, snapshot in dead if snapshot is not None)
+        snapshots.append((aggregate['metrics'], False))
+        return snapshots
+
+    def collect(self) -> Dict[str, Dict[LabelKey, object]]:
+        """Values of every metric, summed across processes in multi-process mode"""
+        directory = get_config()['MULTIPROCESS_DIR']
+        if not directory:
+            snapshots = [(self.snapshot(), True)]
+        else:
+            self.flush(directory)
+            if fcntl is None:
+                snapshots = self._read_directory(directory)
+            else:
+                # One scrape at a time, so no exited process is folded twice
+                with open(os.path.join(directory, LOCK_FILENAME), 'a') as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    snapshots = self._read_directory(directory)
+        merged = {name: {} for name in self.metrics}
+        for snapshot, alive in snapshots:
+            for name, entries in snapshot.items():
+                if name not in merged:
+                    continue
+                # Gauges describe live state; drop those of exited processes
+                if self.metrics[name].kind == 'gauge' and not alive:
+                    continue
+                _merge(merged[name], entries)
+        return merged
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+if hasattr(os, 'register_at_fork'):
+    # A forked worker must not re-report the values it inherited from its parent
+    os.register_at_fork(after_in_child=REGISTRY.after_fork)
+
+
+SOLVE_SECONDS = Histogram(
+    REGISTRY, 'ode_solver_solve_seconds', 'Wall time of ODEGenerator._solve_system', ['outcome'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+SOLVE_FAILURES = Counter(
+    REGISTRY, 'ode_solver_solve_failures_total', 'Failed _solve_system calls by reason', ['reason'],
+)
+SOLVE_TIGHTENINGS = Counter(
+    REGISTRY, 'ode_solver_solve_tolerance_tightenings_total',
+    'Re-solves at tighter tolerances because the answer was too close to a rounding boundary',
+)
+GENERATION_SECONDS = Histogram(
+    REGISTRY, 'ode_solver_generation_seconds', 'Wall time of generate_valid_ode_task', ['outcome'],
+)
+GENERATION_ATTEMPTS = Histogram(
+    REGISTRY, 'ode_solver_generation_attempts', 'Attempts used per generate_valid_ode_task call', ['outcome'],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+GENERATION_FAILURES = Counter(
+    REGISTRY, 'ode_solver_generation_failures_total', 'Failed generate_valid_ode_task calls by reason', ['reason'],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    REGISTRY, 'ode_solver_http_request_seconds', 'Request latency by view', ['view', 'method', 'status'],
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    REGISTRY, 'ode_solver_http_request_queries', 'Database queries per request by view', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+WRITE_QUEUE_DEPTH = Gauge(
+    REGISTRY, 'ode_solver_write_queue_depth', 'Task inserts waiting in the SQLite write queue',
+)
+ADMISSION_ACTIVE = Gauge(
+    REGISTRY, 'ode_solver_admission_active', 'Requests holding an admission slot', ['scope'],
+)
+ADMISSION_WAITING = Gauge(
+    REGISTRY, 'ode_solver_admission_waiting', 'Requests queued for an admission slot', ['scope'],
+)
+ATTEMPT_BUFFER_DEPTH = Gauge(
+    REGISTRY, 'ode_solver_attempt_buffer_depth', 'Verify attempts waiting to be written',
+)
+WARMUP_SECONDS = Histogram(
+    REGISTRY, 'ode_solver_warmup_seconds', 'Worker warm-up time', ['outcome'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+WORKERS_READY = Gauge(
+    REGISTRY, 'ode_solver_workers_ready', 'Worker processes that have finished warm-up',
+)
+WORKER_EXITS = Counter(
+    REGISTRY, 'ode_solver_worker_exits_total',
+    'manage.py serve worker exits by reason (max_requests, rss, shutdown)', ['reason'],
+)
+ATTEMPTS_DROPPED = Counter(
+    REGISTRY, 'ode_solver_attempts_dropped_total', 'Verify attempts dropped instead of written',
+)
+
+
+@REGISTRY.add_collector
+def _collect_process_gauges():
+    from . import admission, attempts, sqlite_tuning
+
+    queue = sqlite_tuning._write_queue
+    WRITE_QUEUE_DEPTH.set(queue.qsize() if queue is not None else 0)
+    buffer = attempts._buffer
+    ATTEMPT_BUFFER_DEPTH.set(buffer.pending() if buffer is not None else 0)
+    for scope, limiter in list(admission._limiters.items()):
+        ADMISSION_ACTIVE.set(limiter.active, scope=scope)
+        ADMISSION_WAITING.set(limiter.waiting, scope=scope)
+
+
+def _grouped_counts(model, field: str) -> Dict[LabelKey, float]:
+    from django.db.models import Count
+
+    rows = model.objects.order_by().values(field).annotate(n=Count('pk')).values_list(field, 'n')
+    return {(str(value).lower(),): float(count) for value, count in rows}
+
+
+def _database_gauges() -> list:
+    from .models import Job, ODETask
+
+    tasks = _grouped_counts(ODETask, 'is_valid')
+    jobs = {(status,): 0.0 for status, _ in Job.STATUS_CHOICES}
+    jobs.update(_grouped_counts(Job, 'status'))
+    return [
+        ('ode_solver_tasks', 'gauge', 'Stored tasks by validity', tasks, ('valid',)),
+        ('ode_solver_jobs', 'gauge', 'Background jobs by status', jobs, ('status',)),
+    ]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def render() -> str:
+    """Prometheus text exposition of every metric"""
+    lines = []
+    merged = REGISTRY.collect()
+    for name, metric in REGISTRY.metrics.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(merged[name].items()):
+            if metric.kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                    cumulative += count
+                    le = _labels(metric.labelnames, key, f'le="{_number(bound)}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, key)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(value)}")
+    if get_config()['DB_GAUGES']:
+        for name, kind, documentation, values, labelnames in _database_gauges():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values.items()):
+                lines.append(f"{name}{_labels(labelnames, key)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = get_config()['TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+# Queries run by the current request; a mutable cell so sync_to_async threads share it
+_query_count: ContextVar = ContextVar('ode_solver_query_count', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created handler adding the query counter to every new connection"""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+class MetricsMiddleware:
+    """Record latency and query count for every request, labelled by URL name"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        counter = [0]
+        token = _query_count.set(counter)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        self._record(request, response, time.perf_counter() - start, counter[0])
+        return response
+
+    async def _acall(self, request):
+        counter = [0]
+        token = _query_count.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        self._record(request, response, time.perf_counter() - start, counter[0])
+        return response
+
+    def _record(self, request, response, elapsed, queries):
+        if not get_config()['ENABLED']:
+            return
+        match = getattr(request, 'resolver_match', None)
+        # URL names keep label cardinality bounded; raw paths would not
+        view = (match.url_name or match.view_name) if match is not None else 'unmatched'
+        if view == 'metrics':
+            return
+        HTTP_REQUEST_SECONDS.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        HTTP_REQUEST_QUERIES.observe(queries, view=view)
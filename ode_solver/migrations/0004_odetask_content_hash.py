@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:23
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def compute_content_hash(coefficients, initial_conditions, target_time):
+    # Frozen copy of ode_solver.models.compute_content_hash as of this migration
+    if isinstance(coefficients, str):
+        coefficients = json.loads(coefficients)
+    canonical = json.dumps(
+        {
+            'coefficients': coefficients,
+            'initial_conditions': ['%.15f' % float(v) for v in initial_conditions],
+            'target_time': '%.15f' % float(target_time),
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def fill_content_hash(apps, schema_editor):
+    # Raw SQL: some legacy rows hold values outside the DecimalField range,
+    # which would make the ORM's decimal conversion fail on load.
+    ODETask = apps.get_model('ode_solver', 'ODETask')
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(ODETask._meta.db_table)
+    last_pk = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, coefficients, x0, y0, z0, w0, target_time FROM {table} "
+                f"WHERE id > %s ORDER BY id LIMIT %s",
+                [last_pk, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = [
+            (compute_content_hash(coefficients, (x0, y0, z0, w0), target_time), pk)
+            for pk, coefficients, x0, y0, z0, w0, target_time in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"UPDATE {table} SET content_hash = %s WHERE id = %s", updates)
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ode_solver', '0003_solution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='odetask',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='SHA-256 of coefficients, initial conditions and target time', max_length=64),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
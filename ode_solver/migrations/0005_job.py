@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ode_solver', '0004_odetask_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('custom', 'Solve a custom system'), ('generate', 'Generate a batch of tasks')], max_length=16)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('params', models.JSONField(help_text='Validated request parameters')),
+                ('progress', models.IntegerField(default=0, help_text='Units of work completed')),
+                ('total', models.IntegerField(default=1, help_text='Units of work in the job')),
+                ('result', models.JSONField(blank=True, help_text='Created tasks and failure counts', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.IntegerField(default=0)),
+                ('worker', models.CharField(blank=True, default='', help_text='Worker holding the lease', max_length=128)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='ode_solver__status_f5e764_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ode_solver', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptStats',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attempt_stats', serialize=False, to='ode_solver.odetask')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Attempt stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_solution', models.BigIntegerField(blank=True, help_text='Submitted answer; empty if it was not an integer', null=True)),
+                ('is_correct', models.BooleanField()),
+                ('client', models.CharField(blank=True, default='', help_text='Client address', max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the answer was verified')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='ode_solver.odetask')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'created_at'], name='ode_solver__task_id_6c5865_idx')],
+            },
+        ),
+    ]
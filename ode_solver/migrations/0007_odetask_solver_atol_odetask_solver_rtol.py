@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ode_solver', '0006_attempt_attemptstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='odetask',
+            name='solver_atol',
+            field=models.FloatField(blank=True, help_text='solve_ivp absolute tolerance', null=True),
+        ),
+        migrations.AddField(
+            model_name='odetask',
+            name='solver_rtol',
+            field=models.FloatField(blank=True, help_text='solve_ivp relative tolerance', null=True),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:58
+
+import hashlib
+import json
+from decimal import Decimal
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def _as_floats(value):
+    if isinstance(value, dict):
+        return {key: _as_floats(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_as_floats(item) for item in value]
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def compute_content_hash(coefficients, initial_conditions, target_time):
+    # Frozen copy of ode_solver.models.compute_content_hash as of this migration
+    if isinstance(coefficients, str):
+        coefficients = json.loads(coefficients)
+    canonical = json.dumps(
+        {
+            'coefficients': _as_floats(coefficients),
+            'initial_conditions': ['%.15f' % float(v) for v in initial_conditions],
+            'target_time': '%.15f' % float(target_time),
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def rehash_content(apps, schema_editor):
+    # Legacy rows store integer coefficients, which used to hash differently
+    # from the floats the importer and the solver produce. Raw SQL for the
+    # same reason as 0004: some legacy values do not load through the ORM.
+    ODETask = apps.get_model('ode_solver', 'ODETask')
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(ODETask._meta.db_table)
+    last_pk = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, coefficients, x0, y0, z0, w0, target_time, content_hash FROM {table} "
+                f"WHERE id > %s ORDER BY id LIMIT %s",
+                [last_pk, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for pk, coefficients, x0, y0, z0, w0, target_time, content_hash in rows:
+            rehashed = compute_content_hash(coefficients, (x0, y0, z0, w0), target_time)
+            if rehashed != content_hash:
+                updates.append((rehashed, pk))
+        if updates:
+            with connection.cursor() as cursor:
+                cursor.executemany(f"UPDATE {table} SET content_hash = %s WHERE id = %s", updates)
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ode_solver', '0007_odetask_solver_atol_odetask_solver_rtol'),
+    ]
+
+    operations = [
+        migrations.RunPython(rehash_content, migrations.RunPython.noop),
+    ]
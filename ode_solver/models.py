@@ -1,9 +1,37 @@
 from django.db import models
 from django.utils import timezone
+import hashlib
 import json
 from decimal import Decimal
 
 
+def _as_floats(value):
+    """Coefficients with every number as a float, so 1 and 1.0 hash alike"""
+    if isinstance(value, dict):
+        return {key: _as_floats(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_as_floats(item) for item in value]
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def compute_content_hash(coefficients, initial_conditions, target_time):
+    """SHA-256 over the inputs that define a task (coefficients, u(0), t_f)"""
+    if isinstance(coefficients, str):
+        coefficients = json.loads(coefficients)
+    canonical = json.dumps(
+        {
+            'coefficients': _as_floats(coefficients),
+            'initial_conditions': ['%.15f' % float(v) for v in initial_conditions],
+            'target_time': '%.15f' % float(target_time),
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
 class ODETask(models.Model):
     # Coefficients for the four coupled nonlinear ODE system
     # Each equation has coefficients for terms like: x, y, z, w, xy, xz, xw, yz, yw, zw, x^2, y^2, z^2, w^2, etc.
@@ -34,14 +62,59 @@ class ODETask(models.Model):
     # Final integer solution
     final_solution = models.IntegerField(null=True, blank=True, help_text="Final integer solution ℒ")
     
+    # Solver tolerances the ground truth was computed with
+    solver_rtol = models.FloatField(null=True, blank=True, help_text="solve_ivp relative tolerance")
+    solver_atol = models.FloatField(null=True, blank=True, help_text="solve_ivp absolute tolerance")
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_valid = models.BooleanField(default=False, help_text="Whether the system was successfully solved")
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True,
+                                    help_text="SHA-256 of coefficients, initial conditions and target time")
     
     def __str__(self):
         return f"ODETask {self.pk}: t_f={self.target_time}"
     
+    def save(self, *args, **kwargs):
+        if not self.content_hash:
+            self.content_hash = self.compute_content_hash()
+        super().save(*args, **kwargs)
+    
+    def compute_content_hash(self):
+        return compute_content_hash(
+            self.coefficients, (self.x0, self.y0, self.z0, self.w0), self.target_time
+        )
+    
+    @classmethod
+    def from_task_data(cls, task_data, is_valid=True):
+        """Build an unsaved task from the dict returned by ODEGenerator"""
+        initial_conditions = task_data['initial_conditions']
+        solution = task_data['solution']
+        final_values = solution['final_values']
+        task = cls(
+            coefficients=task_data['coefficients'],
+            x0=initial_conditions['x0'],
+            y0=initial_conditions['y0'],
+            z0=initial_conditions['z0'],
+            w0=initial_conditions['w0'],
+            target_time=task_data['target_time'],
+            x_final=final_values[0],
+            y_final=final_values[1],
+            z_final=final_values[2],
+            w_final=final_values[3],
+            weighted_sum=solution['weighted_sum'],
+            arc_length=solution['arc_length'],
+            curvature=solution['curvature'],
+            final_solution=solution['final_solution'],
+            solver_rtol=solution.get('rtol'),
+            solver_atol=solution.get('atol'),
+            is_valid=is_valid
+        )
+        # bulk_create() bypasses save(), so fill the hash up front
+        task.content_hash = task.compute_content_hash()
+        return task
+    
     def get_coefficients_dict(self):
         """Return coefficients as a dictionary"""
         if isinstance(self.coefficients, str):
@@ -174,3 +247,89 @@ class Solution(models.Model):
             'curvature': float(self.curvature) if self.curvature else None,
             'final_solution': self.final_solution
         }
+
+
+class Job(models.Model):
+    """Queued solver work, executed by ``manage.py run_jobs``"""
+    
+    KIND_CUSTOM = 'custom'
+    KIND_GENERATE = 'generate'
+    KIND_CHOICES = [
+        (KIND_CUSTOM, 'Solve a custom system'),
+        (KIND_GENERATE, 'Generate a batch of tasks'),
+    ]
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+    
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    params = models.JSONField(help_text="Validated request parameters")
+    progress = models.IntegerField(default=0, help_text="Units of work completed")
+    total = models.IntegerField(default=1, help_text="Units of work in the job")
+    result = models.JSONField(null=True, blank=True, help_text="Created tasks and failure counts")
+    error = models.TextField(blank=True, default='')
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=128, blank=True, default='', help_text="Worker holding the lease")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+    
+    def __str__(self):
+        return f"Job {self.pk} ({self.kind}, {self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+
+class Attempt(models.Model):
+    """One submission to the verify endpoint, written in batches by ``attempts.py``"""
+    
+    task = models.ForeignKey(ODETask, on_delete=models.CASCADE, related_name='attempts')
+    submitted_solution = models.BigIntegerField(null=True, blank=True, help_text="Submitted answer; empty if it was not an integer")
+    is_correct = models.BooleanField()
+    client = models.CharField(max_length=64, blank=True, default='', help_text="Client address")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the answer was verified")
+    
+    class Meta:
+        indexes = [models.Index(fields=['task', 'created_at'])]
+    
+    def __str__(self):
+        return f"Attempt {self.pk} on task {self.task_id} ({'correct' if self.is_correct else 'wrong'})"
+
+
+class AttemptStats(models.Model):
+    """Running attempt totals per task, updated with every attempt flush"""
+    
+    task = models.OneToOneField(ODETask, on_delete=models.CASCADE, primary_key=True, related_name='attempt_stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name_plural = "Attempt stats"
+    
+    def __str__(self):
+        return f"Task {self.task_id}: {self.correct}/{self.attempts} correct"
+    
+    @property
+    def solve_rate(self):
+        return self.correct / self.attempts if self.attempts else None
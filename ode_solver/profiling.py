@@ -0,0 +1,255 @@
+"""
+On-demand profiling of single requests.
+
+``ProfilingMiddleware`` does nothing unless a request asks for a profile
+with the ``X-Profile`` header or ``?profile=`` and is allowed to: the user
+is staff, or the request carries ``X-Profile-Token`` matching
+``ODE_SOLVER_PROFILING['TOKEN']``. A profiled request writes into
+``OUTPUT_DIR``:
+
+- ``<id>.prof``: cProfile data for the request thread (``pstats``/snakeviz)
+- ``<id>.txt``: request summary and the top functions by cumulative time
+- ``<id>.folded``: sampled stacks in the folded format read by
+  ``flamegraph.pl`` and speedscope
+- ``<id>.alloc.txt``: top allocations by line from ``tracemalloc``
+
+The response carries the id in ``X-Profile-Id``. The sampler covers the
+request thread and any thread started during the request, so solver calls
+that ``ODEGenerator`` runs on its timeout thread show up in the flame
+graph. Use ``?profile=sample`` to skip cProfile, which inflates the cost of
+Python-heavy code. One request per process is profiled at a time. Under
+ASGI the middleware stays on the event loop; a profiled request samples
+every thread, and its cProfile data includes whatever else the loop runs
+while it is in flight.
+"""
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': True,
+    'OUTPUT_DIR': None,
+    # Lets non-staff clients profile with "X-Profile-Token: <TOKEN>"
+    'TOKEN': None,
+    'SAMPLE_INTERVAL': 0.002,
+    'TRACEMALLOC_FRAMES': 10,
+    'TOP_N': 40,
+}
+
+MODES = ('cprofile', 'sample')
+
+
+def get_config() -> dict:
+    config = {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_PROFILING', {})}
+    if not config['OUTPUT_DIR']:
+        config['OUTPUT_DIR'] = Path(settings.BASE_DIR) / 'profiles'
+    return config
+
+
+class StackSampler:
+    """Background thread counting the stacks of the watched threads"""
+
+    def __init__(self, thread_id: int, interval: float, all_threads: bool = False):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        # Threads that existed before the request, other than the watched one, are skipped
+        self._baseline = set() if all_threads else {thread.ident for thread in threading.enumerate()} - {thread_id}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='ode-profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self._baseline:
+                    continue
+                self.stacks[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def requested_mode(request):
+    """Profiling mode asked for by the request, or None"""
+    value = request.headers.get('X-Profile') or request.GET.get('profile')
+    if not value:
+        return None
+    value = value.lower()
+    if value in MODES:
+        return value
+    return 'cprofile' if value in ('1', 'true', 'yes') else None
+
+
+def _token_matches(request, config) -> bool:
+    token = config['TOKEN']
+    provided = request.headers.get('X-Profile-Token')
+    return bool(token) and provided is not None and hmac.compare_digest(provided.encode(), str(token).encode())
+
+
+def is_authorized(request, config) -> bool:
+    if _token_matches(request, config):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+async def ais_authorized(request, config) -> bool:
+    """``is_authorized`` for async requests, where ``request.user`` must not be touched"""
+    if _token_matches(request, config):
+        return True
+    if not hasattr(request, 'auser'):
+        return False
+    user = await request.auser()
+    return user.is_authenticated and user.is_staff
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it; place after AuthenticationMiddleware"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+        self.get_response = get_response
+        self._busy = threading.Lock()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        config = get_config()
+        mode = requested_mode(request) if config['ENABLED'] else None
+        if mode is None or not is_authorized(request, config):
+            return self.get_response(request)
+        if not self._busy.acquire(blocking=False):
+            return _skipped(self.get_response(request))
+        try:
+            session = ProfileSession(mode, config)
+            try:
+                response = self.get_response(request)
+            finally:
+                session.stop()
+            return session.finish(request, response)
+        finally:
+            self._busy.release()
+
+    async def _acall(self, request):
+        config = get_config()
+        mode = requested_mode(request) if config['ENABLED'] else None
+        if mode is None or not await ais_authorized(request, config):
+            return await self.get_response(request)
+        if not self._busy.acquire(blocking=False):
+            return _skipped(await self.get_response(request))
+        try:
+            # Sync views run on an executor thread that predates the request,
+            # so every thread is sampled; the profile also covers whatever
+            # else the event loop runs meanwhile
+            session = ProfileSession(mode, config, all_threads=True)
+            try:
+                response = await self.get_response(request)
+            finally:
+                session.stop()
+            return session.finish(request, response)
+        finally:
+            self._busy.release()
+
+
+def _skipped(response):
+    response['X-Profile-Skipped'] = 'another request is being profiled'
+    return response
+
+
+class ProfileSession:
+    """cProfile, stack sampling and tracemalloc for one request on the current thread"""
+
+    def __init__(self, mode, config, all_threads=False):
+        self.mode = mode
+        self.config = config
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start(config['TRACEMALLOC_FRAMES'])
+        tracemalloc.reset_peak()
+        self.sampler = StackSampler(threading.get_ident(), config['SAMPLE_INTERVAL'], all_threads)
+        self.profiler = cProfile.Profile() if mode == 'cprofile' else None
+
+        self.sampler.start()
+        self.start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.start
+        self.sampler.stop()
+        self.snapshot = tracemalloc.take_snapshot()
+        _, self.peak = tracemalloc.get_traced_memory()
+        if self.started_tracing:
+            tracemalloc.stop()
+
+    def finish(self, request, response):
+        self._write(request, response)
+        response['X-Profile-Id'] = self.profile_id
+        return response
+
+    def _write(self, request, response):
+        config, sampler, profiler, peak = self.config, self.sampler, self.profiler, self.peak
+        directory = Path(config['OUTPUT_DIR'])
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / self.profile_id
+        top_n = config['TOP_N']
+
+        summary = io.StringIO()
+        summary.write(f"{request.method} {request.get_full_path()}\n")
+        summary.write(f"status {response.status_code}, {self.elapsed * 1000:.1f} ms, mode {self.mode}\n")
+        summary.write(f"{sampler.samples} samples, peak traced memory {peak / 1024:.1f} KiB\n\n")
+        if profiler is not None:
+            profiler.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.strip_dirs().sort_stats('cumulative').print_stats(top_n)
+        Path(f"{base}.txt").write_text(summary.getvalue())
+        Path(f"{base}.folded").write_text(sampler.folded())
+
+        snapshot = self.snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        lines = [f"Top {top_n} allocations by line (peak {peak / 1024:.1f} KiB)\n"]
+        for stat in snapshot.statistics('lineno')[:top_n]:
+            lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback}\n")
+        Path(f"{base}.alloc.txt").write_text(''.join(lines))
@@ -0,0 +1,65 @@
+"""
+Shared JSON encoding for ode_solver API requests and responses.
+
+Uses orjson when it is installed and falls back to the stdlib encoder
+otherwise. Both paths understand ``Decimal`` (model fields), NumPy scalars
+and arrays (solver output) and datetimes, so views can hand values over as
+they are instead of converting them one by one.
+"""
+import datetime
+import json
+import sys
+from decimal import Decimal
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    # Only look at NumPy types if NumPy is already loaded; never import it here
+    numpy = sys.modules.get('numpy')
+    if numpy is not None:
+        if isinstance(obj, numpy.ndarray):
+            return obj.tolist()
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(content):
+        return orjson.loads(content)
+else:
+    def dumps(data) -> bytes:
+        return json.dumps(data, default=_default, separators=(',', ':')).encode('utf-8')
+
+    def loads(content):
+        return json.loads(content)
+
+
+def parse_json_body(request):
+    """Decode a JSON request body; raises ``json.JSONDecodeError`` on bad input"""
+    return loads(request.body)
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in replacement for ``JsonResponse`` built on ``dumps``"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', JSON_CONTENT_TYPE)
+        super().__init__(content=dumps(data), **kwargs)
@@ -1,10 +1,10 @@
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
 from django.utils import timezone
 from .models import ODETask
+from .responses import FastJsonResponse, parse_json_body
 
 
 class SavePromptView(View):
@@ -16,21 +16,21 @@ class SavePromptView(View):
     
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = parse_json_body(request)
             
             # Validate required fields
             if 'task_id' not in data:
-                return JsonResponse({'error': 'Task ID is required'}, status=400)
+                return FastJsonResponse({'error': 'Task ID is required'}, status=400)
             
             # Get the task
             try:
                 task = ODETask.objects.get(id=data['task_id'])
             except ODETask.DoesNotExist:
-                return JsonResponse({'error': 'Task not found'}, status=404)
+                return FastJsonResponse({'error': 'Task not found'}, status=404)
             
             # For this implementation, we'll just return success since the frontend handles localStorage
             # In a more complete implementation, you might create a SavedPrompt model
-            return JsonResponse({
+            return FastJsonResponse({
                 'success': True,
                 'message': 'Prompt saved successfully',
                 'task_id': task.pk,
@@ -38,6 +38,6 @@ class SavePromptView(View):
             })
             
         except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+            return FastJsonResponse({'error': 'Invalid JSON data'}, status=400)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+            return FastJsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
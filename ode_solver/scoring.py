@@ -0,0 +1,70 @@
+"""
+The answer formula, shared by the generator, the views and the audits.
+
+For final values u(t_f) = (x_f, y_f, z_f, w_f), arc length L and curvature
+κ the answer is
+
+    S = x_f + 2 y_f + 3 z_f + 4 w_f
+    ℒ = round(|S| + L + 1000 κ) mod 1000
+
+``round`` is round-half-to-even in both the scalar (``round``) and the
+vectorized (``numpy.rint``) versions, so they agree on every input. The
+vectorized versions take arrays with one row per task; NumPy is imported
+only when they are called.
+"""
+import math
+from typing import Sequence
+
+WEIGHTS = (1.0, 2.0, 3.0, 4.0)
+ANSWER_MODULUS = 1000
+CURVATURE_SCALE = 1000.0
+
+
+def weighted_sum(final_values: Sequence[float]) -> float:
+    """S = x_f + 2*y_f + 3*z_f + 4*w_f"""
+    x_f, y_f, z_f, w_f = final_values
+    return float(x_f + 2 * y_f + 3 * z_f + 4 * w_f)
+
+
+def final_solution(weighted_sum_value: float, arc_length: float, curvature: float = 0.0) -> int:
+    """ℒ = round(|S| + L + 1000κ) mod 1000, always in [0, 999]"""
+    raw = int(round(abs(weighted_sum_value) + arc_length + curvature * CURVATURE_SCALE))
+    return raw % ANSWER_MODULUS
+
+
+def rounding_margin(weighted_sum_value: float, arc_length: float, curvature: float = 0.0) -> float:
+    """Distance of |S| + L + 1000κ from the nearest .5 rounding boundary"""
+    raw = abs(weighted_sum_value) + arc_length + curvature * CURVATURE_SCALE
+    return abs(raw - math.floor(raw) - 0.5)
+
+
+def score(final_values: Sequence[float], arc_length: float, curvature: float = 0.0) -> int:
+    return final_solution(weighted_sum(final_values), arc_length, curvature)
+
+
+def weighted_sums(final_values):
+    """Vectorized ``weighted_sum`` for an (N, 4) array"""
+    import numpy as np
+
+    return np.asarray(final_values, dtype=float) @ np.asarray(WEIGHTS)
+
+
+def final_solutions(weighted_sum_values, arc_lengths, curvatures=0.0):
+    """Vectorized ``final_solution``; returns an int64 array"""
+    import numpy as np
+
+    raw = np.rint(np.abs(weighted_sum_values) + arc_lengths + np.asarray(curvatures) * CURVATURE_SCALE)
+    return np.mod(raw, ANSWER_MODULUS).astype(np.int64)
+
+
+def rounding_margins(weighted_sum_values, arc_lengths, curvatures=0.0):
+    """Vectorized ``rounding_margin``.
+
+    Answers with a tiny margin can legitimately flip between two solvers
+    that agree to many digits, so audits report the margin next to
+    mismatches.
+    """
+    import numpy as np
+
+    raw = np.abs(weighted_sum_values) + arc_lengths + np.asarray(curvatures) * CURVATURE_SCALE
+    return np.abs(np.abs(raw - np.floor(raw)) - 0.5)
@@ -0,0 +1,233 @@
+"""
+Production server behind ``manage.py serve``: preforked gunicorn workers.
+
+- The app (WSGI, or ASGI through ``asgi.py``) is loaded once in the master
+  before forking, so Django, NumPy and SciPy (and, with
+  ``ODE_SOLVER_WARMUP``, the warm-up's ``PRELOAD_STEPS``) are shared by
+  every worker copy-on-write instead of imported by each. Cache and
+  database connections are only opened after the fork.
+- ``WORKERS`` defaults to the CPUs this process may use (affinity and
+  cgroup quota), so throughput scales with cores.
+- BLAS and OpenMP pools are capped at ``BLAS_THREADS`` per worker through
+  the environment, before NumPy is first imported: 4x4 matrix products
+  gain nothing from threads, and N workers each starting one thread per
+  core oversubscribe the machine.
+- A worker is replaced after ``MAX_REQUESTS`` (plus up to
+  ``MAX_REQUESTS_JITTER``, so they do not all restart at once) requests, or
+  once its RSS exceeds ``MAX_RSS_MB``.
+- SIGTERM drains: the master stops accepting connections and workers
+  finish their in-flight requests for up to ``GRACEFUL_TIMEOUT`` seconds.
+
+gunicorn is an optional dependency. ASGI uses gunicorn's own ``asgi``
+worker where available and uvicorn's gunicorn worker otherwise.
+"""
+import importlib.util
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from . import metrics, warmup
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+DEFAULTS = {
+    'BIND': '127.0.0.1:8000',
+    # None: one per available CPU
+    'WORKERS': None,
+    # Threads per WSGI worker; a sync job poll's ?wait= (at most 1s) holds one
+    'THREADS': 4,
+    # Concurrent connections per ASGI worker
+    'WORKER_CONNECTIONS': 1000,
+    'BLAS_THREADS': 1,
+    'MAX_REQUESTS': 10000,
+    'MAX_REQUESTS_JITTER': 1000,
+    'MAX_RSS_MB': 512,
+    'RSS_CHECK_INTERVAL': 5.0,
+    'TIMEOUT': 60,
+    'GRACEFUL_TIMEOUT': 25,
+    'KEEPALIVE': 5,
+    'PRELOAD': True,
+    'ASGI_APPLICATION': 'django_math_stumper.asgi.application',
+}
+
+BLAS_THREAD_VARIABLES = (
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS',
+)
+
+INTERFACES = ('wsgi', 'asgi')
+
+PROCESS_LOCAL_CACHE_BACKENDS = ('.LocMemCache', '.DummyCache')
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_SERVE', {})}
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and a cgroup v2 CPU quota"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as handle:
+            quota, period = handle.read().split()
+        if quota != 'max':
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def cap_blas_threads(threads: int) -> Dict[str, str]:
+    """Set the BLAS/OpenMP thread variables that are not already set; returns the effective values.
+
+    Only takes effect if NumPy has not been imported yet.
+    """
+    return {name: os.environ.setdefault(name, str(threads)) for name in BLAS_THREAD_VARIABLES}
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def process_local_caches() -> List[str]:
+    """Cache aliases used for cross-request state that each process keeps to itself"""
+    from . import idempotency
+
+    aliases = {'default', idempotency.get_config()['CACHE_ALIAS']}
+    return sorted(
+        alias for alias in aliases
+        if settings.CACHES.get(alias, {}).get('BACKEND', '').endswith(PROCESS_LOCAL_CACHE_BACKENDS)
+    )
+
+
+def worker_class(interface: str, threads: int) -> str:
+    if interface == 'wsgi':
+        return 'gthread' if threads > 1 else 'sync'
+    from gunicorn.workers import SUPPORTED_WORKERS
+
+    if 'asgi' in SUPPORTED_WORKERS:
+        return 'asgi'
+    for module, name in (('uvicorn_worker', 'UvicornWorker'), ('uvicorn.workers', 'UvicornWorker')):
+        if importlib.util.find_spec(module.split('.')[0]) is not None:
+            return f'{module}.{name}'
+    raise RuntimeError("ASGI needs gunicorn 24+ or uvicorn: pip install uvicorn-worker")
+
+
+def gunicorn_options(config: dict, interface: str, access_log: Optional[str] = None,
+                     log_level: str = 'info') -> dict:
+    """gunicorn settings for ``config`` (an ``ODE_SOLVER_SERVE``-style dict)"""
+    options = {
+        'bind': config['BIND'],
+        'workers': config['WORKERS'] or available_cpus(),
+        'worker_class': worker_class(interface, config['THREADS']),
+        'max_requests': config['MAX_REQUESTS'],
+        'max_requests_jitter': config['MAX_REQUESTS_JITTER'],
+        'timeout': config['TIMEOUT'],
+        'graceful_timeout': config['GRACEFUL_TIMEOUT'],
+        'keepalive': config['KEEPALIVE'],
+        'preload_app': config['PRELOAD'],
+        'proc_name': 'ode_solver',
+        'accesslog': access_log,
+        'errorlog': '-',
+        'loglevel': log_level,
+    }
+    if interface == 'wsgi':
+        options['threads'] = config['THREADS']
+    else:
+        options['worker_connections'] = config['WORKER_CONNECTIONS']
+    if os.path.isdir('/dev/shm'):
+        # Heartbeat files on tmpfs; a disk-backed /tmp can stall workers into timeouts
+        options['worker_tmp_dir'] = '/dev/shm'
+    return options
+
+
+def _watch_rss(worker, limit: int, interval: float):
+    while worker.alive:
+        time.sleep(interval)
+        rss = current_rss()
+        if rss > limit:
+            worker.log.info("Worker %s uses %.0f MiB, over the %.0f MiB limit; recycling",
+                            worker.pid, rss / 2 ** 20, limit / 2 ** 20)
+            worker.ode_solver_exit_reason = 'rss'
+            # The worker's own graceful-shutdown path, whatever its class
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+
+def post_fork(server, worker):
+    warmup_config = server.app.warmup_config
+    if warmup_config['ENABLED']:
+        try:
+            warmup.warm_up(warmup_config, only=warmup.CONNECTION_STEPS)
+        except Exception:
+            pass  # Logged and kept in warmup.status(); /ready stays 503
+
+
+def post_worker_init(worker):
+    config = worker.app.config
+    if config['MAX_RSS_MB']:
+        threading.Thread(
+            target=_watch_rss, args=(worker, config['MAX_RSS_MB'] * 2 ** 20, config['RSS_CHECK_INTERVAL']),
+            name='ode-solver-rss-watch', daemon=True,
+        ).start()
+
+
+def worker_exit(server, worker):
+    if worker.pid != os.getpid():
+        # The master reaping a worker that is already gone
+        return
+    reason = getattr(worker, 'ode_solver_exit_reason', None)
+    if reason is None:
+        reason = 'max_requests' if worker.nr >= worker.max_requests else 'shutdown'
+    metrics.WORKER_EXITS.inc(reason=reason)
+
+
+class Application(BaseApplication or object):
+    """gunicorn application loading the Django WSGI or ASGI callable"""
+
+    def __init__(self, app_path: str, options: dict, config: dict, warmup_config: dict):
+        self.app_path = app_path
+        self.options = options
+        self.config = config
+        self.warmup_config = warmup_config
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('post_fork', post_fork)
+        self.cfg.set('post_worker_init', post_worker_init)
+        self.cfg.set('worker_exit', worker_exit)
+
+    def load(self):
+        from django.db import connections
+        from django.utils.module_loading import import_string
+
+        application = import_string(self.app_path)
+        # In the master with preload_app, otherwise in each worker after post_fork.
+        # services defers these imports, so without this every worker would pay for them
+        warmup._warm_imports()
+        if self.warmup_config['ENABLED']:
+            warmup.warm_up(self.warmup_config, only=warmup.PRELOAD_STEPS)
+        # Forked workers must not share the master's connections
+        connections.close_all()
+        return application
@@ -1,14 +1,108 @@
-import numpy as np
-from scipy.integrate import solve_ivp
+"""
+Task generation and the numerical solver.
+
+NumPy and SciPy are imported inside the functions that use them, not
+here: views import this module at load time, and SciPy alone takes about
+half a second to import. Commands, migrations and admin pages that never
+solve anything skip that cost; ``python manage.py importtime`` shows what
+a worker imports at boot.
+"""
 from decimal import Decimal, getcontext
 import random
 import math
+import sys
+import time
 from typing import Dict, Tuple, List, Optional
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
+from . import metrics, scoring
+
 # Set decimal precision for exact arithmetic
 getcontext().prec = 50
 
+# _generate_coefficients draws a and r uniformly from [-COEFFICIENT_RANGE, COEFFICIENT_RANGE];
+# a trace a.r below MIN_TRACE in magnitude is pushed to TRACE_TARGET
+COEFFICIENT_RANGE = 0.4
+MIN_TRACE = 0.05
+TRACE_TARGET = 0.06
+
+
+def _record_solve_failure(started: float, reason: str):
+    metrics.SOLVE_SECONDS.observe(time.perf_counter() - started, outcome='failed')
+    metrics.SOLVE_FAILURES.inc(reason=reason)
+
+
+def _record_generation(elapsed: float, attempts: int, outcome: str):
+    metrics.GENERATION_SECONDS.observe(elapsed, outcome=outcome)
+    metrics.GENERATION_ATTEMPTS.observe(attempts, outcome=outcome)
+    if outcome != 'ok':
+        metrics.GENERATION_FAILURES.inc(reason=outcome)
+
+# ODE_SOLVER_SETTINGS defaults. Every solve starts at MAX_RTOL/MAX_ATOL and
+# tightens both by TIGHTEN_FACTOR, down to the RTOL/ATOL floor, while the
+# answer's rounding margin is not larger than the estimated error. All
+# passes of one solve share TIMEOUT seconds.
+SOLVER_DEFAULTS = {
+    'RTOL': 1e-14,
+    'ATOL': 1e-16,
+    'MAX_RTOL': 1e-6,
+    'MAX_ATOL': 1e-8,
+    'TIGHTEN_FACTOR': 1e-2,
+    # Safety factor on the error estimate; differential_test saw up to 1.5x
+    'ERROR_FACTOR': 10.0,
+    'METHOD': 'RK45',
+    'TIMEOUT': 10.0,
+}
+
+# solve_ivp methods that can be selected with ODE_SOLVER_SETTINGS['METHOD']
+SOLVER_METHODS = ('RK45', 'DOP853', 'LSODA', 'Radau', 'BDF')
+
+# solve_ivp clamps smaller relative tolerances (with a warning)
+MIN_RTOL = 100 * sys.float_info.epsilon
+
+
+def solver_settings() -> dict:
+    from django.conf import settings
+    return {**SOLVER_DEFAULTS, **getattr(settings, 'ODE_SOLVER_SETTINGS', {})}
+
+
+def estimated_answer_error(final_values, arc_length: float, rtol: float, atol: float,
+                           error_factor: float = SOLVER_DEFAULTS['ERROR_FACTOR'],
+                           quadrature_error: float = 0.0) -> float:
+    """Bound on the error of |S| + L from a solve at (rtol, atol).
+
+    The global error of each component stays near rtol·|u| + atol, so |S| + L
+    is off by about rtol·(Σ wᵢ|uᵢ| + L) + atol·(Σ wᵢ + 1), plus the
+    ``quadrature_error`` of L from ``arc_length_error``.
+    """
+    scale = sum(weight * abs(value) for weight, value in zip(scoring.WEIGHTS, final_values)) + abs(arc_length)
+    return error_factor * (rtol * scale + atol * (sum(scoring.WEIGHTS) + 1) + quadrature_error)
+
+
+def compute_arc_length(dense_solution, target_time: float, points: int = 1000) -> float:
+    """Arc length of u on [0, t_f]: trapezoid rule over |u'| sampled from the dense output"""
+    import numpy as np
+
+    t_eval = np.linspace(0, target_time, points)
+    u_eval = dense_solution(t_eval)
+    speeds = np.linalg.norm(np.gradient(u_eval, t_eval, axis=1), axis=0)
+    return float(np.trapezoid(speeds, t_eval))
+
+
+def arc_length_error(dense_solution, target_time: float, arc_length: float, points: int = 1000) -> float:
+    """Richardson estimate of the quadrature error in ``compute_arc_length(..., points)``.
+
+    The differences and the trapezoid rule are both second order, so the
+    error shrinks with h². For generated (rank-1) systems u(t) moves along
+    a straight line and the error is at rounding level; for custom systems
+    it can exceed the tolerance-driven error, and tighter tolerances do
+    not reduce it.
+    """
+    coarse_points = points // 2
+    coarse = compute_arc_length(dense_solution, target_time, coarse_points)
+    ratio = ((points - 1) / (coarse_points - 1)) ** 2
+    return abs(arc_length - coarse) / (ratio - 1)
+
 class ODEGenerator:
     """Generate valid ODE tasks with rank-1 matrices and exact solutions"""
     
@@ -17,12 +111,14 @@ class ODEGenerator:
         
     def _generate_coefficients(self) -> Dict[str, List[List[float]]]:
         """Generate coefficients for a rank-1 matrix using direct outer product method."""
+        import numpy as np
+
         print("DEBUG: _generate_coefficients using direct rank-1 generation")
         
         # Generate two random vectors 'a' and 'r' with ranges that ensure
         # coefficients stay within [-0.5, 0.5] without needing scaling
-        a = np.array([random.uniform(-0.4, 0.4) for _ in range(4)])
-        r = np.array([random.uniform(-0.4, 0.4) for _ in range(4)])
+        a = np.array([random.uniform(-COEFFICIENT_RANGE, COEFFICIENT_RANGE) for _ in range(4)])
+        r = np.array([random.uniform(-COEFFICIENT_RANGE, COEFFICIENT_RANGE) for _ in range(4)])
 
         # Construct the rank-1 matrix A = a * r^T
         A = np.outer(a, r)
@@ -33,13 +129,13 @@ class ODEGenerator:
         # Ensure the trace is significantly non-zero to avoid division by zero later
         # and to ensure a meaningful non-zero eigenvalue.
         max_attempts_trace = 0
-        while abs(trace) < 0.05 and max_attempts_trace < 10:
+        while abs(trace) < MIN_TRACE and max_attempts_trace < 10:
             max_attempts_trace += 1
             # Adjust one element to ensure non-zero trace
             if abs(a[0]) > 1e-10:
-                r[0] = 0.06 / a[0]  # Ensure trace = 0.06
+                r[0] = TRACE_TARGET / a[0]  # Ensure trace = 0.06
             else:
-                a[0] = 0.06 / r[0] if abs(r[0]) > 1e-10 else 0.1
+                a[0] = TRACE_TARGET / r[0] if abs(r[0]) > 1e-10 else 0.1
             A = np.outer(a, r)
             trace = np.dot(a, r)
         
@@ -52,59 +148,88 @@ class ODEGenerator:
     def _solve_system(self, coefficients: Dict[str, List[List[float]]], 
                      initial_conditions: Tuple[float, float, float, float], 
                      target_time: float) -> Optional[Dict]:
+        import numpy as np
+        from scipy.integrate import solve_ivp
+
         print("DEBUG: _solve_system started")
+        started = time.perf_counter()
         linear = coefficients['linear']
         def system(t, u):
             return np.dot(linear, u).tolist()
         
+        config = solver_settings()
+        floor_rtol = max(config['RTOL'], MIN_RTOL)
+        floor_atol = config['ATOL']
+        rtol = max(config['MAX_RTOL'], floor_rtol)
+        atol = max(config['MAX_ATOL'], floor_atol)
+        # Tightening passes share one deadline instead of TIMEOUT seconds each
+        deadline = time.monotonic() + config['TIMEOUT']
+        
         try:
-            print("DEBUG: _solve_system solve_ivp started (timeout=10s)")
-            # Use ThreadPoolExecutor to apply a timeout to solve_ivp
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(solve_ivp, system, [0, target_time], initial_conditions, 
-                                          method='RK45', rtol=1e-9, atol=1e-9, dense_output=True)
-                sol = future.result(timeout=10) # 10 second timeout for solve_ivp
-            
-            if not sol.success: 
-                print("DEBUG: _solve_system solve_ivp not successful")
-                return None
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError()
+                print(f"DEBUG: _solve_system solve_ivp started (rtol={rtol:g}, atol={atol:g}, timeout={remaining:.1f}s)")
+                # Use ThreadPoolExecutor to apply a timeout to solve_ivp
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    future = executor.submit(solve_ivp, system, [0, target_time], initial_conditions, 
+                                              method=config['METHOD'], rtol=rtol, atol=atol, dense_output=True)
+                    sol = future.result(timeout=remaining)
                 
-            final_values = sol.y[:, -1]
-            t_eval = np.linspace(0, target_time, 1000)
-            u_eval = sol.sol(t_eval)
-            speeds = np.linalg.norm(np.gradient(u_eval, t_eval, axis=1), axis=0)
-            arc_length = np.trapezoid(speeds, t_eval)
-            
-            # Calculate final solution and ensure it's between 0 and 999
-            # Use the weighted sum formula: S = x_f + 2y_f + 3z_f + 4w_f
-            weighted_sum = final_values[0] + 2*final_values[1] + 3*final_values[2] + 4*final_values[3]
-            
-            # Calculate final solution using the proper formula: ℒ = round(|S| + L + κ×1000)
-            raw_solution = int(round(abs(weighted_sum) + arc_length + 0.0*1000))  # κ is 0.0 for rank-1 systems
-            final_solution = raw_solution % 1000  # Ensure result is between 0 and 999
-            if final_solution < 0:
-                final_solution += 1000  # Handle negative values
+                if not sol.success: 
+                    print("DEBUG: _solve_system solve_ivp not successful")
+                    _record_solve_failure(started, 'unsuccessful')
+                    return None
+                    
+                final_values = sol.y[:, -1]
+                arc_length = compute_arc_length(sol.sol, target_time)
+                quadrature_error = arc_length_error(sol.sol, target_time, arc_length)
+                
+                # S = x_f + 2y_f + 3z_f + 4w_f and ℒ = round(|S| + L + κ×1000) mod 1000
+                weighted_sum = scoring.weighted_sum(final_values)
+                final_solution = scoring.final_solution(weighted_sum, arc_length, 0.0)  # κ is 0.0 for rank-1 systems
+                
+                # Done once a tighter solve could no longer round |S| + L the other way
+                margin = scoring.rounding_margin(weighted_sum, arc_length, 0.0)
+                error = estimated_answer_error(final_values, arc_length, rtol, atol, config['ERROR_FACTOR'],
+                                               quadrature_error)
+                if margin > error:
+                    break
+                if margin <= config['ERROR_FACTOR'] * quadrature_error:
+                    # The quadrature error alone covers the margin; tighter tolerances cannot help
+                    break
+                tighter = (max(rtol * config['TIGHTEN_FACTOR'], floor_rtol),
+                           max(atol * config['TIGHTEN_FACTOR'], floor_atol))
+                if tighter == (rtol, atol):
+                    # Already at the floor; the answer is as good as it gets
+                    break
+                rtol, atol = tighter
+                metrics.SOLVE_TIGHTENINGS.inc()
             
             print(f"DEBUG: _solve_system successful, final_solution={final_solution}")
+            metrics.SOLVE_SECONDS.observe(time.perf_counter() - started, outcome='ok')
             return {
                 'final_values': final_values.tolist(),
-                'weighted_sum': float(final_values[0] + 2*final_values[1] + 3*final_values[2] + 4*final_values[3]),
+                'weighted_sum': weighted_sum,
                 'arc_length': float(arc_length),
                 'curvature': 0.0,
-                'final_solution': final_solution
+                'final_solution': final_solution,
+                'rtol': rtol,
+                'atol': atol,
             }
         except TimeoutError:
             print("DEBUG: _solve_system TimeoutError caught")
             # If solve_ivp takes too long, return None
+            _record_solve_failure(started, 'timeout')
             return None
         except Exception as e: 
             print(f"DEBUG: _solve_system general Exception caught: {e}")
+            _record_solve_failure(started, 'error')
             return None
 
     def generate_valid_ode_task(self) -> Optional[Dict]:
         """Generate a valid ODE task with rank-1 matrix and exact solution"""
-        import time
-        
         start_time = time.time()
         max_generation_time = 30.0  # 30 second timeout for entire generation process
         
@@ -114,6 +239,7 @@ class ODEGenerator:
             # Check if we've exceeded the time limit
             if time.time() - start_time > max_generation_time:
                 print(f"DEBUG: generate_valid_ode_task timeout after {attempt} attempts")
+                _record_generation(time.time() - start_time, attempt, 'timeout')
                 return None
             
             # Generate coefficients (this should be fast now)
@@ -135,6 +261,7 @@ class ODEGenerator:
             
             if solution:
                 print(f"DEBUG: generate_valid_ode_task successful after {attempt + 1} attempts")
+                _record_generation(time.time() - start_time, attempt + 1, 'ok')
                 return {
                     'coefficients': coefficients,
                     'initial_conditions': {
@@ -148,6 +275,7 @@ class ODEGenerator:
                 }
         
         print(f"DEBUG: generate_valid_ode_task failed after all {self.max_attempts} attempts")
+        _record_generation(time.time() - start_time, self.max_attempts, 'max_attempts')
         return None
 
     def create_custom_task(self, coefficients: Dict[str, List[List[float]]], 
@@ -0,0 +1,200 @@
+"""
+Opt-in SQLite concurrency tuning.
+
+Single-node deployments that stay on ``db.sqlite3`` run into "database is
+locked" errors as soon as several requests insert tasks at once. When
+``ODE_SOLVER_SQLITE['ENABLED']`` is set this module:
+
+* switches every SQLite connection to WAL journaling, so readers never block
+  the writer (and vice versa), and applies a busy timeout and synchronous
+  level;
+* funnels ``ODETask`` inserts through a single writer thread that batches
+  them into one transaction, so there is never more than one writer
+  competing for the database lock.
+
+Reads keep going through the normal per-thread connections and stay fully
+concurrent. With the setting disabled (or on any other database backend)
+``save_task`` is a plain ``instance.save()``.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+DEFAULTS = {
+    'ENABLED': False,
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'BUSY_TIMEOUT_MS': 5000,
+    'WRITE_QUEUE': True,
+    'WRITE_BATCH_SIZE': 32,
+    'WRITE_BATCH_WAIT': 0.005,
+    'WRITE_TIMEOUT': 30.0,
+}
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def get_config() -> dict:
+    """Return the effective tuning configuration (defaults + settings)"""
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_SQLITE', {})}
+
+
+def is_sqlite(alias: str = DEFAULT_DB_ALIAS) -> bool:
+    return connections[alias].vendor == 'sqlite'
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` handler applying the PRAGMAs to new SQLite connections"""
+    if connection.vendor != 'sqlite':
+        return
+    config = get_config()
+    if not config['ENABLED']:
+        return
+
+    journal_mode = str(config['JOURNAL_MODE']).upper()
+    synchronous = str(config['SYNCHRONOUS']).upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLite journal mode: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unsupported SQLite synchronous level: {synchronous}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['BUSY_TIMEOUT_MS'])}")
+
+
+class _PendingWrite:
+    __slots__ = ('instance', 'future')
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.future = Future()
+
+
+class TaskWriteQueue:
+    """Serialize model inserts through one daemon thread, batching them per transaction"""
+
+    def __init__(self, batch_size: int = 32, batch_wait: float = 0.005,
+                 using: str = DEFAULT_DB_ALIAS):
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = max(0.0, float(batch_wait))
+        self.using = using
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, instance) -> Future:
+        """Queue ``instance`` for insertion; the future resolves to the saved instance"""
+        self._ensure_started()
+        pending = _PendingWrite(instance)
+        self._queue.put(pending)
+        return pending.future
+
+    def save(self, instance, timeout: Optional[float] = None):
+        return self.submit(instance).result(timeout=timeout)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='ode-solver-sqlite-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            finally:
+                connections[self.using].close_if_unusable_or_obsolete()
+
+    def _write(self, batch):
+        by_model = {}
+        for pending in batch:
+            by_model.setdefault(type(pending.instance), []).append(pending)
+
+        for model, items in by_model.items():
+            try:
+                with transaction.atomic(using=self.using):
+                    model.objects.using(self.using).bulk_create([p.instance for p in items])
+            except Exception:
+                # One bad row must not fail the whole batch: retry one by one
+                for pending in items:
+                    pending.instance.pk = None
+                    pending.instance._state.adding = True
+                    try:
+                        pending.instance.save(using=self.using)
+                    except Exception as e:
+                        pending.future.set_exception(e)
+                    else:
+                        pending.future.set_result(pending.instance)
+            else:
+                for pending in items:
+                    pending.future.set_result(pending.instance)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> TaskWriteQueue:
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                config = get_config()
+                _write_queue = TaskWriteQueue(
+                    batch_size=config['WRITE_BATCH_SIZE'],
+                    batch_wait=config['WRITE_BATCH_WAIT'],
+                )
+    return _write_queue
+
+
+def write_queue_enabled() -> bool:
+    config = get_config()
+    return bool(config['ENABLED'] and config['WRITE_QUEUE'] and is_sqlite())
+
+
+def save_task(instance):
+    """Insert a new task, through the writer thread when SQLite tuning is enabled"""
+    if not write_queue_enabled():
+        instance.save()
+        return instance
+    return get_write_queue().save(instance, timeout=get_config()['WRITE_TIMEOUT'])
+
+
+async def asave_task(instance):
+    """Async counterpart of ``save_task`` that never blocks the event loop"""
+    if not write_queue_enabled():
+        await instance.asave()
+        return instance
+    future = asyncio.wrap_future(get_write_queue().submit(instance))
+    return await asyncio.wait_for(future, timeout=get_config()['WRITE_TIMEOUT'])
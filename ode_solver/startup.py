@@ -0,0 +1,124 @@
+"""
+What a fresh worker pays before it serves its first request.
+
+``import_profile`` starts a new interpreter with ``-X importtime`` that
+boots the app the way a WSGI or ASGI worker does (``django.setup()`` and
+the URLconf, which imports every view), or runs a ``manage.py`` command,
+and parses the per-module report from its stderr. Each profile is the
+fastest of a few runs, so the first run's bytecode compilation does not
+count.
+
+The solver stack (NumPy, SciPy) is imported lazily by ``services``; a
+profile that lists it under ``HEAVY_PACKAGES`` means something imports it
+at load time again.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+HEAVY_PACKAGES = ('numpy', 'scipy')
+
+BOOT_CODE = (
+    "import django\n"
+    "django.setup()\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)\s*$')
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.name.split('.')[0]
+
+
+@dataclass
+class ImportProfile:
+    records: List[ImportRecord]
+    wall_seconds: float
+    target: str = 'boot'
+
+    @property
+    def total_us(self) -> int:
+        return sum(record.cumulative_us for record in self.records if record.depth == 0)
+
+    def packages(self) -> Dict[str, int]:
+        """Cumulative microseconds per top-level package, for imports made at depth 0"""
+        totals: Dict[str, int] = {}
+        for record in self.records:
+            if record.depth == 0:
+                totals[record.package] = totals.get(record.package, 0) + record.cumulative_us
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def imported(self, package: str) -> bool:
+        return any(record.package == package for record in self.records)
+
+    def as_dict(self, top: Optional[int] = None) -> dict:
+        records = sorted(self.records, key=lambda record: record.cumulative_us, reverse=True)
+        return {
+            'target': self.target,
+            'wall_seconds': self.wall_seconds,
+            'import_seconds': self.total_us / 1e6,
+            'heavy_packages': {package: self.imported(package) for package in HEAVY_PACKAGES},
+            'packages': {name: us / 1e6 for name, us in self.packages().items()},
+            'modules': [
+                {'name': record.name, 'self_seconds': record.self_us / 1e6,
+                 'cumulative_seconds': record.cumulative_us / 1e6}
+                for record in records[:top]
+            ],
+        }
+
+
+def parse_importtime(text: str) -> List[ImportRecord]:
+    """Records from ``-X importtime`` output; other stderr lines are skipped"""
+    records = []
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def _argv(modules: Sequence[str] = (), command: Optional[Sequence[str]] = None) -> List[str]:
+    from django.conf import settings
+
+    if command:
+        return [sys.executable, '-X', 'importtime', str(Path(settings.BASE_DIR) / 'manage.py'), *command]
+    code = BOOT_CODE + ''.join(f"import {module}\n" for module in modules)
+    return [sys.executable, '-X', 'importtime', '-c', code]
+
+
+def import_profile(modules: Sequence[str] = (), command: Optional[Sequence[str]] = None,
+                   repeat: int = 3) -> ImportProfile:
+    """Fastest of ``repeat`` cold starts, booting the app (plus ``modules``) or running ``command``"""
+    from django.conf import settings
+
+    argv = _argv(modules, command)
+    target = f"manage.py {' '.join(command)}" if command else ' + '.join(('boot', *modules))
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        completed = subprocess.run(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - started
+        if completed.returncode != 0:
+            errors = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+            raise RuntimeError(f"{target} exited with status {completed.returncode}: "
+                               + '\n'.join(errors[-5:]))
+        if best is None or elapsed < best.wall_seconds:
+            best = ImportProfile(parse_importtime(completed.stderr), elapsed, target)
+    return best
@@ -1,3 +1,962 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections
+from django.db.models import QuerySet
+from django.conf import settings
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import admission, attempts, importer, jobs, loadtest, scoring, server, services, validation, views, warmup
+from .admission import ConcurrencyLimiter, TokenBucket
+from .models import Attempt, AttemptStats, Job, ODETask
+from .services import ODEGenerator
+from .validation import ValidationError, screen
+
+# Rank-1 matrix a rᵀ with a small trace, cheap to solve and to screen exactly
+_A = (0.2, -0.1, 0.3, 0.4)
+_R = (0.5, 0.2, 0.1, 0.4)
+LINEAR = [[a * r for r in _R] for a in _A]
+INITIAL_CONDITIONS = {'x0': 1.0, 'y0': 0.5, 'z0': -0.5, 'w0': 0.25}
+
+
+def custom_body(**overrides):
+    body = {
+        'coefficients': {'linear': [row[:] for row in LINEAR]},
+        'initial_conditions': dict(INITIAL_CONDITIONS),
+        'target_time': 1.0,
+    }
+    body.update(overrides)
+    return body
+
+
+def unit_matrix(i, j, value):
+    matrix = [[0.0] * 4 for _ in range(4)]
+    matrix[i][j] = value
+    return matrix
+
+
+def reset_request_state():
+    caches['default'].clear()
+    admission.reset()
+
+
+def admission_settings(**overrides):
+    return override_settings(ODE_SOLVER_ADMISSION={**settings.ODE_SOLVER_ADMISSION, **overrides})
+
+
+class CustomTaskValidationTests(TestCase):
+    url = '/api/create_custom/'
+
+    def setUp(self):
+        reset_request_state()
+
+    def assertRejected(self, body, field, message):
+        response = self.client.post(self.url, data=json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        payload = response.json()
+        self.assertEqual(payload['field'], field)
+        self.assertIn(message, payload['error'])
+        self.assertEqual(ODETask.objects.count(), 0)
+
+    def test_body_must_be_an_object(self):
+        self.assertRejected([custom_body()], '', 'must be an object')
+
+    def test_linear_must_be_an_array(self):
+        self.assertRejected(custom_body(coefficients={'linear': 'identity'}), 'coefficients.linear',
+                            'must be an array of 4')
+
+    def test_linear_must_have_four_rows(self):
+        self.assertRejected(custom_body(coefficients={'linear': LINEAR[:3]}), 'coefficients.linear',
+                            'must have 4 entries, got 3')
+
+    def test_rows_must_have_four_entries(self):
+        linear = [row[:] for row in LINEAR]
+        linear[2] = linear[2][:3]
+        self.assertRejected(custom_body(coefficients={'linear': linear}), 'coefficients.linear[2]',
+                            'must have 4 entries, got 3')
+
+    def test_booleans_are_not_numbers(self):
+        linear = [row[:] for row in LINEAR]
+        linear[2][1] = True
+        self.assertRejected(custom_body(coefficients={'linear': linear}), 'coefficients.linear[2][1]',
+                            'must be a number')
+
+    def test_numeric_strings_are_not_numbers(self):
+        self.assertRejected(custom_body(target_time='1.0'), 'target_time', 'must be a number')
+
+    def test_nonlinear_is_checked_when_present(self):
+        coefficients = {'linear': LINEAR, 'nonlinear': [[0.0] * 4] * 3}
+        self.assertRejected(custom_body(coefficients=coefficients), 'coefficients.nonlinear',
+                            'must have 4 entries, got 3')
+
+    def test_unknown_top_level_field(self):
+        self.assertRejected(custom_body(method='RK45'), 'method', 'is not an allowed field')
+
+    def test_unknown_nested_field(self):
+        initial_conditions = {**INITIAL_CONDITIONS, 'v0': 0.0}
+        self.assertRejected(custom_body(initial_conditions=initial_conditions), 'initial_conditions.v0',
+                            'is not an allowed field')
+
+    def test_missing_initial_condition(self):
+        initial_conditions = {key: value for key, value in INITIAL_CONDITIONS.items() if key != 'w0'}
+        self.assertRejected(custom_body(initial_conditions=initial_conditions), 'initial_conditions.w0',
+                            'is required')
+
+    def test_null_counts_as_missing(self):
+        self.assertRejected(custom_body(target_time=None), 'target_time', 'is required')
+
+    def test_screening_runs_before_the_solver(self):
+        with mock.patch.object(ODEGenerator, 'create_custom_task') as create:
+            self.assertRejected(custom_body(coefficients={'linear': unit_matrix(0, 1, 30.0)}),
+                                'coefficients.linear', 'exceeds')
+        create.assert_not_called()
+
+    def test_job_body_allows_kind_only(self):
+        response = self.client.post(
+            '/api/jobs/', data=json.dumps({'kind': 'custom', **custom_body(), 'priority': 1}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['field'], 'priority')
+
+    def test_job_body_must_be_an_object(self):
+        for body in ([1], 'custom', None):
+            with self.subTest(body=body):
+                response = self.client.post('/api/jobs/', data=json.dumps(body), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('must be an object', response.json()['error'])
+
+
+class ScreenTests(TestCase):
+    config = validation.DEFAULTS
+
+    def assertScreenRejects(self, linear, initial_conditions, target_time, field, message):
+        with self.assertRaises(ValidationError) as raised:
+            screen(linear, initial_conditions, target_time, self.config)
+        self.assertEqual(raised.exception.field, field)
+        self.assertIn(message, raised.exception.message)
+
+    def test_coefficient_limit_is_inclusive(self):
+        limit = self.config['MAX_COEFFICIENT']
+        # Nilpotent, so t_f can be small enough for the growth bound
+        screen(unit_matrix(0, 1, limit), (1.0, 0.0, 0.0, 0.0), 0.01, self.config)
+        self.assertScreenRejects(unit_matrix(0, 1, limit * 1.001), (1.0, 0.0, 0.0, 0.0), 0.01,
+                                 'coefficients.linear[0][1]', 'magnitude at most')
+
+    def test_coefficients_must_be_finite(self):
+        self.assertScreenRejects(unit_matrix(3, 2, math.inf), (1.0, 0.0, 0.0, 0.0), 1.0,
+                                 'coefficients.linear[3][2]', 'must be finite')
+
+    def test_initial_value_limit_is_inclusive(self):
+        limit = self.config['MAX_INITIAL_VALUE']
+        screen(unit_matrix(0, 1, 0.0), (0.0, 0.0, 0.0, -limit), 1.0, self.config)
+        self.assertScreenRejects(unit_matrix(0, 1, 0.0), (0.0, 0.0, 0.0, -limit * 1.001), 1.0,
+                                 'initial_conditions.w0', 'magnitude at most')
+
+    def test_target_time_range(self):
+        zero = unit_matrix(0, 1, 0.0)
+        screen(zero, (1.0, 0.0, 0.0, 0.0), self.config['MAX_TARGET_TIME'], self.config)
+        for target_time in (0.0, -1.0, self.config['MAX_TARGET_TIME'] * 1.001, math.nan):
+            with self.subTest(target_time=target_time):
+                self.assertScreenRejects(zero, (1.0, 0.0, 0.0, 0.0), target_time, 'target_time', 'must be in')
+
+    def test_growth_bound_is_inclusive(self):
+        bound = self.config['MAX_GROWTH_EXPONENT']
+        # ‖A‖_F·t_f for a single entry is just that entry times t_f
+        screen(unit_matrix(0, 1, bound / 2), (1.0, 1.0, 0.0, 0.0), 2.0, self.config)
+        self.assertScreenRejects(unit_matrix(0, 1, bound / 2 * 1.001), (1.0, 1.0, 0.0, 0.0), 2.0,
+                                 'coefficients.linear', 'exceeds')
+
+    def test_rank_one_range_uses_the_closed_form(self):
+        # u_x(t_f) = x0·e^{10}, about 22026·x0, and L = x0·(e^{10} - 1)
+        growth = unit_matrix(0, 0, 2.0)
+        with mock.patch.object(validation, 'rank_one_results', wraps=validation.rank_one_results) as closed_form:
+            screen(growth, (4.0, 0.0, 0.0, 0.0), 5.0, self.config)
+            self.assertScreenRejects(growth, (5.0, 0.0, 0.0, 0.0), 5.0, 'coefficients.linear',
+                                     'beyond the storable range')
+        self.assertEqual(closed_form.call_count, 2)
+
+    def test_full_rank_range_uses_expm(self):
+        # e^{I t_f} u0 = e^{10}·u0; the weighted sum counts w four times
+        identity = [[float(i == j) for j in range(4)] for i in range(4)]
+        with mock.patch.object(validation, 'rank_one_results') as closed_form:
+            screen(identity, (0.0, 0.0, 0.0, 1.0), 10.0, self.config)
+            self.assertScreenRejects(identity, (0.0, 0.0, 0.0, 2.0), 10.0, 'coefficients.linear',
+                                     'beyond the storable range')
+        closed_form.assert_not_called()
+
+
+class IdempotencyTests(TestCase):
+    url = '/api/create_custom/'
+
+    def setUp(self):
+        reset_request_state()
+
+    def post(self, body, key='key-1', url=None):
+        return self.client.post(
+            url or self.url, data=json.dumps(body), content_type='application/json',
+            headers={'Idempotency-Key': key},
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.post(custom_body())
+        second = self.post(custom_body())
+
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(ODETask.objects.count(), 1)
+
+    def test_different_keys_create_different_tasks(self):
+        self.post(custom_body(), key='key-1')
+        self.post(custom_body(), key='key-2')
+
+        self.assertEqual(ODETask.objects.count(), 2)
+
+    def test_key_reused_with_different_body_is_422(self):
+        self.post(custom_body())
+        response = self.post(custom_body(target_time=2.0))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('Idempotency-Key', response.json()['error'])
+        self.assertEqual(ODETask.objects.count(), 1)
+
+    def test_server_errors_are_not_stored(self):
+        with mock.patch.object(ODEGenerator, 'create_custom_task', side_effect=RuntimeError('solver crashed')):
+            failed = self.post(custom_body())
+        retried = self.post(custom_body())
+
+        self.assertEqual(failed.status_code, 500)
+        self.assertEqual(retried.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', retried)
+        self.assertEqual(ODETask.objects.count(), 1)
+
+    @admission_settings(RATE_LIMITS={'create_custom': {'RATE': 1.0, 'BURST': 1}})
+    def test_rate_limited_responses_are_not_stored(self):
+        with mock.patch.object(admission, 'time') as clock:
+            clock.monotonic.return_value = 100.0
+            self.post(custom_body(), key='key-0')
+            limited = self.post(custom_body())
+            clock.monotonic.return_value = 101.0
+            retried = self.post(custom_body())
+
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(retried.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', retried)
+        self.assertEqual(ODETask.objects.count(), 2)
+
+    def test_validation_errors_are_stored(self):
+        first = self.post(custom_body(target_time=-1.0))
+        second = self.post(custom_body(target_time=-1.0))
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.content, first.content)
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    duplicates = 6
+
+    def setUp(self):
+        reset_request_state()
+
+    def test_async_variant_replays_sync_response(self):
+        # Here rather than in IdempotencyTests: the async view reads the cache
+        # from another thread, which a TestCase transaction would lock out
+        body = json.dumps(custom_body())
+        first = self.client.post('/api/create_custom/', data=body, content_type='application/json',
+                                 headers={'Idempotency-Key': 'key-1'})
+        second = self.client.post('/api/async/create_custom/', data=body, content_type='application/json',
+                                  headers={'Idempotency-Key': 'key-1'})
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(ODETask.objects.count(), 1)
+
+    def test_concurrent_duplicates_create_one_task(self):
+        solve = ODEGenerator.create_custom_task
+        solves = []
+
+        def slow_solve(generator, *args):
+            # Keep the leader busy while the duplicates arrive
+            solves.append(threading.get_ident())
+            time.sleep(0.3)
+            return solve(generator, *args)
+
+        barrier = threading.Barrier(self.duplicates)
+        responses = [None] * self.duplicates
+
+        def send(index):
+            try:
+                barrier.wait(5)
+                responses[index] = Client().post(
+                    '/api/create_custom/', data=json.dumps(custom_body()), content_type='application/json',
+                    headers={'Idempotency-Key': 'single-flight'},
+                )
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(ODEGenerator, 'create_custom_task', autospec=True, side_effect=slow_solve):
+            threads = [threading.Thread(target=send, args=(i,)) for i in range(self.duplicates)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+
+        self.assertEqual(len(solves), 1)
+        self.assertEqual([response.status_code for response in responses], [200] * self.duplicates)
+        self.assertEqual(len({response.json()['task_id'] for response in responses}), 1)
+        replayed = [response for response in responses if response.get('Idempotent-Replayed') == 'true']
+        self.assertEqual(len(replayed), self.duplicates - 1)
+        self.assertEqual(ODETask.objects.count(), 1)
+
+
+class ConditionalTaskTests(TestCase):
+
+    def setUp(self):
+        reset_request_state()
+        response = self.client.post('/api/create_custom/', data=json.dumps(custom_body()),
+                                    content_type='application/json')
+        self.task_id = response.json()['task_id']
+
+    def test_task_detail_is_immutable_with_a_strong_etag(self):
+        response = self.client.get(f'/api/task/{self.task_id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['ETag'], r'^"[^"]+"$')
+        self.assertIn('Last-Modified', response)
+        cache_control = response['Cache-Control']
+        for directive in ('public', 'max-age=', 'immutable'):
+            self.assertIn(directive, cache_control)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(f'/api/task/{self.task_id}/')['ETag']
+        response = self.client.get(f'/api/task/{self.task_id}/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_stale_etag_returns_the_body(self):
+        response = self.client.get(f'/api/task/{self.task_id}/', headers={'If-None-Match': '"stale"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['task_id'], self.task_id)
+
+    def test_field_selections_get_their_own_etag(self):
+        full = self.client.get(f'/api/task/{self.task_id}/')['ETag']
+        partial = self.client.get(f'/api/task/{self.task_id}/?fields=task_id')
+
+        self.assertNotEqual(partial['ETag'], full)
+        response = self.client.get(f'/api/task/{self.task_id}/?fields=task_id', headers={'If-None-Match': full})
+        self.assertEqual(response.status_code, 200)
+
+    def test_compressed_response_revalidates_with_its_weak_etag(self):
+        url = f'/api/task/{self.task_id}/solution/'
+        identity = self.client.get(url)
+        compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['ETag'], 'W/' + identity['ETag'])
+        for etag in (compressed['ETag'], identity['ETag']):
+            with self.subTest(etag=etag):
+                response = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+                self.assertEqual(response.status_code, 304)
+
+
+class FieldSelectionTests(TestCase):
+
+    def setUp(self):
+        reset_request_state()
+        response = self.client.post('/api/create_custom/', data=json.dumps(custom_body()),
+                                    content_type='application/json')
+        self.task_id = response.json()['task_id']
+
+    def test_fields_limits_the_response(self):
+        response = self.client.get(f'/api/task/{self.task_id}/?fields=task_id, target_time')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'task_id': self.task_id, 'target_time': 1.0})
+
+    def test_exclude_drops_fields(self):
+        payload = self.client.get(f'/api/task/{self.task_id}/?exclude=equation_preview,created_at').json()
+
+        self.assertEqual(set(payload), set(views.TaskDetailView.available_fields) - {'equation_preview', 'created_at'})
+
+    def test_unselected_fields_are_not_computed(self):
+        with mock.patch.object(views, 'format_latex_solution') as latex:
+            response = self.client.get(f'/api/task/{self.task_id}/solution/?exclude=latex_solution')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('latex_solution', response.json())
+        latex.assert_not_called()
+
+    def test_unknown_fields_are_400(self):
+        for query in ('fields=task_id,bogus', 'exclude=bogus,other'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/task/{self.task_id}/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Unknown fields: bogus', response.json()['error'])
+
+    def test_solution_fields_are_unknown_to_task_detail(self):
+        response = self.client.get(f'/api/task/{self.task_id}/?fields=final_values')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_bundle_splits_task_and_solution(self):
+        payload = self.client.get(f'/api/task/{self.task_id}/full/').json()
+
+        self.assertEqual(set(payload), {'task', 'solution'})
+        self.assertEqual(set(payload['task']), set(views.TaskDetailView.available_fields))
+        self.assertEqual(set(payload['solution']), set(views.TaskBundleView.solution_only_fields))
+        self.assertEqual(payload['solution']['final_values'], self.client.get(
+            f'/api/task/{self.task_id}/solution/?fields=final_values').json()['final_values'])
+
+    def test_bundle_applies_fields_to_both_parts(self):
+        payload = self.client.get(f'/api/task/{self.task_id}/full/?fields=task_id,final_values').json()
+        self.assertEqual(set(payload['task']), {'task_id'})
+        self.assertEqual(set(payload['solution']), {'final_values'})
+
+        payload = self.client.get(f'/api/task/{self.task_id}/full/?fields=task_id').json()
+        self.assertEqual(payload['solution'], {})
+
+        response = self.client.get(f'/api/task/{self.task_id}/full/?fields=bogus')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportImportTests(TestCase):
+
+    def setUp(self):
+        reset_request_state()
+
+    def export(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'tasks.jsonl')
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, path)
+        call_command('export_tasks', output=path, stderr=io.StringIO())
+        with open(path, 'rb') as handle:
+            return handle.read()
+
+    def test_round_trip_finds_every_task_already_present(self):
+        integer_linear = [[0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        for body in (custom_body(), custom_body(coefficients={'linear': integer_linear})):
+            response = self.client.post('/api/create_custom/', data=json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        # Legacy rows store integer coefficients; they must hash like the floats the importer parses
+        legacy = ODETask.objects.get(pk=response.json()['task_id'])
+        legacy.coefficients = {**legacy.coefficients, 'linear': integer_linear}
+        legacy.content_hash = ''
+        legacy.save()
+
+        stats = importer.import_tasks(io.BytesIO(self.export()), workers=1)
+
+        self.assertEqual((stats.read, stats.imported, stats.duplicates), (2, 0, 2))
+        self.assertEqual(ODETask.objects.count(), 2)
+
+    def test_import_creates_missing_tasks_with_matching_hashes(self):
+        self.client.post('/api/create_custom/', data=json.dumps(custom_body()), content_type='application/json')
+        exported = self.export()
+        original = ODETask.objects.get()
+        ODETask.objects.all().delete()
+
+        stats = importer.import_tasks(io.BytesIO(exported), workers=1)
+
+        self.assertEqual(stats.imported, 1)
+        imported = ODETask.objects.get()
+        self.assertEqual(imported.content_hash, original.content_hash)
+        self.assertEqual(imported.final_solution, original.final_solution)
+
+
+class AdmissionTests(TestCase):
+    url = '/api/create_custom/'
+
+    def setUp(self):
+        reset_request_state()
+        self.addCleanup(admission.reset)
+
+    def post(self, body=None):
+        return self.client.post(self.url, data=json.dumps(body or {}), content_type='application/json')
+
+    @admission_settings(RATE_LIMITS={'create_custom': {'RATE': 0.5, 'BURST': 2}})
+    def test_empty_bucket_is_429_with_retry_after(self):
+        # Invalid bodies still cost a token: the limit applies before parsing
+        self.assertEqual([self.post().status_code for _ in range(2)], [400, 400])
+        response = self.post()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+    @admission_settings(RATE_LIMITS={'jobs': {'RATE': 0.5, 'BURST': 1}})
+    def test_unsupported_methods_cost_no_token(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/jobs/').status_code, 405)
+            self.assertEqual(self.client.options('/api/jobs/').status_code, 200)
+
+        response = self.client.post('/api/jobs/', data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @admission_settings(SCOPES={'create_custom': {'CONCURRENCY': 1, 'QUEUE_SIZE': 0, 'MAX_WAIT': 2.0}},
+                        RETRY_AFTER=3)
+    def test_full_queue_is_503(self):
+        limiter = admission.get_limiter('create_custom')
+        self.assertTrue(limiter.acquire())
+        try:
+            started = time.monotonic()
+            response = self.post(custom_body())
+            self.assertLess(time.monotonic() - started, 1.0)
+        finally:
+            limiter.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(ODETask.objects.count(), 0)
+        self.assertEqual(self.post(custom_body()).status_code, 200)
+
+    @admission_settings(SCOPES={'create_custom': {'CONCURRENCY': 1, 'QUEUE_SIZE': 1, 'MAX_WAIT': 0.05}})
+    def test_wait_timeout_is_503(self):
+        limiter = admission.get_limiter('create_custom')
+        self.assertTrue(limiter.acquire())
+        try:
+            response = self.post(custom_body())
+        finally:
+            limiter.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_waiter_gets_a_released_slot(self):
+        limiter = ConcurrencyLimiter(1, 1, 5.0)
+        self.assertTrue(limiter.acquire())
+        threading.Timer(0.05, limiter.release).start()
+
+        self.assertTrue(limiter.acquire())
+        self.assertEqual((limiter.active, limiter.waiting), (1, 0))
+
+    def test_bucket_refills_at_rate(self):
+        bucket = TokenBucket(rate=2.0, burst=2)
+        with mock.patch.object(admission, 'time') as clock:
+            clock.monotonic.return_value = 100.0
+            self.assertEqual([bucket.consume('a')[0] for _ in range(3)], [True, True, False])
+            self.assertEqual(bucket.consume('a'), (False, 0.5))
+            self.assertTrue(bucket.consume('b')[0])
+
+            clock.monotonic.return_value = 100.25
+            allowed, wait = bucket.consume('a')
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 0.25)
+
+            clock.monotonic.return_value = 100.5
+            self.assertTrue(bucket.consume('a')[0])
+
+            # Refill stops at the burst size
+            clock.monotonic.return_value = 200.0
+            self.assertEqual([bucket.consume('a')[0] for _ in range(3)], [True, True, False])
+
+
+@override_settings(ODE_SOLVER_JOBS={**settings.ODE_SOLVER_JOBS, 'MAX_ATTEMPTS': 2})
+class JobQueueTests(TestCase):
+
+    def test_claim_leases_the_job_to_one_worker(self):
+        job = jobs.enqueue_generate(1)
+
+        claimed = jobs.claim_next_job('worker-1')
+
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts), (Job.STATUS_RUNNING, 'worker-1', 1))
+        self.assertGreater(claimed.lease_expires_at, timezone.now())
+        self.assertIsNone(jobs.claim_next_job('worker-2'))
+
+    def test_claim_skips_a_job_taken_since_it_was_listed(self):
+        jobs.enqueue_generate(1)
+        jobs.enqueue_generate(1)
+        update = QuerySet.update
+        rivals = []
+
+        def claim_first(queryset, **kwargs):
+            # Another worker wins the conditional UPDATE for the first candidate
+            if not rivals:
+                rivals.append(None)
+                rivals[0] = jobs.claim_next_job('worker-2')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=claim_first):
+            claimed = jobs.claim_next_job('worker-1')
+
+        self.assertNotEqual(claimed.pk, rivals[0].pk)
+        self.assertEqual(
+            sorted(Job.objects.values_list('worker', 'attempts')), [('worker-1', 1), ('worker-2', 1)]
+        )
+
+    def test_expired_lease_is_reclaimed(self):
+        jobs.enqueue_generate(1)
+        stale = jobs.claim_next_job('worker-1')
+        Job.objects.filter(pk=stale.pk).update(lease_expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        reclaimed = jobs.claim_next_job('worker-2')
+
+        self.assertEqual(reclaimed.pk, stale.pk)
+        self.assertEqual((reclaimed.worker, reclaimed.attempts), ('worker-2', 2))
+        # The first worker finds out at its next heartbeat
+        with self.assertRaises(jobs.LeaseLost):
+            jobs._heartbeat(stale, progress=1)
+
+    def test_custom_job_succeeds(self):
+        parsed = validation.parse_custom_task(custom_body())
+        jobs.enqueue_custom(*parsed)
+
+        jobs.run_job(jobs.claim_next_job('worker-1'))
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.progress), (Job.STATUS_SUCCEEDED, 1))
+        self.assertEqual(job.result['task_ids'], [ODETask.objects.get().pk])
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(job.lease_expires_at)
+
+    def test_failed_attempt_is_requeued_until_max_attempts(self):
+        jobs.enqueue_generate(1)
+        with mock.patch.object(ODEGenerator, 'generate_valid_ode_task', side_effect=RuntimeError('solver crashed')):
+            jobs.run_job(jobs.claim_next_job('worker-1'))
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.worker, job.error), (Job.STATUS_QUEUED, '', 'solver crashed'))
+
+            jobs.run_job(jobs.claim_next_job('worker-1'))
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertIsNone(jobs.claim_next_job('worker-1'))
+
+    def test_job_past_max_attempts_is_failed_without_running(self):
+        jobs.enqueue_generate(1)
+        Job.objects.update(attempts=2)
+
+        with mock.patch.object(ODEGenerator, 'generate_valid_ode_task') as generate:
+            jobs.run_job(jobs.claim_next_job('worker-1'))
+
+        generate.assert_not_called()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('Gave up after 2 attempts', job.error)
+
+
+class AuditTasksCommandTests(TestCase):
+
+    def setUp(self):
+        reset_request_state()
+        for target_time in (1.0, 2.0):
+            self.client.post('/api/create_custom/', data=json.dumps(custom_body(target_time=target_time)),
+                             content_type='application/json')
+
+    def audit(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('audit_tasks', *args, stdout=stdout, stderr=stderr)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()], stderr.getvalue()
+
+    def test_consistent_tasks_report_nothing(self):
+        rows, summary = self.audit()
+
+        self.assertEqual(rows, [])
+        self.assertIn('Audited 2 tasks', summary)
+        self.assertIn('0 inconsistent', summary)
+
+    def test_inconsistent_rows_are_written_to_stdout(self):
+        task = ODETask.objects.order_by('pk').last()
+        ODETask.objects.filter(pk=task.pk).update(weighted_sum=task.weighted_sum + 1)
+
+        rows, summary = self.audit()
+
+        self.assertEqual([row['task_id'] for row in rows], [task.pk])
+        self.assertIn('weighted_sum', rows[0]['issues'])
+        self.assertIn('1 inconsistent', summary)
+        with self.assertRaises(CommandError):
+            self.audit('--fail-on-issues')
+
+
+class AttemptFixtures:
+
+    def setUp(self):
+        reset_request_state()
+        response = self.client.post('/api/create_custom/', data=json.dumps(custom_body()),
+                                    content_type='application/json')
+        self.task_id = response.json()['task_id']
+        self.start = timezone.now()
+
+    def buffer(self, **options):
+        buffer = attempts.AttemptBuffer(**options)
+        # No flusher thread: these tests flush explicitly
+        buffer._ensure_started = lambda: None
+        return buffer
+
+    def attempt(self, is_correct=False, seconds=0):
+        return Attempt(task_id=self.task_id, submitted_solution=1, is_correct=is_correct,
+                       created_at=self.start + datetime.timedelta(seconds=seconds))
+
+
+
+class AttemptBufferTests(AttemptFixtures, TestCase):
+
+    def test_add_buffers_without_writing(self):
+        buffer = self.buffer()
+        with self.assertNumQueries(0):
+            buffer.add(self.attempt())
+
+        self.assertEqual(buffer.pending(), 1)
+        self.assertEqual(Attempt.objects.count(), 0)
+
+    def test_flush_writes_in_batches_and_aggregates_stats(self):
+        buffer = self.buffer(batch_size=2)
+        for seconds, is_correct in ((3, True), (1, False), (4, True), (2, False), (5, False)):
+            buffer.add(self.attempt(is_correct, seconds))
+
+        with mock.patch.object(buffer, '_write', wraps=buffer._write) as write:
+            self.assertEqual(buffer.flush(), 5)
+
+        self.assertEqual([len(call.args[0]) for call in write.call_args_list], [2, 2, 1])
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(Attempt.objects.count(), 5)
+        stats = AttemptStats.objects.get(task_id=self.task_id)
+        self.assertEqual((stats.attempts, stats.correct), (5, 2))
+        self.assertEqual(stats.first_attempt_at, self.start + datetime.timedelta(seconds=1))
+        self.assertEqual(stats.last_attempt_at, self.start + datetime.timedelta(seconds=5))
+
+    def test_stats_accumulate_across_flushes(self):
+        buffer = self.buffer()
+        buffer.add(self.attempt(True, seconds=10))
+        buffer.flush()
+        buffer.add(self.attempt(False, seconds=0))
+        buffer.add(self.attempt(True, seconds=5))
+        buffer.flush()
+
+        stats = AttemptStats.objects.get(task_id=self.task_id)
+        self.assertEqual((stats.attempts, stats.correct, stats.solve_rate), (3, 2, 2 / 3))
+        self.assertEqual(stats.first_attempt_at, self.start)
+        self.assertEqual(stats.last_attempt_at, self.start + datetime.timedelta(seconds=10))
+
+    def test_failed_flush_keeps_the_batch(self):
+        buffer = self.buffer()
+        buffer.add(self.attempt())
+        with mock.patch.object(buffer, '_write', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+
+        self.assertEqual(buffer.pending(), 1)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(Attempt.objects.count(), 1)
+
+    def test_oldest_attempts_are_dropped_beyond_max_pending(self):
+        buffer = self.buffer(batch_size=2, max_pending=3)
+        for seconds in range(5):
+            buffer.add(self.attempt(seconds=seconds))
+
+        self.assertEqual(buffer.pending(), 3)
+        buffer.flush()
+        self.assertEqual(AttemptStats.objects.get(task_id=self.task_id).first_attempt_at,
+                         self.start + datetime.timedelta(seconds=2))
+
+    def test_full_batch_wakes_the_flusher(self):
+        buffer = self.buffer(batch_size=2)
+        buffer.add(self.attempt())
+        self.assertFalse(buffer._wakeup.is_set())
+
+        buffer.add(self.attempt())
+        self.assertTrue(buffer._wakeup.is_set())
+
+    def test_flusher_runs_on_size_and_on_interval(self):
+        for options in ({'batch_size': 1, 'flush_interval': 60}, {'batch_size': 100, 'flush_interval': 0.05}):
+            with self.subTest(**options):
+                buffer = attempts.AttemptBuffer(**options)
+                flushed = threading.Event()
+                # Stays mocked: the daemon thread outlives the test
+                buffer.flush = mock.Mock(side_effect=lambda: flushed.set() or 0)
+                buffer.add(self.attempt())
+
+                self.assertTrue(flushed.wait(5))
+
+    def test_pending_attempts_are_flushed_at_exit(self):
+        buffer = self.buffer()
+        buffer.add(self.attempt(True))
+        with mock.patch.object(attempts, '_buffer', buffer):
+            attempts._flush_at_exit()
+
+        self.assertEqual(Attempt.objects.count(), 1)
+        self.assertEqual(AttemptStats.objects.get(task_id=self.task_id).correct, 1)
+
+    def test_verify_records_an_attempt(self):
+        buffer = self.buffer()
+        with mock.patch.object(attempts, '_buffer', buffer):
+            response = self.client.post('/api/verify/', data=json.dumps({'task_id': self.task_id, 'solution': 7.0}),
+                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(buffer.pending(), 1)
+        attempt = buffer._pending[0]
+        self.assertEqual((attempt.task_id, attempt.submitted_solution), (self.task_id, 7))
+
+
+class AttemptCommitTests(AttemptFixtures, TransactionTestCase):
+
+    def test_attempts_on_deleted_tasks_are_dropped(self):
+        # SQLite checks foreign keys at commit, which a TestCase never reaches
+        buffer = self.buffer()
+        buffer.add(self.attempt(True))
+        buffer.add(Attempt(task_id=self.task_id + 1000, is_correct=True, created_at=self.start))
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(list(Attempt.objects.values_list('task_id', flat=True)), [self.task_id])
+        self.assertEqual(list(AttemptStats.objects.values_list('task_id', flat=True)), [self.task_id])
+
+
+class LoadTestTargetTests(TransactionTestCase):
+
+    def test_worker_threads_close_their_connections(self):
+        response = self.client.post('/api/create_custom/', data=json.dumps(custom_body()),
+                                    content_type='application/json')
+        scenario = loadtest.load_scenario({'mix': {'detail': 1}, 'rps': 0, 'concurrency': 3, 'duration': 0.2})
+        target = loadtest.InProcessTarget()
+        request = target.request
+        used = {}
+
+        def tracked_request(*args):
+            result = request(*args)
+            used[threading.get_ident()] = connections['default']
+            return result
+
+        # The in-memory test database ignores close(), so watch the calls instead
+        close = type(connections['default']).close
+        closed = []
+
+        def tracked_close(connection):
+            closed.append((threading.get_ident(), connection))
+            return close(connection)
+
+        with mock.patch.object(target, 'request', side_effect=tracked_request), \
+                mock.patch.object(type(connections['default']), 'close', autospec=True, side_effect=tracked_close):
+            runner = loadtest.Runner(scenario, target, [loadtest.TaskRef(response.json()['task_id'], None)])
+            runner.run(scenario['duration'], scenario['seed'])
+
+        self.assertEqual(runner.stats['detail'].errors, 0)
+        self.assertEqual(len(used), 3)
+        self.assertNotIn(threading.get_ident(), used)
+        for ident, connection in used.items():
+            self.assertIn((ident, connection), closed)
+
+
+ROTATION = [[0.0, 1.0, 0.0, 0.0], [-1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0], [0.0, 0.0, -1.0, 0.0]]
+
+
+class SolverToleranceTests(TestCase):
+
+    def setUp(self):
+        reset_request_state()
+
+    def solve(self, linear=LINEAR, target_time=1.0):
+        return ODEGenerator()._solve_system({'linear': linear}, tuple(INITIAL_CONDITIONS.values()), target_time)
+
+    def test_loose_solve_is_kept_when_the_margin_is_wide(self):
+        with mock.patch.object(scoring, 'rounding_margin', return_value=0.4):
+            result = self.solve()
+
+        self.assertEqual((result['rtol'], result['atol']), (1e-6, 1e-8))
+
+    def test_tightens_while_the_margin_is_within_the_error(self):
+        with mock.patch.object(scoring, 'rounding_margin', side_effect=[1e-12, 1e-12, 0.4]):
+            result = self.solve()
+
+        self.assertAlmostEqual(result['rtol'], 1e-10, delta=1e-20)
+        self.assertAlmostEqual(result['atol'], 1e-12, delta=1e-22)
+
+    @override_settings(ODE_SOLVER_SETTINGS={**settings.ODE_SOLVER_SETTINGS, 'RTOL': 1e-8, 'ATOL': 1e-10})
+    def test_tightening_stops_at_the_floor(self):
+        with mock.patch.object(scoring, 'rounding_margin', return_value=1e-12) as margin:
+            result = self.solve()
+
+        self.assertEqual(margin.call_count, 2)
+        self.assertEqual((result['rtol'], result['atol']), (1e-8, 1e-10))
+
+    def test_tolerances_are_saved_on_the_task(self):
+        with mock.patch.object(scoring, 'rounding_margin', side_effect=[1e-12, 0.4]):
+            response = self.client.post('/api/create_custom/', data=json.dumps(custom_body()),
+                                        content_type='application/json')
+
+        task = ODETask.objects.get(pk=response.json()['task_id'])
+        self.assertAlmostEqual(task.solver_rtol, 1e-8, delta=1e-18)
+        self.assertAlmostEqual(task.solver_atol, 1e-10, delta=1e-20)
+
+    def test_passes_share_one_deadline(self):
+        from scipy.integrate import solve_ivp
+
+        # TIMEOUT is 10 s: the first pass starts 6 s in, the second would start after the deadline
+        clock = mock.Mock(monotonic=mock.Mock(side_effect=[0.0, 6.0, 11.0]), perf_counter=time.perf_counter)
+        with mock.patch.object(services, 'time', clock), \
+                mock.patch('scipy.integrate.solve_ivp', wraps=solve_ivp) as solve, \
+                mock.patch.object(scoring, 'rounding_margin', return_value=1e-12):
+            result = self.solve()
+
+        self.assertIsNone(result)
+        self.assertEqual(solve.call_count, 1)
+
+    def test_arc_length_error_estimate(self):
+        import numpy as np
+        from scipy.integrate import solve_ivp
+
+        # A full-rank system: u(t) traces circles, so the quadrature error is far above rounding level
+        sol = solve_ivp(lambda t, u: np.dot(ROTATION, u), [0, 3.0], tuple(INITIAL_CONDITIONS.values()),
+                        rtol=1e-12, atol=1e-14, dense_output=True)
+        arc_length = services.compute_arc_length(sol.sol, 3.0)
+        actual = abs(arc_length - services.compute_arc_length(sol.sol, 3.0, 200001))
+        estimate = services.arc_length_error(sol.sol, 3.0, arc_length)
+
+        self.assertGreater(actual, 1e-7)
+        self.assertAlmostEqual(estimate / actual, 1.0, delta=0.05)
+
+    def test_quadrature_error_counts_but_does_not_force_tightening(self):
+        self.assertAlmostEqual(
+            services.estimated_answer_error([0.0] * 4, 0.0, 0.0, 0.0, error_factor=10.0, quadrature_error=1e-6),
+            1e-5,
+        )
+        # The rotation's quadrature error (~1e-6) covers this margin at any tolerance
+        with mock.patch.object(scoring, 'rounding_margin', return_value=1e-7) as margin:
+            result = self.solve(ROTATION, 3.0)
+
+        self.assertEqual(margin.call_count, 1)
+        self.assertEqual(result['rtol'], 1e-6)
+
+
+@unittest.skipIf(server.BaseApplication is None, 'gunicorn is not installed')
+class ServerPreloadTests(TestCase):
+
+    def load(self, warmup_enabled):
+        app = server.Application('django_math_stumper.wsgi.application', {}, {},
+                                 {**warmup.DEFAULTS, 'ENABLED': warmup_enabled})
+        with mock.patch.object(warmup, '_warm_imports') as imports, \
+                mock.patch.object(warmup, 'warm_up') as warm_up:
+            app.load()
+        return imports, warm_up
+
+    def test_master_imports_numpy_and_scipy_without_warm_up(self):
+        imports, warm_up = self.load(warmup_enabled=False)
+
+        imports.assert_called_once_with()
+        warm_up.assert_not_called()
+
+    def test_warm_up_adds_the_preload_steps(self):
+        imports, warm_up = self.load(warmup_enabled=True)
+
+        imports.assert_called_once_with()
+        self.assertEqual(warm_up.call_args.kwargs['only'], warmup.PRELOAD_STEPS)
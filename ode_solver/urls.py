@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 from .save_prompt_view import SavePromptView
 
 urlpatterns = [
@@ -8,6 +8,15 @@ urlpatterns = [
     path('api/verify/', views.VerifySolutionView.as_view(), name='verify_solution'),
     path('api/task/<int:task_id>/', views.TaskDetailView.as_view(), name='task_detail'),
     path('api/task/<int:task_id>/solution/', views.TaskSolutionView.as_view(), name='task_solution'),
+    path('api/task/<int:task_id>/full/', views.TaskBundleView.as_view(), name='task_bundle'),
+    path('api/async/generate/', async_views.AsyncGenerateODETaskView.as_view(), name='async_generate_ode_task'),
+    path('api/async/create_custom/', async_views.AsyncCreateCustomTaskView.as_view(), name='async_create_custom_task'),
+    path('api/async/verify/', async_views.AsyncVerifySolutionView.as_view(), name='async_verify_solution'),
+    path('api/async/task/<int:task_id>/', async_views.AsyncTaskDetailView.as_view(), name='async_task_detail'),
+    path('api/jobs/', views.JobCreateView.as_view(), name='create_job'),
+    path('api/jobs/<int:job_id>/', views.JobDetailView.as_view(), name='job_detail'),
+    path('api/async/jobs/<int:job_id>/', async_views.AsyncJobDetailView.as_view(), name='async_job_detail'),
+    path('api/export/tasks.jsonl', views.TaskExportView.as_view(), name='export_tasks'),
     path('api/save_prompt/', SavePromptView.as_view(), name='save_prompt'),
     path('', views.index, name='index'),
 ]
@@ -0,0 +1,205 @@
+"""
+Request validation and pre-solve screening for custom systems.
+
+``parse_custom_task`` checks a ``create_custom`` / custom job body against a
+strict schema built once at import: ``coefficients.linear`` is a 4x4 array
+of JSON numbers (``nonlinear`` may accompany it), ``initial_conditions``
+has exactly x0, y0, z0 and w0, and ``target_time`` is a number. Errors name
+the offending field, e.g. ``coefficients.linear[2][1]``.
+
+``screen`` then runs constant-time numeric checks on the parsed system:
+
+- every value is finite and within ``MAX_COEFFICIENT`` / ``MAX_INITIAL_VALUE``
+- 0 < t_f <= ``MAX_TARGET_TIME``
+- ‖A‖_F·t_f <= ``MAX_GROWTH_EXPONENT``. ‖u(t)‖ <= ‖u0‖ e^{‖A‖ t}, and the
+  solver's step count grows with ‖A‖·t_f, so this bounds both the answer
+  and the cost of the solve
+- the results fit the task's decimal columns. For rank-1 matrices (A² =
+  tr(A)·A) u(t_f) and the arc length have a closed form and are checked
+  exactly; for other matrices u(t_f) = e^{A t_f} u0 is checked with
+  ``scipy.linalg.expm`` (a few microseconds for 4x4)
+
+Both raise ``ValidationError`` (a ``ValueError``), so a bad request never
+reaches ``_solve_system``.
+"""
+import math
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULTS = {
+    'MAX_COEFFICIENT': 1e3,
+    'MAX_INITIAL_VALUE': 1e3,
+    'MAX_TARGET_TIME': 100.0,
+    'MAX_GROWTH_EXPONENT': 25.0,
+    'RANK_ONE_TOLERANCE': 1e-9,
+}
+
+IC_KEYS = ('x0', 'y0', 'z0', 'w0')
+DIMENSION = 4
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_VALIDATION', {})}
+
+
+class ValidationError(ValueError):
+    def __init__(self, field: str, message: str):
+        super().__init__(f"{field}: {message}" if field else message)
+        self.field = field
+        self.message = message
+
+    def as_dict(self) -> dict:
+        return {'error': str(self), 'field': self.field}
+
+
+Validator = Callable[[object], object]
+
+
+def _number(path: str) -> Validator:
+    def validate(value):
+        # bool is an int subclass but never a valid coefficient
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValidationError(path, 'must be a number')
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValidationError(path, 'must be finite')
+        return value
+    return validate
+
+
+def _array(path: str, length: int, item: Callable[[str], Validator]) -> Validator:
+    items = [item(f"{path}[{i}]") for i in range(length)]
+
+    def validate(value):
+        if not isinstance(value, (list, tuple)):
+            raise ValidationError(path, f'must be an array of {length}')
+        if len(value) != length:
+            raise ValidationError(path, f'must have {length} entries, got {len(value)}')
+        return [check(entry) for check, entry in zip(items, value)]
+    return validate
+
+
+def _matrix(path: str) -> Validator:
+    return _array(path, DIMENSION, lambda row: _array(row, DIMENSION, _number))
+
+
+def _object(path: str, fields: Dict[str, Tuple[Callable[[str], Validator], bool]], strict: bool = True) -> Validator:
+    prefix = f"{path}." if path else ''
+    compiled = {name: (factory(prefix + name), required) for name, (factory, required) in fields.items()}
+    allowed = set(compiled)
+
+    def validate(value, extra=frozenset()):
+        if not isinstance(value, dict):
+            raise ValidationError(path, 'must be an object')
+        if strict:
+            unknown = set(value) - allowed - set(extra)
+            if unknown:
+                raise ValidationError(prefix + sorted(unknown)[0], 'is not an allowed field')
+        result = {}
+        for name, (check, required) in compiled.items():
+            if name not in value or value[name] is None:
+                if required:
+                    raise ValidationError(prefix + name, 'is required')
+                continue
+            result[name] = check(value[name])
+        return result
+    return validate
+
+
+CUSTOM_TASK_SCHEMA = _object('', {
+    'coefficients': (lambda path: _object(path, {
+        'linear': (_matrix, True),
+        'nonlinear': (_matrix, False),
+    }), True),
+    'initial_conditions': (lambda path: _object(path, {key: (_number, True) for key in IC_KEYS}), True),
+    'target_time': (_number, True),
+})
+
+
+def max_result_value() -> float:
+    """Largest magnitude the task's result columns can store"""
+    from .models import ODETask
+
+    field = ODETask._meta.get_field('x_final')
+    return float(10 ** (field.max_digits - field.decimal_places))
+
+
+def _rank_one_residual(linear, trace: float) -> float:
+    residual = 0.0
+    for i in range(DIMENSION):
+        for j in range(DIMENSION):
+            square = sum(linear[i][k] * linear[k][j] for k in range(DIMENSION))
+            residual = max(residual, abs(square - trace * linear[i][j]))
+    return residual
+
+
+def rank_one_results(linear, initial_conditions, target_time: float):
+    """Exact (u(t_f), arc length) for a rank-1 matrix: u(t_f) = u0 + φ A u0, L = |A u0| φ"""
+    trace = sum(linear[i][i] for i in range(DIMENSION))
+    lt = trace * target_time
+    phi = target_time if abs(lt) < 1e-12 else math.expm1(lt) / trace
+    velocity = [sum(linear[i][j] * initial_conditions[j] for j in range(DIMENSION)) for i in range(DIMENSION)]
+    finals = [u + phi * v for u, v in zip(initial_conditions, velocity)]
+    return finals, math.sqrt(sum(v * v for v in velocity)) * phi
+
+
+def screen(linear, initial_conditions, target_time: float, config: Optional[dict] = None):
+    """Reject systems that cannot be solved cheaply or whose results cannot be stored"""
+    from . import scoring
+
+    config = config or get_config()
+    for i, row in enumerate(linear):
+        for j, value in enumerate(row):
+            if not math.isfinite(value) or abs(value) > config['MAX_COEFFICIENT']:
+                raise ValidationError(
+                    f'coefficients.linear[{i}][{j}]',
+                    f"must be finite with magnitude at most {config['MAX_COEFFICIENT']:g}",
+                )
+    for key, value in zip(IC_KEYS, initial_conditions):
+        if not math.isfinite(value) or abs(value) > config['MAX_INITIAL_VALUE']:
+            raise ValidationError(
+                f'initial_conditions.{key}',
+                f"must be finite with magnitude at most {config['MAX_INITIAL_VALUE']:g}",
+            )
+    if not math.isfinite(target_time) or not 0 < target_time <= config['MAX_TARGET_TIME']:
+        raise ValidationError('target_time', f"must be in (0, {config['MAX_TARGET_TIME']:g}]")
+
+    norm = math.sqrt(sum(value * value for row in linear for value in row))
+    growth = norm * target_time
+    if growth > config['MAX_GROWTH_EXPONENT']:
+        raise ValidationError(
+            'coefficients.linear',
+            f"‖A‖·t_f = {growth:.3g} exceeds {config['MAX_GROWTH_EXPONENT']:g}",
+        )
+
+    limit = max_result_value()
+    trace = sum(linear[i][i] for i in range(DIMENSION))
+    scale = max(1.0, max(abs(value) for row in linear for value in row) ** 2)
+    if _rank_one_residual(linear, trace) <= config['RANK_ONE_TOLERANCE'] * scale:
+        finals, arc_length = rank_one_results(linear, initial_conditions, target_time)
+        largest = max(max(abs(value) for value in finals), abs(scoring.weighted_sum(finals)), arc_length)
+        if not largest < limit:
+            raise ValidationError(
+                'coefficients.linear', f"the solution reaches {largest:.3g}, beyond the storable range ±{limit:g}"
+            )
+        return
+    from scipy.linalg import expm
+
+    propagator = expm([[value * target_time for value in row] for row in linear])
+    finals = [float(value) for value in propagator @ initial_conditions]
+    largest = max(max(abs(value) for value in finals), abs(scoring.weighted_sum(finals)))
+    if not largest < limit:
+        raise ValidationError(
+            'coefficients.linear', f"the solution reaches {largest:.3g}, beyond the storable range ±{limit:g}"
+        )
+
+
+def parse_custom_task(data, extra_fields=frozenset()):
+    """Validate a request body; returns (coefficients, initial_conditions, target_time)"""
+    parsed = CUSTOM_TASK_SCHEMA(data, extra_fields)
+    coefficients = parsed['coefficients']
+    initial_conditions = tuple(parsed['initial_conditions'][key] for key in IC_KEYS)
+    target_time = parsed['target_time']
+    screen(coefficients['linear'], initial_conditions, target_time)
+    return coefficients, initial_conditions, target_time
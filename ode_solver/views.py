@@ -1,13 +1,22 @@
 from django.shortcuts import render
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.http import StreamingHttpResponse
 import json
 import decimal
 from decimal import Decimal
-from .models import ODETask
+from .models import Job, ODETask
 from .services import ODEGenerator, format_latex_solution, format_equation_latex
+from .sqlite_tuning import save_task
+from .db_routers import ReplicaReadMixin, choose_read_alias, get_task_for_read, pin_to_primary
+from .conditional import ConditionalTaskMixin
+from .admission import AdmissionControlMixin, client_key, overloaded_response
+from .idempotency import IdempotencyMixin
+from .responses import FastJsonResponse, parse_json_body
+from .fields import ALL_FIELDS, FieldSelection, FieldSelectionError
+from . import attempts, export, jobs, scoring
+from .validation import ValidationError, parse_custom_task
 
 
 def index(request):
@@ -16,8 +25,11 @@ def index(request):
     return HttpResponseRedirect('http://localhost:3000')
 
 
-class GenerateODETaskView(View):
+class GenerateODETaskView(IdempotencyMixin, AdmissionControlMixin, View):
     """API endpoint to generate a new ODE task"""
+
+    admission_scope = 'generate'
+    idempotency_scope = 'generate'
     
     def get(self, request):
         print("DEBUG: GenerateODETaskView.get started") # Added for debugging
@@ -28,46 +40,34 @@ class GenerateODETaskView(View):
         
         if not task_data:
             print("DEBUG: GenerateODETaskView.get - could not generate valid ODE task") # Added for debugging
-            return JsonResponse({'error': 'Could not generate a valid ODE task'}, status=500)
+            return FastJsonResponse({'error': 'Could not generate a valid ODE task'}, status=500)
         
         # Create database record
-        ode_task = ODETask.objects.create(
-            coefficients=task_data['coefficients'],
-            x0=task_data['initial_conditions']['x0'],
-            y0=task_data['initial_conditions']['y0'],
-            z0=task_data['initial_conditions']['z0'],
-            w0=task_data['initial_conditions']['w0'],
-            target_time=task_data['target_time'],
-            x_final=task_data['solution']['final_values'][0],
-            y_final=task_data['solution']['final_values'][1],
-            z_final=task_data['solution']['final_values'][2],
-            w_final=task_data['solution']['final_values'][3],
-            weighted_sum=task_data['solution']['weighted_sum'],
-            arc_length=task_data['solution']['arc_length'],
-            curvature=task_data['solution']['curvature'],
-            final_solution=task_data['solution']['final_solution'],
-            is_valid=True
-        )
+        ode_task = save_task(ODETask.from_task_data(task_data))
+        pin_to_primary(ode_task.pk)
         
         # Return task details (without the solution for challenge)
-        response_data = {
+        return FastJsonResponse(self.build_task_response(ode_task))
+    
+    def build_task_response(self, ode_task):
+        """Response body for a freshly created task (without the solution)"""
+        initial_conditions = (float(ode_task.x0), float(ode_task.y0), float(ode_task.z0), float(ode_task.w0))
+        return {
             'task_id': ode_task.pk,
             'coefficients': ode_task.get_coefficients_dict(),
             'initial_conditions': {
-                'x0': float(ode_task.x0),
-                'y0': float(ode_task.y0),
-                'z0': float(ode_task.z0),
-                'w0': float(ode_task.w0),
+                'x0': initial_conditions[0],
+                'y0': initial_conditions[1],
+                'z0': initial_conditions[2],
+                'w0': initial_conditions[3],
             },
             'target_time': float(ode_task.target_time),
             'equation_preview': self.get_equation_preview(
                 ode_task.get_coefficients_dict(), 
                 ode_task.target_time,
-                (float(ode_task.x0), float(ode_task.y0), float(ode_task.z0), float(ode_task.w0))
+                initial_conditions
             )
         }
-        
-        return JsonResponse(response_data)
     
     def get_equation_preview(self, coefficients, target_time=None, initial_conditions=None):
         """Generate a LaTeX representation of the ODE system"""
@@ -99,6 +99,10 @@ class GenerateODETaskView(View):
 class CreateCustomTaskView(GenerateODETaskView):
     """API endpoint to create a custom ODE task"""
 
+    admission_scope = 'create_custom'
+    rate_limit_scope = 'create_custom'
+    idempotency_scope = 'create_custom'
+
     @method_decorator(csrf_exempt)
     def dispatch(self, *args, **kwargs):
         # Using super().dispatch correctly calls the next class in MRO (View.dispatch)
@@ -107,79 +111,43 @@ class CreateCustomTaskView(GenerateODETaskView):
     def post(self, request):
         """Create a new ODE task from submitted parameters"""
         try:
-            data = json.loads(request.body)
+            data = parse_json_body(request)
             
-            # Extract parameters
-            coefficients = data.get('coefficients')
-            initial_conditions_dict = data.get('initial_conditions')
-            target_time = data.get('target_time')
-            
-            if not coefficients or not initial_conditions_dict or target_time is None:
-                return JsonResponse({'error': 'Missing required parameters'}, status=400)
-            
-            # Format initial conditions
-            initial_conditions = (
-                float(initial_conditions_dict.get('x0', 0)),
-                float(initial_conditions_dict.get('y0', 0)),
-                float(initial_conditions_dict.get('z0', 0)),
-                float(initial_conditions_dict.get('w0', 0))
-            )
+            coefficients, initial_conditions, target_time = self.parse_custom_request(data)
             
             generator = ODEGenerator()
             
             # Create the custom task
-            task_data = generator.create_custom_task(coefficients, initial_conditions, float(target_time))
+            task_data = generator.create_custom_task(coefficients, initial_conditions, target_time)
             
             if not task_data:
-                return JsonResponse({'error': 'Could not solve the system with provided parameters'}, status=400)
+                return FastJsonResponse({'error': 'Could not solve the system with provided parameters'}, status=400)
             
             # Create database record
-            ode_task = ODETask.objects.create(
-                coefficients=task_data['coefficients'],
-                x0=task_data['initial_conditions']['x0'],
-                y0=task_data['initial_conditions']['y0'],
-                z0=task_data['initial_conditions']['z0'],
-                w0=task_data['initial_conditions']['w0'],
-                target_time=task_data['target_time'],
-                x_final=task_data['solution']['final_values'][0],
-                y_final=task_data['solution']['final_values'][1],
-                z_final=task_data['solution']['final_values'][2],
-                w_final=task_data['solution']['final_values'][3],
-                weighted_sum=task_data['solution']['weighted_sum'],
-                arc_length=task_data['solution']['arc_length'],
-                curvature=task_data['solution']['curvature'],
-                final_solution=task_data['solution']['final_solution'],
-                is_valid=True
-            )
+            ode_task = save_task(ODETask.from_task_data(task_data))
+            pin_to_primary(ode_task.pk)
             
             # Reuse the response format from GenerateODETaskView
-            # We can't easily reuse the 'get' method code without refactoring, so we duplicate the response structure
-            response_data = {
-                'task_id': ode_task.pk,
-                'coefficients': ode_task.get_coefficients_dict(),
-                'initial_conditions': {
-                    'x0': float(ode_task.x0),
-                    'y0': float(ode_task.y0),
-                    'z0': float(ode_task.z0),
-                    'w0': float(ode_task.w0),
-                },
-                'target_time': float(ode_task.target_time),
-                'equation_preview': self.get_equation_preview(
-                    ode_task.get_coefficients_dict(), 
-                    ode_task.target_time,
-                    initial_conditions
-                )
-            }
-            
-            return JsonResponse(response_data)
+            return FastJsonResponse(self.build_task_response(ode_task))
             
         except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+            return FastJsonResponse({'error': 'Invalid JSON'}, status=400)
+        except ValidationError as e:
+            return FastJsonResponse(e.as_dict(), status=400)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            return FastJsonResponse({'error': str(e)}, status=500)
 
+    def parse_custom_request(self, data, extra_fields=frozenset()):
+        """Validated (coefficients, initial_conditions, target_time); raises ValidationError.
 
-class VerifySolutionView(View):
+        The body is checked against a strict schema and screened numerically
+        (see ``validation.py``) so requests that cannot be solved or stored
+        never reach the solver.
+        """
+        return parse_custom_task(data, extra_fields)
+
+
+class VerifySolutionView(ReplicaReadMixin, View):
     """API endpoint to verify a submitted solution"""
     
     @method_decorator(csrf_exempt)
@@ -189,191 +157,347 @@ class VerifySolutionView(View):
     def post(self, request):
         """Verify a submitted solution against the ground truth"""
         try:
-            data = json.loads(request.body)
+            data = parse_json_body(request)
             task_id = data.get('task_id')
             submitted_solution = data.get('solution')
             
             if not task_id or submitted_solution is None:
-                return JsonResponse({'error': 'Missing task_id or solution'}, status=400)
+                return FastJsonResponse({'error': 'Missing task_id or solution'}, status=400)
             
             # Get the ODE task
             try:
-                ode_task = ODETask.objects.get(pk=task_id)
+                ode_task = get_task_for_read(task_id)
             except ODETask.DoesNotExist:
-                return JsonResponse({'error': 'Task not found'}, status=404)
+                return FastJsonResponse({'error': 'Task not found'}, status=404)
             
-            # Compare with ground truth
-            ground_truth = ode_task.final_solution
-            is_correct = submitted_solution == ground_truth
-            
-            response_data = {
-                'task_id': task_id,
-                'submitted_solution': submitted_solution,
-                'ground_truth': int(ground_truth) if ground_truth is not None else None,
-                'is_correct': is_correct,
-                'details': {
-                    'weighted_sum': float(ode_task.weighted_sum) if ode_task.weighted_sum else None,
-                    'arc_length': float(ode_task.arc_length) if ode_task.arc_length else None,
-                    'curvature': float(ode_task.curvature) if ode_task.curvature else None,
-                }
-            }
-            
-            return JsonResponse(response_data)
+            response_data = self.build_response(ode_task, task_id, submitted_solution)
+            attempts.record(ode_task.pk, submitted_solution, response_data['is_correct'], client_key(request))
+            return FastJsonResponse(response_data)
             
         except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+            return FastJsonResponse({'error': 'Invalid JSON'}, status=400)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            return FastJsonResponse({'error': str(e)}, status=500)
+    
+    def build_response(self, ode_task, task_id, submitted_solution):
+        """Compare a submission with the stored ground truth"""
+        # Compare with ground truth
+        ground_truth = ode_task.final_solution
+        is_correct = submitted_solution == ground_truth
+        
+        response_data = {
+            'task_id': task_id,
+            'submitted_solution': submitted_solution,
+            'ground_truth': int(ground_truth) if ground_truth is not None else None,
+            'is_correct': is_correct,
+            'details': {
+                'weighted_sum': float(ode_task.weighted_sum) if ode_task.weighted_sum else None,
+                'arc_length': float(ode_task.arc_length) if ode_task.arc_length else None,
+                'curvature': float(ode_task.curvature) if ode_task.curvature else None,
+            }
+        }
+        
+        return response_data
 
 
-class TaskDetailView(View):
+class TaskDetailView(ReplicaReadMixin, ConditionalTaskMixin, View):
     """API endpoint to get details of a specific task"""
     
+    available_fields = (
+        'task_id', 'coefficients', 'initial_conditions', 'target_time',
+        'equation_preview', 'created_at', 'is_valid',
+    )
+    
     def get(self, request, task_id):
         """Get details of a specific ODE task"""
+        try:
+            fields = self.get_field_selection(request)
+        except FieldSelectionError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        
         try:
             # Try to get the task, but catch any database conversion errors
             try:
-                ode_task = ODETask.objects.get(pk=task_id)
+                ode_task = get_task_for_read(task_id)
             except (decimal.InvalidOperation, ValueError, TypeError) as e:
                 print(f"DEBUG: Database conversion error for task {task_id}: {e}")
-                return JsonResponse({'error': f'Database error: {str(e)}'}, status=500)
+                return FastJsonResponse({'error': f'Database error: {str(e)}'}, status=500)
             
-            # Use the same formatting methods as GenerateODETaskView
-            generator_view = GenerateODETaskView()
-            equation_preview = generator_view.get_equation_preview(ode_task.get_coefficients_dict())
+            return self.cacheable_response(self.build_response(ode_task, fields), ode_task, fields)
             
-            # Safely convert Decimal fields to float with error handling
-            def safe_float_conversion(value, field_name):
-                try:
-                    if value is None:
-                        return 0.0
-                    return float(value)
-                except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                    print(f"DEBUG: Error converting {field_name}: {e}")
+        except ODETask.DoesNotExist:
+            return FastJsonResponse({'error': 'Task not found'}, status=404)
+    
+    def build_response(self, ode_task, fields=ALL_FIELDS):
+        """Public task details (without the solution)"""
+        # Safely convert Decimal fields to float with error handling
+        def safe_float_conversion(value, field_name):
+            try:
+                if value is None:
                     return 0.0
-            
-            response_data = {
-                'task_id': ode_task.pk,
-                'coefficients': ode_task.get_coefficients_dict(),
-                'initial_conditions': {
-                    'x0': safe_float_conversion(ode_task.x0, 'x0'),
-                    'y0': safe_float_conversion(ode_task.y0, 'y0'),
-                    'z0': safe_float_conversion(ode_task.z0, 'z0'),
-                    'w0': safe_float_conversion(ode_task.w0, 'w0'),
-                },
-                'target_time': safe_float_conversion(ode_task.target_time, 'target_time'),
-                'equation_preview': equation_preview,
-                'created_at': ode_task.created_at.isoformat(),
-                'is_valid': ode_task.is_valid
+                return float(value)
+            except (ValueError, TypeError, decimal.InvalidOperation) as e:
+                print(f"DEBUG: Error converting {field_name}: {e}")
+                return 0.0
+        
+        response_data = {}
+        if fields.wants('task_id'):
+            response_data['task_id'] = ode_task.pk
+        if fields.wants('coefficients'):
+            response_data['coefficients'] = ode_task.get_coefficients_dict()
+        if fields.wants('initial_conditions'):
+            response_data['initial_conditions'] = {
+                'x0': safe_float_conversion(ode_task.x0, 'x0'),
+                'y0': safe_float_conversion(ode_task.y0, 'y0'),
+                'z0': safe_float_conversion(ode_task.z0, 'z0'),
+                'w0': safe_float_conversion(ode_task.w0, 'w0'),
             }
-            
-            return JsonResponse(response_data)
-            
-        except ODETask.DoesNotExist:
-            return JsonResponse({'error': 'Task not found'}, status=404)
+        if fields.wants('target_time'):
+            response_data['target_time'] = safe_float_conversion(ode_task.target_time, 'target_time')
+        if fields.wants('equation_preview'):
+            # Use the same formatting methods as GenerateODETaskView
+            generator_view = GenerateODETaskView()
+            response_data['equation_preview'] = generator_view.get_equation_preview(ode_task.get_coefficients_dict())
+        if fields.wants('created_at'):
+            response_data['created_at'] = ode_task.created_at.isoformat()
+        if fields.wants('is_valid'):
+            response_data['is_valid'] = ode_task.is_valid
+        
+        return response_data
 
 
-class TaskSolutionView(View):
+class TaskSolutionView(ReplicaReadMixin, ConditionalTaskMixin, View):
     """API endpoint to get detailed solution for a specific task"""
     
+    available_fields = (
+        'task_id', 'coefficients', 'initial_conditions', 'target_time', 'equation_preview',
+        'final_values', 'stored_metrics', 'recalculated_metrics', 'consistency_check',
+        'created_at', 'is_valid', 'latex_solution',
+    )
+    
     def get(self, request, task_id):
         """Get detailed solution information for educational purposes"""
         try:
-            ode_task = ODETask.objects.get(pk=task_id)
+            fields = self.get_field_selection(request)
+        except FieldSelectionError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        
+        try:
+            ode_task = get_task_for_read(task_id)
+            
+            return self.cacheable_response(self.build_response(ode_task, fields), ode_task, fields)
             
+        except ODETask.DoesNotExist:
+            return FastJsonResponse({'error': 'Task not found'}, status=404)
+    
+    def build_response(self, ode_task, fields=ALL_FIELDS):
+        """Solution payload with stored and recalculated metrics, limited to ``fields``"""
+        coefficients = ode_task.get_coefficients_dict()
+        initial_conditions = (float(ode_task.x0), float(ode_task.y0), float(ode_task.z0), float(ode_task.w0))
+        initial_conditions_dict = dict(zip(('x0', 'y0', 'z0', 'w0'), initial_conditions))
+        target_time = float(ode_task.target_time)
+        
+        # Get final values (with fallback to initial conditions for old tasks)
+        final_values = [
+            float(final) if final is not None else initial
+            for final, initial in zip(
+                (ode_task.x_final, ode_task.y_final, ode_task.z_final, ode_task.w_final),
+                initial_conditions
+            )
+        ]
+        
+        stored_weighted_sum = float(ode_task.weighted_sum) if ode_task.weighted_sum else 0.0
+        stored_arc_length = float(ode_task.arc_length) if ode_task.arc_length else 0.0
+        stored_curvature = float(ode_task.curvature) if ode_task.curvature else 0.0
+        
+        response_data = {}
+        if fields.wants('task_id'):
+            response_data['task_id'] = ode_task.pk
+        if fields.wants('coefficients'):
+            response_data['coefficients'] = coefficients
+        if fields.wants('initial_conditions'):
+            response_data['initial_conditions'] = initial_conditions_dict
+        if fields.wants('target_time'):
+            response_data['target_time'] = target_time
+        if fields.wants('equation_preview'):
             # Use the same formatting methods as GenerateODETaskView
             generator_view = GenerateODETaskView()
-            initial_conditions = (float(ode_task.x0), float(ode_task.y0), float(ode_task.z0), float(ode_task.w0))
-            equation_preview = generator_view.get_equation_preview(
-                ode_task.get_coefficients_dict(),
-                float(ode_task.target_time),
+            response_data['equation_preview'] = generator_view.get_equation_preview(
+                coefficients,
+                target_time,
                 initial_conditions
             )
-            
-            # Get final values (with fallback to initial conditions for old tasks)
-            final_values = [
-                float(ode_task.x_final) if ode_task.x_final is not None else float(ode_task.x0),
-                float(ode_task.y_final) if ode_task.y_final is not None else float(ode_task.y0),
-                float(ode_task.z_final) if ode_task.z_final is not None else float(ode_task.z0),
-                float(ode_task.w_final) if ode_task.w_final is not None else float(ode_task.w0)
-            ]
-            
+        if fields.wants('final_values'):
+            response_data['final_values'] = final_values
+        if fields.wants('stored_metrics'):
+            response_data['stored_metrics'] = {
+                'weighted_sum': stored_weighted_sum,
+                'arc_length': stored_arc_length,
+                'curvature': stored_curvature,
+                'final_solution': int(ode_task.final_solution) if ode_task.final_solution is not None else None,
+            }
+        if fields.wants_any('recalculated_metrics', 'consistency_check'):
             # Recalculate metrics from final values to verify consistency
-            recalculated_weighted_sum = self.calculate_weighted_sum(final_values)
-            recalculated_arc_length = float(ode_task.arc_length) if ode_task.arc_length else 0.0  # Arc length requires integration, use stored value
-            recalculated_curvature = float(ode_task.curvature) if ode_task.curvature else 0.0  # Use stored value
-            recalculated_final_solution = self.calculate_final_solution(final_values)
+            recalculated_weighted_sum = scoring.weighted_sum(final_values)
+            recalculated_arc_length = stored_arc_length  # Arc length requires integration, use stored value
+            recalculated_curvature = stored_curvature  # Use stored value
+            recalculated_final_solution = scoring.final_solution(
+                recalculated_weighted_sum, recalculated_arc_length, recalculated_curvature
+            )
             
             # Check for consistency between stored and recalculated values
-            weighted_sum_consistent = abs(float(ode_task.weighted_sum) - recalculated_weighted_sum) < 1e-10 if ode_task.weighted_sum else True
+            weighted_sum_consistent = abs(stored_weighted_sum - recalculated_weighted_sum) < 1e-10 if ode_task.weighted_sum else True
             final_solution_consistent = ode_task.final_solution == recalculated_final_solution
             
-            response_data = {
-                'task_id': ode_task.pk,
-                'coefficients': ode_task.get_coefficients_dict(),
-                'initial_conditions': {
-                    'x0': float(ode_task.x0),
-                    'y0': float(ode_task.y0),
-                    'z0': float(ode_task.z0),
-                    'w0': float(ode_task.w0),
-                },
-                'target_time': float(ode_task.target_time),
-                'equation_preview': equation_preview,
-                'final_values': final_values,
-                'stored_metrics': {
-                    'weighted_sum': float(ode_task.weighted_sum) if ode_task.weighted_sum else 0.0,
-                    'arc_length': float(ode_task.arc_length) if ode_task.arc_length else 0.0,
-                    'curvature': float(ode_task.curvature) if ode_task.curvature else 0.0,
-                    'final_solution': int(ode_task.final_solution) if ode_task.final_solution is not None else None,
-                },
-                'recalculated_metrics': {
+            if fields.wants('recalculated_metrics'):
+                response_data['recalculated_metrics'] = {
                     'weighted_sum': recalculated_weighted_sum,
                     'arc_length': recalculated_arc_length,
                     'curvature': recalculated_curvature,
                     'final_solution': recalculated_final_solution,
-                },
-                'consistency_check': {
+                }
+            if fields.wants('consistency_check'):
+                response_data['consistency_check'] = {
                     'weighted_sum_consistent': weighted_sum_consistent,
                     'final_solution_consistent': final_solution_consistent,
                     'all_consistent': weighted_sum_consistent and final_solution_consistent
-                },
-                'created_at': ode_task.created_at.isoformat(),
-                'is_valid': ode_task.is_valid,
-                'latex_solution': format_latex_solution(
-                    ode_task.get_coefficients_dict(),
-                    {
-                        'x0': float(ode_task.x0),
-                        'y0': float(ode_task.y0),
-                        'z0': float(ode_task.z0),
-                        'w0': float(ode_task.w0)
-                    },
-                    float(ode_task.target_time),
-                    {
-                        'final_values': final_values,
-                        'weighted_sum': float(ode_task.weighted_sum or 0),
-                        'arc_length': float(ode_task.arc_length or 0),
-                        'curvature': float(ode_task.curvature or 0),
-                        'final_solution': ode_task.final_solution
-                    }
-                )
-            }
-            
-            return JsonResponse(response_data)
-            
+                }
+        if fields.wants('created_at'):
+            response_data['created_at'] = ode_task.created_at.isoformat()
+        if fields.wants('is_valid'):
+            response_data['is_valid'] = ode_task.is_valid
+        if fields.wants('latex_solution'):
+            response_data['latex_solution'] = format_latex_solution(
+                coefficients,
+                initial_conditions_dict,
+                target_time,
+                {
+                    'final_values': final_values,
+                    'weighted_sum': stored_weighted_sum,
+                    'arc_length': stored_arc_length,
+                    'curvature': stored_curvature,
+                    'final_solution': ode_task.final_solution
+                }
+            )
+        
+        return response_data
+
+
+class TaskBundleView(ReplicaReadMixin, ConditionalTaskMixin, View):
+    """API endpoint returning a task and its solution in one round trip"""
+    
+    solution_only_fields = (
+        'final_values', 'stored_metrics', 'recalculated_metrics', 'consistency_check', 'latex_solution',
+    )
+    available_fields = TaskDetailView.available_fields + solution_only_fields
+    
+    def get(self, request, task_id):
+        """Get task details plus the solution-only parts of the solution payload"""
+        try:
+            fields = self.get_field_selection(request)
+        except FieldSelectionError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        
+        try:
+            ode_task = get_task_for_read(task_id)
         except ODETask.DoesNotExist:
-            return JsonResponse({'error': 'Task not found'}, status=404)
+            return FastJsonResponse({'error': 'Task not found'}, status=404)
+        
+        solution_fields = FieldSelection(
+            include=[name for name in self.solution_only_fields if fields.wants(name)]
+        )
+        response_data = {
+            'task': TaskDetailView().build_response(ode_task, fields),
+            'solution': (
+                TaskSolutionView().build_response(ode_task, solution_fields)
+                if solution_fields.include else {}
+            ),
+        }
+        return self.cacheable_response(response_data, ode_task, fields)
+
+
+class TaskExportView(View):
+    """API endpoint streaming the task bank as JSONL (optionally gzip-compressed)"""
     
-    def calculate_weighted_sum(self, final_values):
-        """Calculate weighted sum from final values: S = x_f + 2*y_f + 3*z_f + 4*w_f"""
-        x_f, y_f, z_f, w_f = final_values
-        weighted_sum = x_f + 2*y_f + 3*z_f + 4*w_f
-        return float(weighted_sum)
+    def get(self, request):
+        """Stream tasks matching created_after/created_before/valid/min_answer/max_answer"""
+        try:
+            filters = export.filters_from_params(request.GET)
+            chunk_size = int(request.GET.get('chunk_size', export.DEFAULT_CHUNK_SIZE))
+        except ValueError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        
+        # Bulk reads go to a replica when one is configured
+        manager = ODETask.objects.db_manager(choose_read_alias() or 'default')
+        rows = export.iter_task_rows(export.filter_tasks(manager.all(), **filters), chunk_size=max(1, chunk_size))
+        stream = export.iter_jsonl(rows)
+        filename = 'tasks.jsonl'
+        content_type = 'application/x-ndjson'
+        if request.GET.get('gzip') in ('1', 'true'):
+            stream = export.iter_gzip(stream)
+            filename += '.gz'
+            content_type = 'application/gzip'
+        
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class JobCreateView(IdempotencyMixin, AdmissionControlMixin, View):
+    """API endpoint queueing a custom solve or a batch generation as a background job"""
+    
+    rate_limit_scope = 'jobs'
+    idempotency_scope = 'jobs'
+    
+    @method_decorator(csrf_exempt)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
     
-    def calculate_final_solution(self, final_values):
-        """Calculate final solution: ℒ = round(Σ u_i(t_f))"""
+    def post(self, request):
+        """Return 202 with the job id; poll GET /api/jobs/<id>/ for the result"""
+        try:
+            data = parse_json_body(request)
+            if not isinstance(data, dict):
+                raise ValidationError('', 'must be an object')
+            kind = data.get('kind', Job.KIND_CUSTOM)
+            
+            if jobs.queue_is_full():
+                return overloaded_response()
+            
+            if kind == Job.KIND_CUSTOM:
+                parsed = CreateCustomTaskView().parse_custom_request(data, extra_fields={'kind'})
+                job = jobs.enqueue_custom(*parsed)
+            elif kind == Job.KIND_GENERATE:
+                job = jobs.enqueue_generate(int(data.get('count', 1)))
+            else:
+                return FastJsonResponse({'error': f'Unknown job kind: {kind}'}, status=400)
+            
+            response = FastJsonResponse(jobs.job_payload(job), status=202)
+            response['Location'] = f'/api/jobs/{job.pk}/'
+            return response
+            
+        except json.JSONDecodeError:
+            return FastJsonResponse({'error': 'Invalid JSON'}, status=400)
+        except ValidationError as e:
+            return FastJsonResponse(e.as_dict(), status=400)
+        except (TypeError, ValueError) as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+
+
+class JobDetailView(View):
+    """API endpoint reporting job progress; ?wait=<seconds> waits briefly for a change.
+
+    The wait is capped at ``SYNC_LONG_POLL_TIMEOUT`` since it holds a worker
+    thread; ``AsyncJobDetailView`` long-polls without one.
+    """
+    
+    def get(self, request, job_id):
         try:
-            scalar_sum = sum(final_values)
-            return int(round(scalar_sum))
-        except Exception:
-            return 0
\ No newline at end of file
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            return FastJsonResponse({'error': 'wait must be a number of seconds'}, status=400)
+        
+        job = jobs.wait_for_update(job_id, wait) if wait > 0 else Job.objects.filter(pk=job_id).first()
+        if job is None:
+            return FastJsonResponse({'error': 'Job not found'}, status=404)
+        return FastJsonResponse(jobs.job_payload(job))
@@ -0,0 +1,231 @@
+"""
+Opt-in warm-up of a fresh worker, and the ``/ready`` endpoint.
+
+The first ``/api/generate/`` on a new worker pays for importing NumPy and
+SciPy (deferred by ``services``), the first ``solve_ivp`` call of each
+method, NumPy's first dispatch through the routines the solver uses, the
+URLconf import and the first database connection. With
+``ODE_SOLVER_WARMUP['ENABLED']``, ``OdeSolverConfig.ready()`` does all of
+that up front in ``warm_up``:
+
+- ``imports``: ``numpy``, ``scipy.integrate`` and ``scipy.linalg``
+- ``solvers``: a small rank-1 system solved with every method in
+  ``SOLVER_METHODS`` and its arc length computed, then screened by
+  ``validation.screen`` as a rank-1 and as a full-rank system (closed form
+  and ``expm``)
+- ``urls``: the URLconf, which imports every view
+- ``caches``: a read from every configured cache
+- ``databases``: a connection to every configured database
+
+Warm-up only runs in processes that serve requests: WSGI/ASGI workers and
+the ``manage.py`` commands in ``COMMANDS``, but not in the ``runserver``
+autoreloader's parent or in any other command. With ``BACKGROUND`` it runs
+in a thread, so startup is not delayed; otherwise ``ready()`` blocks until
+it is done and the database connections stay open for the main thread.
+Django connections belong to the thread that opened them, so in the
+background the ``databases`` step only checks that every database answers
+and closes its connections again; request threads open their own.
+``manage.py serve`` runs the steps itself: ``PRELOAD_STEPS`` in the master
+before forking, so the workers share the result, and the connection steps
+in each worker.
+
+``GET /ready`` answers 503 until every step has run and 200 afterwards,
+with the time spent on each step. A failed warm-up keeps the worker
+unready. Processes that do not warm up are ready at once.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from django.conf import settings
+
+from . import metrics
+from .responses import FastJsonResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'BACKGROUND': True,
+    # manage.py commands that serve requests; every other command skips warm-up
+    'COMMANDS': ('runserver',),
+    'DATABASES': True,
+    'CACHES': True,
+}
+
+STEPS = ('imports', 'solvers', 'urls', 'caches', 'databases')
+# Steps that open no connections, and so can run before forking
+PRELOAD_STEPS = ('imports', 'solvers', 'urls')
+CONNECTION_STEPS = ('caches', 'databases')
+
+# u' = a rᵀ u with tr(A) = a·r = 0.3, and a full-rank matrix for the expm path
+_DUMMY_A = (0.2, -0.1, 0.3, 0.4)
+_DUMMY_R = (0.5, 0.2, 0.1, 0.4)
+_DUMMY_GENERAL = ((0.1, 0.2, 0.0, 0.0), (0.0, 0.1, 0.2, 0.0), (0.0, 0.0, 0.1, 0.2), (0.2, 0.0, 0.0, 0.1))
+_DUMMY_INITIAL = (1.0, 0.5, -0.5, 0.25)
+_DUMMY_TARGET_TIME = 1.0
+
+_lock = threading.Lock()
+_state = {'status': 'disabled', 'steps': {}, 'seconds': None, 'error': None}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ODE_SOLVER_WARMUP', {})}
+
+
+def status() -> dict:
+    with _lock:
+        return {**_state, 'steps': dict(_state['steps'])}
+
+
+def is_ready() -> bool:
+    return status()['status'] in ('disabled', 'ready')
+
+
+def _set(**values):
+    with _lock:
+        _state.update(values)
+
+
+def serves_requests(argv=None) -> bool:
+    """Whether this process will serve requests, judged from its command line"""
+    argv = sys.argv if argv is None else argv
+    if not argv or Path(argv[0]).name not in ('manage.py', 'django-admin', '__main__.py'):
+        # gunicorn, uvicorn, daphne, mod_wsgi, ...
+        return True
+    command = argv[1] if len(argv) > 1 else None
+    if command not in get_config()['COMMANDS']:
+        return False
+    if command == 'runserver' and '--noreload' not in argv and os.environ.get('RUN_MAIN') != 'true':
+        # The autoreloader's parent only watches files; its child serves
+        return False
+    return True
+
+
+def _warm_imports():
+    import numpy  # noqa: F401
+    import scipy.integrate  # noqa: F401
+    import scipy.linalg  # noqa: F401
+
+
+def _warm_solvers():
+    import numpy as np
+    from scipy.integrate import solve_ivp
+
+    from .services import SOLVER_METHODS, compute_arc_length, solver_settings
+    from .validation import screen
+
+    linear = np.outer(_DUMMY_A, _DUMMY_R)
+    config = solver_settings()
+    for method in SOLVER_METHODS:
+        sol = solve_ivp(lambda t, u: np.dot(linear, u).tolist(), [0, _DUMMY_TARGET_TIME], _DUMMY_INITIAL,
+                        method=method, rtol=config['MAX_RTOL'], atol=config['MAX_ATOL'], dense_output=True)
+        compute_arc_length(sol.sol, _DUMMY_TARGET_TIME)
+    screen(linear.tolist(), _DUMMY_INITIAL, _DUMMY_TARGET_TIME)
+    screen([list(row) for row in _DUMMY_GENERAL], _DUMMY_INITIAL, _DUMMY_TARGET_TIME)
+
+
+def _warm_urls():
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def _warm_caches():
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        caches[alias].get('ode_solver:warmup')
+
+
+def _warm_databases():
+    from django.db import connections
+
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_up(config: Optional[dict] = None, only: Sequence[str] = STEPS) -> Dict[str, float]:
+    """Run the warm-up steps in ``only``; returns seconds per step and updates ``status()``.
+
+    Timings of earlier calls for other steps are kept, so a forked worker
+    reports the steps its master ran too.
+    """
+    config = config or get_config()
+    steps = {
+        'imports': _warm_imports,
+        'solvers': _warm_solvers,
+        'urls': _warm_urls,
+        'caches': _warm_caches if config['CACHES'] else None,
+        'databases': _warm_databases if config['DATABASES'] else None,
+    }
+    timings = {name: seconds for name, seconds in status()['steps'].items() if name not in only}
+    _set(status='warming_up', steps=dict(timings), seconds=None, error=None)
+    started = time.perf_counter()
+    try:
+        for name in STEPS:
+            if name not in only or steps[name] is None:
+                continue
+            step_started = time.perf_counter()
+            steps[name]()
+            timings[name] = time.perf_counter() - step_started
+            _set(steps=dict(timings))
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        _set(status='failed', seconds=elapsed, error=f"{name}: {e}")
+        metrics.WARMUP_SECONDS.observe(elapsed, outcome='failed')
+        logger.exception("Warm-up failed in step %s after %.3fs", name, elapsed)
+        raise
+    elapsed = time.perf_counter() - started
+    # A master that only ran PRELOAD_STEPS serves nothing and is not ready
+    complete = all(name in timings for name in STEPS if steps[name] is not None)
+    _set(status='ready' if complete else 'partial', seconds=sum(timings.values()))
+    metrics.WARMUP_SECONDS.observe(elapsed, outcome='ok')
+    logger.info("Warm-up finished in %.3fs (pid %d: %s)", elapsed, os.getpid(),
+                ', '.join(f"{name} {timings[name]:.3f}s" for name in only if name in timings))
+    return timings
+
+
+def _warm_up_in_background(config: dict):
+    from django.db import connections
+
+    try:
+        warm_up(config)
+    except Exception:
+        pass  # Logged and kept in status()
+    finally:
+        # Connections are per thread: the databases step only proved they can be opened
+        connections.close_all()
+
+
+def start(config: Optional[dict] = None) -> bool:
+    """Warm up this process if it serves requests and warm-up is enabled; called from ``ready()``"""
+    config = config or get_config()
+    if not config['ENABLED'] or not serves_requests():
+        return False
+    _set(status='warming_up')
+    if config['BACKGROUND']:
+        threading.Thread(target=_warm_up_in_background, args=(config,), name='ode-solver-warmup', daemon=True).start()
+    else:
+        try:
+            warm_up(config)
+        except Exception:
+            pass  # Logged and kept in status(); the worker stays unready
+    return True
+
+
+@metrics.REGISTRY.add_collector
+def _collect_readiness():
+    metrics.WORKERS_READY.set(1 if is_ready() else 0)
+
+
+def readiness_view(request):
+    """GET /ready: 200 once this worker has warmed up, 503 before that or after a failed warm-up"""
+    state = status()
+    response = FastJsonResponse({'ready': is_ready(), **state}, status=200 if is_ready() else 503)
+    response['Cache-Control'] = 'no-store'
+    return response
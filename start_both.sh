@@ -15,23 +15,28 @@ source venv/bin/activate
 python manage.py runserver 8000 &
 DJANGO_PID=$!
 
+# Start the background job worker that solves custom tasks
+echo "🧮 Starting job worker..."
+python manage.py run_jobs &
+WORKER_PID=$!
+
 # Wait a moment for Django to start
 sleep 3
 
-# Start React frontend
-echo "⚛️  Starting React frontend on port 3000..."
-cd frontend
-npm start
-
 # Cleanup function to kill Django when script exits
 cleanup() {
-    echo "🛑 Stopping Django backend..."
-    kill $DJANGO_PID 2>/dev/null
+    echo "🛑 Stopping Django backend and job worker..."
+    kill $DJANGO_PID $WORKER_PID 2>/dev/null
     exit 0
 }
 
 # Set up signal handling
 trap cleanup SIGINT SIGTERM
 
+# Start React frontend
+echo "⚛️  Starting React frontend on port 3000..."
+cd frontend
+npm start
+
 # Wait for React to finish (it will run indefinitely)
 wait
\ No newline at end of file